@@ -5,12 +5,103 @@ Lightweight local LLM integration
 """
 
 import os
+import re
+import time
 import sqlite3
 import json
 import threading
-import requests
 from datetime import datetime
 import hashlib
+from functools import lru_cache
+from typing import Iterator
+
+from response_cache import ResponseCache
+from conversation_memory import ConversationMemory, RECENT_TURNS, CHUNK_TURNS
+from utils import estimate_tokens, fts_query
+
+MAX_RESPONSE_TOKENS = 300
+MODEL_TEMPERATURE = 0.8
+FALLBACK_CACHE_SIZE = 256
+HISTORY_PAGE_SIZE = 20
+# Saved turns read back into memory on first use: the recent window plus two summarized chunks
+MEMORY_SEED_TURNS = RECENT_TURNS + 2 * CHUNK_TURNS
+# Messages that lean on earlier turns; their cached answers are keyed on the conversation too
+FOLLOW_UP = re.compile(r'\b(?:it|its|that|this|these|those|them|why|more|again|above|previous|same|'
+                       r'else|instead|continue|explain)\b', re.IGNORECASE)
+# Prompt tokens spent on retrieved project code
+CODE_CONTEXT_BUDGET = 512
+# Tokens a chat session may hold before it is reopened from memory; GPT4All's
+# default context is 2048, and estimate_tokens runs a little low
+SESSION_TOKEN_BUDGET = 1792
+# Questions worth grounding in the project's code
+CODE_QUESTION = re.compile(r'\b(?:code|function|method|class|module|file|bug|error|traceback|'
+                           r'implement\w*|where\s+is|how\s+does|calls?|import\w*|encrypt\w*|'
+                           r'decrypt\w*|vault|storage|gui|honeypot|osint)\b|\w+_\w+|\w+\.\w+\(?',
+                           re.IGNORECASE)
+
+class ResponseStream:
+    """Tokens of one response as the backend produces them
+
+    Iterate it to receive tokens. cancel() may be called from any thread,
+    and max_latency (seconds) bounds the whole response; either stops the
+    stream at the next token and keeps the text produced so far.
+    on_complete(text) runs only when the backend finishes on its own.
+    """
+
+    def __init__(self, max_latency: float = None):
+        self.tokens = iter(())
+        self.parts = []
+        self.started = time.monotonic()
+        self.deadline = self.started + max_latency if max_latency else None
+        self.cancel_event = threading.Event()
+        self.first_token_latency = None
+        self.cancelled = False
+        self.timed_out = False
+        self.finished = False
+        self.cached = False
+        self.on_complete = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def should_stop(self) -> bool:
+        """True once cancelled or over budget; backends poll this between tokens"""
+        if self.cancel_event.is_set():
+            self.cancelled = True
+        elif self.deadline and time.monotonic() > self.deadline:
+            self.timed_out = True
+        return self.cancelled or self.timed_out
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.finished:
+            raise StopIteration
+        if self.should_stop():
+            self._finish()
+            raise StopIteration
+        try:
+            token = next(self.tokens)
+        except StopIteration:
+            self._finish()
+            if self.on_complete and not (self.cancelled or self.timed_out):
+                self.on_complete(self.text)
+            raise
+        if self.first_token_latency is None:
+            self.first_token_latency = time.monotonic() - self.started
+        self.parts.append(token)
+        return token
+
+    def _finish(self):
+        self.finished = True
+        close = getattr(self.tokens, 'close', None)
+        if close:
+            close()
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
 
 class AaliyaAI:
     def __init__(self, models_dir="models"):
@@ -20,9 +111,26 @@ class AaliyaAI:
         self.model_loaded = False
         self.model_name = "ggml-model-q4_0.bin"
         self.model_url = "https://huggingface.co/TheBloke/CodeLlama-7B-Instruct-GGML/resolve/main/codellama-7b-instruct.q4_0.bin"
+        # Expected SHA-256 of the model; None trusts the hash the server advertises, if any
+        self.model_sha256 = None
+        self.fts_enabled = True
+        # Code index of Smart-Encrypt itself, built and kept fresh in the background
+        self.code_project = os.path.dirname(os.path.abspath(__file__))
+        self.code_index_path = os.path.expanduser("~/.smart_encrypt/aaliya_code_index.db")
+        self.code_indexer = None
         
         os.makedirs(self.models_dir, exist_ok=True)
         self.init_db()
+        self.response_cache = ResponseCache(self.db_path)
+        # Multi-turn context for Aaliya's own chat, seeded from saved history on first use
+        self.memory = ConversationMemory(self.db_path)
+        self.memory_seeded = False
+        # Backend chat session kept open across turns so its KV cache is reused
+        self.session = None
+        self.session_key = None
+        self.session_tokens = 0
+        # The keyword cascade depends only on the message, so repeats are memoized
+        self._fallback_response = lru_cache(maxsize=FALLBACK_CACHE_SIZE)(self._fallback_response)
         
         # Aaliya's personality
         self.personality = """You are Aaliya, a lovely female AI coding assistant. You are sweet, caring, and technically brilliant. 
@@ -43,15 +151,80 @@ class AaliyaAI:
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_time ON chat_history (timestamp, id)')
+        self._init_search_index(cursor)
         
         conn.commit()
         conn.close()
     
+    def _init_search_index(self, cursor):
+        """Full-text index over chat_history, kept in sync by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'chat_search'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5 (
+                    user_message, aaliya_response,
+                    content='chat_history', content_rowid='id'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE scans
+            print(f"Chat search index unavailable: {e}")
+            self.fts_enabled = False
+            return
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chat_history_search_insert AFTER INSERT ON chat_history
+            BEGIN
+                INSERT INTO chat_search (rowid, user_message, aaliya_response)
+                VALUES (NEW.id, NEW.user_message, NEW.aaliya_response);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chat_history_search_delete AFTER DELETE ON chat_history
+            BEGIN
+                INSERT INTO chat_search (chat_search, rowid, user_message, aaliya_response)
+                VALUES ('delete', OLD.id, OLD.user_message, OLD.aaliya_response);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chat_history_search_update AFTER UPDATE ON chat_history
+            BEGIN
+                INSERT INTO chat_search (chat_search, rowid, user_message, aaliya_response)
+                VALUES ('delete', OLD.id, OLD.user_message, OLD.aaliya_response);
+                INSERT INTO chat_search (rowid, user_message, aaliya_response)
+                VALUES (NEW.id, NEW.user_message, NEW.aaliya_response);
+            END
+        ''')
+        if not exists:
+            # Index conversations saved before the search table existed
+            cursor.execute("INSERT INTO chat_search (chat_search) VALUES ('rebuild')")
+    
+    def model_ready(self):
+        """True once the model file is present and, when model_sha256 is set, intact
+        
+        A file that fails the check (e.g. cut short by an older downloader) is
+        moved to .part, so the next download resumes and verifies it.
+        """
+        model_path = os.path.join(self.models_dir, self.model_name)
+        if not os.path.exists(model_path):
+            return False
+        if not self.model_sha256:
+            return True
+        
+        from model_download import verify_file
+        if verify_file(model_path, self.model_sha256):
+            return True
+        print(f"⚠️ Model file failed verification, it will be downloaded again: {model_path}")
+        os.replace(model_path, model_path + '.part')
+        return False
+    
     def download_model(self, progress_callback=None):
         """Download AI model with progress tracking"""
         model_path = os.path.join(self.models_dir, self.model_name)
         
-        if os.path.exists(model_path):
+        if self.model_ready():
             if progress_callback:
                 progress_callback("Model already exists", 100)
             return True
@@ -60,22 +233,14 @@ class AaliyaAI:
             if progress_callback:
                 progress_callback("Starting download...", 0)
             
-            response = requests.get(self.model_url, stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(model_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if progress_callback and total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            progress_callback(f"Downloading... {downloaded//1024//1024}MB", progress)
+            # Resumes a previous .part file and only renames it into place once verified
+            from model_download import ModelDownloader
+            stats = ModelDownloader(self.model_url, model_path, sha256=self.model_sha256,
+                                    progress=progress_callback).download()
             
             if progress_callback:
-                progress_callback("Download complete!", 100)
+                progress_callback(f"Download complete! {stats['bytes']//1024//1024}MB "
+                                  f"at {stats['mb_per_s']:.1f}MB/s", 100)
             return True
             
         except Exception as e:
@@ -94,10 +259,11 @@ class AaliyaAI:
                 from gpt4all import GPT4All
                 model_path = os.path.join(self.models_dir, self.model_name)
                 
-                if os.path.exists(model_path):
+                if self.model_ready():
                     print(f"Loading model from: {model_path}")
                     self.model = GPT4All(model_path)
                     self.model_loaded = True
+                    self.start_code_index()
                     print("✅ AI Model loaded successfully!")
                     return True
                 else:
@@ -119,21 +285,174 @@ class AaliyaAI:
     
     def unload_model(self):
         """Unload model to free memory"""
+        self._close_session()
+        if self.code_indexer is not None:
+            self.code_indexer.stop_watching()
         self.model = None
         self.model_loaded = False
     
+    def start_code_index(self):
+        """Index the project on a background thread and re-index it as files change"""
+        if self.code_indexer is None:
+            from ai_assistant import CodeIndexer
+            self.code_indexer = CodeIndexer(self.code_index_path)
+        self.code_indexer.start_watching(self.code_project)
+    
+    def code_context(self, user_message, token_budget=CODE_CONTEXT_BUDGET):
+        """Project code relevant to a code question, within token_budget; '' otherwise
+        
+        Never indexes on the caller's thread: until the background index has
+        finished its first pass, questions go ungrounded.
+        """
+        if not CODE_QUESTION.search(user_message):
+            return ""
+        try:
+            if self.code_indexer is None or not self.code_indexer.watching:
+                self.start_code_index()
+            if not self.code_indexer.indexed.is_set():
+                return ""
+            return self.code_indexer.retrieve_context(user_message, token_budget)['text']
+        except Exception as e:
+            print(f"Code retrieval failed: {e}")
+            return ""
+    
+    def _with_context(self, user_message, context=""):
+        if context:
+            return f"Relevant code from the Smart-Encrypt project:\n{context}\n\n{user_message}"
+        return user_message
+    
+    def _build_prompt(self, user_message, personality=None, context="", history=""):
+        user_message = self._with_context(user_message, context)
+        if personality:
+            # Another assistant sharing this model with its own system prompt
+            return f"{personality}\n\nUser: {user_message}\nAssistant:"
+        return f"{self.personality}\n\n{history}User: {user_message}\nAaliya (respond as a sweet female coding assistant with emojis):"
+    
+    def _model_tokens(self, prompt: str, stream: ResponseStream, max_tokens: int) -> Iterator[str]:
+        """Tokens from the loaded model; its callback stops generation on cancel or timeout"""
+        try:
+            tokens = self.model.generate(prompt, max_tokens=max_tokens, temp=MODEL_TEMPERATURE, streaming=True,
+                                         callback=lambda token_id, response: not stream.should_stop())
+        except TypeError:
+            # Older gpt4all without streaming: the whole response arrives as one token
+            yield self.model.generate(prompt, max_tokens=max_tokens, temp=MODEL_TEMPERATURE)
+            return
+        yield from tokens
+    
+    def _ensure_memory(self):
+        if not self.memory_seeded:
+            self.memory_seeded = True
+            self.memory.seed([(user, reply) for _, user, reply, _ in self.get_chat_page(limit=MEMORY_SEED_TURNS)])
+    
+    def _close_session(self):
+        session, self.session, self.session_key = self.session, None, None
+        self.session_tokens = 0
+        if session is not None:
+            try:
+                session.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing chat session: {e}")
+    
+    def session_live(self) -> bool:
+        """True while the open chat session still matches memory
+        
+        A prompt outside the session resets the backend's context, so
+        background one-shots wait until this is False and the session
+        would be reopened anyway.
+        """
+        key = self.session_key
+        return self.session is not None and key is not None and key[:2] == (self.model, self.memory.epoch)
+    
+    def _session_tokens(self, user_message: str, context: str, stream: ResponseStream,
+                        max_tokens: int) -> Iterator[str]:
+        """Aaliya's reply inside a chat session the backend keeps between turns
+        
+        The session holds the conversation in the model's KV cache, so a turn
+        only evaluates the new message. It is reopened from memory's prefix
+        when memory has been compacted (a new epoch), another turn was saved
+        without going through it, or the model was reloaded. It is also
+        reopened before a turn would take it past SESSION_TOKEN_BUDGET: code
+        context stays in the session's history but not in memory, so
+        reopening sheds it and keeps every turn's prompt bounded.
+        """
+        memory = self.memory
+        prompt = self._with_context(user_message, context)
+        prompt_tokens = estimate_tokens(prompt)
+        if (self.session_key != (self.model, memory.epoch, memory.turn_count) or
+                self.session_tokens + prompt_tokens + max_tokens > SESSION_TOKEN_BUDGET):
+            self._close_session()
+            system_prompt = self.personality
+            if memory.prefix:
+                system_prompt += f"\n\nThe conversation so far:\n{memory.prefix}"
+            self.session = self.model.chat_session(system_prompt=system_prompt)
+            self.session.__enter__()
+            self.session_tokens = estimate_tokens(system_prompt)
+        # Valid again once this turn is saved, unless that saving compacts memory
+        self.session_key = (self.model, memory.epoch, memory.turn_count + 1)
+        self.session_tokens += prompt_tokens
+        for token in self._model_tokens(prompt, stream, max_tokens):
+            self.session_tokens += 1
+            yield token
+    
+    def _cache_params(self, max_tokens: int, personality: str = None, context: str = "",
+                      history: str = "") -> dict:
+        """Everything besides the question that shapes a model response"""
+        params = {
+            'max_tokens': max_tokens,
+            'temp': MODEL_TEMPERATURE,
+            'personality': hashlib.sha256((personality or self.personality).encode()).hexdigest()[:16],
+            'context': hashlib.sha256(context.encode()).hexdigest()[:16]
+        }
+        if history:
+            params['history'] = hashlib.sha256(history.encode()).hexdigest()[:16]
+        return params
+    
+    def stream_response(self, user_message, max_latency: float = None,
+                        max_tokens: int = MAX_RESPONSE_TOKENS, use_cache: bool = True,
+                        personality: str = None, grounded: bool = True) -> ResponseStream:
+        """Start a response and return its token stream (personality replaces Aaliya's)
+        
+        Code questions are grounded with matching project code unless grounded is off.
+        Aaliya's own chat also sees the conversation memory; other personalities
+        are one-shot.
+        """
+        stream = ResponseStream(max_latency)
+        if self.model and hasattr(self.model, 'generate'):
+            context = self.code_context(user_message) if grounded else ""
+            history = ""
+            if personality is None:
+                self._ensure_memory()
+                history = self.memory.prefix
+            # Standalone questions keep hitting the cache; follow-ups depend on what came before
+            follow_up = FOLLOW_UP.search(user_message) or len(user_message.split()) < 4
+            params = self._cache_params(max_tokens, personality, context, history if follow_up else "")
+            cached = self.response_cache.get(user_message, self.model_name, params) if use_cache else None
+            if cached is not None:
+                stream.cached = True
+                stream.tokens = iter(re.findall(r'\s*\S+', cached))
+                return stream
+            if personality is None and hasattr(self.model, 'chat_session'):
+                stream.tokens = self._session_tokens(user_message, context, stream, max_tokens)
+            else:
+                # A one-shot prompt resets the backend's context, and would otherwise
+                # land in the open session's history
+                self._close_session()
+                # Use actual AI model with enhanced prompt
+                prompt = self._build_prompt(user_message, personality, context, history)
+                stream.tokens = self._model_tokens(prompt, stream, max_tokens)
+            if use_cache:
+                # Cancelled or timed out responses are partial and never cached
+                stream.on_complete = lambda text: text.strip() and self.response_cache.put(
+                    user_message, self.model_name, params, text)
+        else:
+            # Fallback responses when model not available, streamed word by word
+            stream.tokens = iter(re.findall(r'\s*\S+', self._fallback_response(user_message)))
+        return stream
+    
     def generate_response(self, user_message):
         """Generate Aaliya's response"""
         try:
-            if self.model and hasattr(self.model, 'generate'):
-                # Use actual AI model with enhanced prompt
-                prompt = f"{self.personality}\n\nUser: {user_message}\nAaliya (respond as a sweet female coding assistant with emojis):"
-                response = self.model.generate(prompt, max_tokens=300, temp=0.8)
-                return response.strip()
-            else:
-                # Fallback responses when model not available
-                return self._fallback_response(user_message)
-                
+            return ''.join(self.stream_response(user_message)).strip()
         except Exception as e:
             return f"Sorry, I encountered an error: {str(e)}. But I'm still here to help! 💜"
     
@@ -400,26 +719,83 @@ C++ with love! Want me to explain any part? 😊💜"""
             conn.close()
         except Exception as e:
             print(f"Error saving chat: {e}")
+        if self.memory_seeded:
+            self.memory.add_turn(user_message, aaliya_response)
+    
+    def get_chat_page(self, before=None, limit=HISTORY_PAGE_SIZE):
+        """One page of (id, user_message, aaliya_response, timestamp), oldest first
+        
+        before is the (timestamp, id) of the oldest message already shown;
+        the page is read from the timestamp index, so its cost does not grow
+        with the size of the history.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            if before:
+                cursor.execute('''
+                    SELECT id, user_message, aaliya_response, timestamp
+                    FROM chat_history
+                    WHERE (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ''', (*before, limit))
+            else:
+                cursor.execute('''
+                    SELECT id, user_message, aaliya_response, timestamp
+                    FROM chat_history
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ''', (limit,))
+            
+            page = cursor.fetchall()
+            conn.close()
+            return list(reversed(page))  # Reverse to show oldest first
+            
+        except Exception as e:
+            print(f"Error loading chat history: {e}")
+            return []
     
     def get_chat_history(self, limit=50):
         """Get recent chat history"""
+        return [row[1:] for row in self.get_chat_page(limit=limit)]
+    
+    def search_history(self, query, limit=HISTORY_PAGE_SIZE):
+        """Past conversations matching query, best match first"""
+        match = fts_query(query)
+        if not match:
+            return []
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT user_message, aaliya_response, timestamp
-                FROM chat_history
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (limit,))
+            if self.fts_enabled:
+                cursor.execute('''
+                    SELECT h.id, h.user_message, h.aaliya_response, h.timestamp
+                    FROM chat_search
+                    JOIN chat_history h ON h.id = chat_search.rowid
+                    WHERE chat_search MATCH ?
+                    ORDER BY bm25(chat_search, 2.0, 1.0)
+                    LIMIT ?
+                ''', (match, limit))
+            else:
+                pattern = f"%{query}%"
+                cursor.execute('''
+                    SELECT id, user_message, aaliya_response, timestamp
+                    FROM chat_history
+                    WHERE user_message LIKE ? OR aaliya_response LIKE ?
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ''', (pattern, pattern, limit))
             
-            history = cursor.fetchall()
+            results = cursor.fetchall()
             conn.close()
-            return list(reversed(history))  # Reverse to show oldest first
+            return results
             
         except Exception as e:
-            print(f"Error loading chat history: {e}")
+            print(f"Error searching chat history: {e}")
             return []
     
     def clear_history(self):
@@ -430,6 +806,8 @@ C++ with love! Want me to explain any part? 😊💜"""
             cursor.execute('DELETE FROM chat_history')
             conn.commit()
             conn.close()
+            # A new epoch also retires the open chat session on its next turn
+            self.memory.clear()
             return True
         except Exception as e:
             print(f"Error clearing history: {e}")
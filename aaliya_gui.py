@@ -4,21 +4,31 @@ Aaliya GUI - Beautiful chat interface for Aaliya AI
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog
 import threading
 import time
-import os
-from aaliya_ai import AaliyaAI
+from functools import cached_property
+
+from aaliya_ai import HISTORY_PAGE_SIZE
+
+# Streamed tokens are drawn at most this often (seconds)
+RENDER_INTERVAL = 0.05
+# Longest a single response may keep generating (seconds)
+RESPONSE_LATENCY_BUDGET = 120.0
 
 class AaliyaGUI:
     def __init__(self, parent_gui):
         self.parent = parent_gui
-        self.aaliya = AaliyaAI()
         self.chat_window = None
         self.chat_display = None
         self.chat_entry = None
         self.status_label = None
+        self.send_btn = None
+        self.current_stream = None
         self.model_loading = False
+        # (timestamp, id) of the oldest message shown; None once all history is on screen
+        self.oldest_loaded = None
+        self.loading_older = False
         
         # Aaliya's color scheme
         self.colors = {
@@ -32,12 +42,34 @@ class AaliyaGUI:
             'offline': '#ff4444'       # Offline status
         }
     
+    @property
+    def inference(self):
+        """Worker that owns the model shared with the code assistant"""
+        return self.parent.inference
+    
+    @property
+    def aaliya(self):
+        """Aaliya's model and chat history"""
+        return self.inference.aaliya
+    
+    @cached_property
+    def model_manager(self):
+        """Loads the model in the background and unloads it when idle or memory is short"""
+        manager = self.inference.manager
+        manager.on_unload = lambda reason: self._post(self._show_unloaded, reason)
+        return manager
+    
     def show_aaliya_chat(self):
         """Show Aaliya chat window"""
         if self.chat_window and self.chat_window.winfo_exists():
             self.chat_window.lift()
             return
         
+        # A response still streaming into a closed window is abandoned
+        if self.current_stream:
+            self.current_stream.cancel()
+            self.current_stream = None
+        
         self.chat_window = tk.Toplevel(self.parent.root)
         self.chat_window.title("💜 Aaliya - Your AI Assistant")
         self.chat_window.geometry("800x600")
@@ -47,9 +79,8 @@ class AaliyaGUI:
         self._create_chat_interface()
         self._load_chat_history()
         
-        # Auto-load model in background
-        if not self.aaliya.model_loaded:
-            self._load_model_async()
+        # Auto-load model in background (joins a preload already under way)
+        self._load_model_async()
     
     def _create_chat_interface(self):
         """Create the chat interface"""
@@ -93,7 +124,7 @@ class AaliyaGUI:
         self.chat_canvas = tk.Canvas(chat_frame, bg=self.colors['chat_bg'], 
                                     highlightthickness=0)
         self.chat_scrollbar = tk.Scrollbar(chat_frame, orient="vertical", 
-                                          command=self.chat_canvas.yview,
+                                          command=self._on_scrollbar,
                                           bg=self.colors['bg'])
         self.chat_frame_inner = tk.Frame(self.chat_canvas, bg=self.colors['chat_bg'])
         
@@ -106,6 +137,7 @@ class AaliyaGUI:
         # Bind mouse wheel
         def on_mousewheel(event):
             self.chat_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+            self._maybe_load_older()
         self.chat_canvas.bind_all("<MouseWheel>", on_mousewheel)
         
         # Input area
@@ -120,13 +152,14 @@ class AaliyaGUI:
         self.chat_entry.pack(side='left', fill='both', expand=True, padx=(0, 10))
         self.chat_entry.bind('<Return>', self._on_enter_key)
         
-        # Send button
-        send_btn = tk.Button(input_frame, text="💜\nSend", 
+        # Send button, which becomes Stop while a response streams in
+        self.send_btn = tk.Button(input_frame, text="💜\nSend", 
                            command=self._send_message,
                            bg=self.colors['aaliya_bubble'], fg=self.colors['text'],
                            font=('Arial', 10, 'bold'), relief='flat', bd=0,
                            width=8, height=3)
-        send_btn.pack(side='right')
+        self.send_btn.pack(side='right')
+        self.chat_window.bind('<Escape>', lambda e: self._stop_response())
         
         # Control buttons
         control_frame = tk.Frame(self.chat_window, bg=self.colors['bg'])
@@ -136,6 +169,10 @@ class AaliyaGUI:
                  bg=self.colors['user_bubble'], fg=self.colors['text'],
                  font=('Arial', 9), relief='flat').pack(side='left', padx=5)
         
+        tk.Button(control_frame, text="🔍 Search", command=self._search_history,
+                 bg=self.colors['user_bubble'], fg=self.colors['text'],
+                 font=('Arial', 9), relief='flat').pack(side='left', padx=5)
+        
         tk.Button(control_frame, text="💾 Load Model", command=self._load_model_async,
                  bg=self.colors['aaliya_bubble'], fg=self.colors['text'],
                  font=('Arial', 9), relief='flat').pack(side='left', padx=5)
@@ -154,6 +191,9 @@ class AaliyaGUI:
     
     def _send_message(self):
         """Send user message to Aaliya"""
+        if self.current_stream:
+            return
+        
         message = self.chat_entry.get(1.0, 'end-1c').strip()
         if not message:
             return
@@ -163,29 +203,67 @@ class AaliyaGUI:
         # Add user message
         self._add_message(message, is_user=True)
         
-        # Show typing indicator
-        typing_frame = self._add_message("💭 Aaliya is thinking...", is_user=False, is_typing=True)
+        # The typing indicator becomes the response bubble as tokens arrive
+        bubble = self._add_message("💭 Aaliya is thinking...", is_user=False, is_typing=True)
+        # The shared worker runs one generation at a time, loading the model if it was unloaded
+        request = self.inference.submit(message, max_latency=RESPONSE_LATENCY_BUDGET)
+        self.current_stream = request
+        self.send_btn.configure(text="⏹\nStop", command=self._stop_response)
         
-        # Generate response in background
+        # Receive the response in background
         def generate_response():
             try:
-                response = self.aaliya.generate_response(message)
-                self.aaliya.save_chat(message, response)
+                last_render = 0.0
+                for _ in request:
+                    now = time.monotonic()
+                    if now - last_render >= RENDER_INTERVAL:
+                        last_render = now
+                        self._post(self._render_partial, bubble, request.text)
                 
-                # Update UI in main thread
-                self.chat_window.after(0, lambda: self._replace_typing_with_response(typing_frame, response))
+                response = request.text.strip()
+                if request.cancelled:
+                    response += " ⏹ (stopped)"
+                elif request.timed_out:
+                    response += " ⏱ (time limit reached)"
+                self.aaliya.save_chat(message, response)
                 
             except Exception as e:
-                error_response = f"Sorry, I encountered an error: {str(e)} 💜"
-                self.chat_window.after(0, lambda: self._replace_typing_with_response(typing_frame, error_response))
+                response = f"Sorry, I encountered an error: {str(e)} 💜"
+            
+            # Update UI in main thread
+            self._post(self._finish_response, bubble, response)
         
         threading.Thread(target=generate_response, daemon=True).start()
     
-    def _add_message(self, text, is_user=False, is_typing=False):
-        """Add message bubble to chat"""
+    def _post(self, callback, *args):
+        """Run callback on the Tk thread; a closed window cancels the response"""
+        try:
+            self.chat_window.after(0, callback, *args)
+        except (tk.TclError, RuntimeError, AttributeError):
+            if self.current_stream:
+                self.current_stream.cancel()
+    
+    def _render_partial(self, bubble, text):
+        if bubble.winfo_exists():
+            bubble.configure(text=text.lstrip())
+            self._scroll_to_bottom()
+    
+    def _finish_response(self, bubble, response):
+        self.current_stream = None
+        if self.send_btn.winfo_exists():
+            self.send_btn.configure(text="💜\nSend", command=self._send_message)
+        self._render_partial(bubble, response)
+    
+    def _stop_response(self):
+        """Stop the response being generated, keeping what has arrived"""
+        if self.current_stream:
+            self.current_stream.cancel()
+    
+    def _add_message(self, text, is_user=False, is_typing=False, before=None):
+        """Add message bubble to chat (above the widget before, for older history)"""
         # Message container
         msg_container = tk.Frame(self.chat_frame_inner, bg=self.colors['chat_bg'])
-        msg_container.pack(fill='x', padx=10, pady=5)
+        msg_container.pack(fill='x', padx=10, pady=5, before=before)
         
         if is_user:
             # User message (right side)
@@ -219,15 +297,10 @@ class AaliyaGUI:
             bubble.pack(side='left')
         
         # Auto-scroll to bottom
-        self.chat_window.after(100, self._scroll_to_bottom)
+        if before is None:
+            self.chat_window.after(100, self._scroll_to_bottom)
         
-        return msg_container if is_typing else None
-    
-    def _replace_typing_with_response(self, typing_frame, response):
-        """Replace typing indicator with actual response"""
-        if typing_frame:
-            typing_frame.destroy()
-        self._add_message(response, is_user=False)
+        return bubble if is_typing else None
     
     def _scroll_to_bottom(self):
         """Scroll chat to bottom"""
@@ -236,17 +309,75 @@ class AaliyaGUI:
         self.chat_canvas.yview_moveto(1.0)
     
     def _load_chat_history(self):
-        """Load previous chat history"""
-        history = self.aaliya.get_chat_history(20)  # Last 20 messages
+        """Load the most recent page of chat history; older pages load on scroll-up"""
+        history = self.aaliya.get_chat_page(limit=HISTORY_PAGE_SIZE)
+        self.oldest_loaded = None
         
         if not history:
             # Welcome message
             welcome = "Hello! I'm Aaliya, your personal AI assistant! 💜\n\nI'm here to help you with:\n• Smart-Encrypt development\n• Code generation and debugging\n• Friendly conversation\n\nHow can I assist you today? 😊"
             self._add_message(welcome, is_user=False)
         else:
-            for user_msg, aaliya_msg, timestamp in history:
+            for message_id, user_msg, aaliya_msg, timestamp in history:
                 self._add_message(user_msg, is_user=True)
                 self._add_message(aaliya_msg, is_user=False)
+            if len(history) == HISTORY_PAGE_SIZE:
+                self.oldest_loaded = (history[0][3], history[0][0])
+    
+    def _on_scrollbar(self, *args):
+        self.chat_canvas.yview(*args)
+        self._maybe_load_older()
+    
+    def _maybe_load_older(self):
+        """Fetch the previous page once the user scrolls to the top"""
+        if self.oldest_loaded and not self.loading_older and self.chat_canvas.yview()[0] <= 0.0:
+            self.loading_older = True
+            self.chat_window.after_idle(self._load_older_messages)
+    
+    def _load_older_messages(self):
+        """Insert the previous page above the current messages without moving the view"""
+        try:
+            history = self.aaliya.get_chat_page(before=self.oldest_loaded, limit=HISTORY_PAGE_SIZE)
+            if not history:
+                self.oldest_loaded = None
+                return
+            self.oldest_loaded = (history[0][3], history[0][0]) if len(history) == HISTORY_PAGE_SIZE else None
+            
+            children = self.chat_frame_inner.winfo_children()
+            first = children[0] if children else None
+            old_height = self.chat_frame_inner.winfo_reqheight()
+            for message_id, user_msg, aaliya_msg, timestamp in history:
+                self._add_message(user_msg, is_user=True, before=first)
+                self._add_message(aaliya_msg, is_user=False, before=first)
+            
+            self.chat_frame_inner.update_idletasks()
+            new_height = self.chat_frame_inner.winfo_reqheight()
+            self.chat_canvas.configure(scrollregion=self.chat_canvas.bbox("all"))
+            self.chat_canvas.yview_moveto((new_height - old_height) / max(new_height, 1))
+        finally:
+            self.loading_older = False
+    
+    def _search_history(self):
+        """Search past conversations and list the best matches"""
+        query = simpledialog.askstring("Search Chats", "Search past conversations:", parent=self.chat_window)
+        if not query:
+            return
+        results = self.aaliya.search_history(query)
+        
+        results_window = tk.Toplevel(self.chat_window)
+        results_window.title(f"🔍 {query}")
+        results_window.geometry("600x400")
+        results_window.configure(bg=self.colors['bg'])
+        
+        results_text = scrolledtext.ScrolledText(results_window, wrap='word',
+                                                 bg=self.colors['chat_bg'], fg=self.colors['text'],
+                                                 font=('Arial', 10))
+        results_text.pack(fill='both', expand=True, padx=10, pady=10)
+        if not results:
+            results_text.insert('end', "No past conversations match that search 💜")
+        for message_id, user_msg, aaliya_msg, timestamp in results:
+            results_text.insert('end', f"[{timestamp}]\nYou: {user_msg}\nAaliya: {aaliya_msg[:300]}\n\n")
+        results_text.configure(state='disabled')
     
     def _clear_chat(self):
         """Clear chat history"""
@@ -257,6 +388,7 @@ class AaliyaGUI:
             
             # Clear database
             self.aaliya.clear_history()
+            self.oldest_loaded = None
             
             # Add welcome message
             welcome = "Chat cleared! I'm still here to help you. What would you like to work on? 💜"
@@ -264,7 +396,13 @@ class AaliyaGUI:
     
     def _load_model_async(self):
         """Load AI model in background"""
-        if self.model_loading or self.aaliya.model_loaded:
+        if self.model_loading:
+            return
+        if self.model_manager.is_loaded:
+            self.status_label.configure(text=self._online_status(), fg=self.colors['online'])
+            return
+        if self.model_manager.backend_missing:
+            self.status_label.configure(text="🟡 Fallback Mode", fg='#ffaa00')
             return
         
         self.model_loading = True
@@ -273,8 +411,7 @@ class AaliyaGUI:
         def load_model():
             try:
                 # Try to download and load model
-                model_path = os.path.join(self.aaliya.models_dir, self.aaliya.model_name)
-                if not os.path.exists(model_path):
+                if not self.aaliya.model_ready():
                     self.chat_window.after(0, lambda: self.status_label.configure(text="⬇️ Downloading...", fg='#ffaa00'))
                     
                     def progress_callback(message, progress):
@@ -286,11 +423,12 @@ class AaliyaGUI:
                         self.model_loading = False
                         return
                 
-                # Load the model
-                success = self.aaliya.load_model()
+                # Load the model, or wait for the preload started at unlock
+                success = self.model_manager.load()
                 
-                if success and self.aaliya.model:
-                    self.chat_window.after(0, lambda: self.status_label.configure(text="🟢 AI Online", fg=self.colors['online']))
+                if success:
+                    status = self._online_status()
+                    self.chat_window.after(0, lambda: self.status_label.configure(text=status, fg=self.colors['online']))
                     self.chat_window.after(0, lambda: self._add_message("I'm now fully loaded with AI model! Ready to help! 💜✨", is_user=False))
                 else:
                     self.chat_window.after(0, lambda: self.status_label.configure(text="🟡 Fallback Mode", fg='#ffaa00'))
@@ -305,12 +443,26 @@ class AaliyaGUI:
         
         threading.Thread(target=load_model, daemon=True).start()
     
+    def _online_status(self):
+        """Status text with the last load time and this process's resident memory"""
+        stats = self.model_manager.get_stats()
+        if stats['load_seconds'] is None:
+            return "🟢 AI Online"
+        return f"🟢 AI Online ({stats['load_seconds']:.1f}s, {stats['rss_mb']:.0f} MB)"
+    
     def _unload_model(self):
         """Unload model to free memory"""
-        self.aaliya.unload_model()
+        if not self.model_manager.unload('manual', release_weights=True) and self.model_manager.active:
+            self._add_message("I'm still answering, so I'll keep the model loaded for now! 💜", is_user=False)
+            return
         self.status_label.configure(text="🔴 Offline", fg=self.colors['offline'])
         self._add_message("Model unloaded to save memory. I can still chat in fallback mode! 💜", is_user=False)
     
+    def _show_unloaded(self, reason):
+        """The manager unloaded the model on its own (idle or low memory)"""
+        if reason != 'manual' and self.status_label and self.status_label.winfo_exists():
+            self.status_label.configure(text=f"💤 Unloaded ({reason})", fg='#ffaa00')
+    
     def add_aaliya_button(self, parent_frame):
         """Add Aaliya button to main interface"""
         aaliya_btn = tk.Button(
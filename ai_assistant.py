@@ -5,14 +5,243 @@ import re
 import ast
 import json
 import hashlib
-from typing import Dict, List, Tuple, Optional
-from pathlib import Path
 import threading
-import time
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+from collections import OrderedDict
+from utils import parallel_map, PeriodicTask, fts_query, fts_any_query, estimate_tokens
+
+# Relative bm25 weight of each indexed column: a hit in a name outranks one in code
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+SEARCH_LIMIT = 50
+
+# "who calls X" / "what does X depend on" questions answered from the reference graph
+CALLERS_QUESTION = re.compile(r'\bwho\s+(?:calls|uses)\s+`?([\w.]+)', re.IGNORECASE)
+DEPENDENCIES_QUESTION = re.compile(r'\bwhat\s+does\s+`?([\w.]+)`?\s+(?:depend\s+on|use)', re.IGNORECASE)
+
+# Directories never worth indexing; hidden directories are skipped as well
+IGNORED_DIRS = {'__pycache__', 'venv', 'env', 'node_modules', 'build', 'dist', 'site-packages'}
+INDEX_BATCH_SIZE = 200
+WATCH_INTERVAL = 2.0
+
+# Receiver placeholder for a method call whose object type is unknown
+UNRESOLVED = '?'
+
+# Retrieval of code context for language model prompts
+CONTEXT_TOKEN_BUDGET = 512
+RETRIEVAL_LIMIT = 8
+RETRIEVAL_CACHE_SIZE = 128
+
+def _constructed_type(value) -> Optional[str]:
+    """Class name when value is a call like Foo(...) or module.Foo(...)"""
+    if isinstance(value, ast.Call):
+        func = value.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        if name and name[:1].isupper():
+            return name
+    return None
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """Collects definitions and references in one pass, tracking the enclosing scope
+
+    References are (source, target, kind, line) where source is the qualified
+    name of the enclosing definition (or the module) and target is resolved
+    through imports, self and variables assigned from a constructor call.
+    """
+
+    def __init__(self, lines: List[str], module: str):
+        self.lines = lines
+        self.module = module
+        self.scope = []
+        self.class_stack = []
+        self.class_attr_types = []
+        self.local_types = [{}]
+        self.imports = {}
+        self.definitions = []
+        self.references = []
+
+    def _add(self, node, name: str, class_name: Optional[str], default_span: int):
+        line_end = node.end_lineno or node.lineno + default_span
+        self.definitions.append((
+            name, class_name, node.lineno, line_end,
+            '\n'.join(self.lines[node.lineno - 1:line_end]),
+            ast.get_docstring(node) or ""
+        ))
+
+    def _ref(self, target: str, kind: str, node):
+        source = '.'.join(self.scope) or self.module
+        self.references.append((source, target, kind, node.lineno))
+
+    def _resolve(self, expr) -> Optional[str]:
+        """Best-effort qualified name of the object expr refers to"""
+        if isinstance(expr, ast.Name):
+            return self.imports.get(expr.id, expr.id)
+        if not isinstance(expr, ast.Attribute):
+            return None
+        value = expr.value
+        if isinstance(value, ast.Name):
+            if value.id == 'self' and self.class_stack:
+                return f"{self.class_stack[-1]}.{expr.attr}"
+            if value.id in self.local_types[-1]:
+                return f"{self.local_types[-1][value.id]}.{expr.attr}"
+            if value.id in self.imports:
+                return f"{self.imports[value.id]}.{expr.attr}"
+        elif (isinstance(value, ast.Attribute) and isinstance(value.value, ast.Name)
+              and value.value.id == 'self' and self.class_attr_types
+              and value.attr in self.class_attr_types[-1]):
+            return f"{self.class_attr_types[-1][value.attr]}.{expr.attr}"
+        return f"{UNRESOLVED}.{expr.attr}"
+
+    def _visit_scope(self, node, name: str):
+        self.scope.append(name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node):
+        self._add(node, node.name, self.class_stack[-1] if self.class_stack else None, 10)
+        self.local_types.append({})
+        self._visit_scope(node, node.name)
+        self.local_types.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._add(node, f"class_{node.name}", node.name, 20)
+        for base in node.bases:
+            target = self._resolve(base)
+            if target:
+                self._ref(target, 'inherits', base)
+
+        # Types of self.x = Foo(...) attributes, so methods defined before
+        # __init__ still resolve self.x.method() calls
+        attr_types = {}
+        for child in ast.walk(node):
+            if isinstance(child, ast.Assign):
+                value_type = _constructed_type(child.value)
+                for target in child.targets:
+                    if (value_type and isinstance(target, ast.Attribute)
+                            and isinstance(target.value, ast.Name) and target.value.id == 'self'):
+                        attr_types[target.attr] = value_type
+
+        self.class_stack.append(node.name)
+        self.class_attr_types.append(attr_types)
+        self._visit_scope(node, node.name)
+        self.class_attr_types.pop()
+        self.class_stack.pop()
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.imports[alias.asname] = alias.name
+            else:
+                root = alias.name.split('.')[0]
+                self.imports[root] = root
+            self._ref(alias.name, 'import', node)
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ''
+        for alias in node.names:
+            self.imports[alias.asname or alias.name] = alias.name
+            self._ref(f"{module}.{alias.name}" if module else alias.name, 'import', node)
+
+    def visit_Assign(self, node):
+        value_type = _constructed_type(node.value)
+        if value_type:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.local_types[-1][target.id] = value_type
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        target = self._resolve(node.func)
+        if target:
+            self._ref(target, 'call', node)
+        # The callee itself is recorded as a call, not again as an attribute read
+        if isinstance(node.func, ast.Attribute):
+            self.visit(node.func.value)
+        elif not isinstance(node.func, ast.Name):
+            self.visit(node.func)
+        for arg in node.args:
+            self.visit(arg)
+        for keyword in node.keywords:
+            self.visit(keyword.value)
+
+    def visit_Attribute(self, node):
+        # Attribute reads only count when the owner is known; x.y on an
+        # arbitrary object would swamp the graph
+        if isinstance(node.ctx, ast.Load):
+            target = self._resolve(node)
+            if target and not target.startswith(UNRESOLVED + '.'):
+                self._ref(target, 'attribute', node)
+        self.generic_visit(node)
+
+def extract_symbols(content: str, module: str = '') -> Tuple[List[Tuple], List[Tuple]]:
+    """Definitions and references of a source file from a single AST pass"""
+    visitor = _SymbolVisitor(content.split('\n'), module)
+    visitor.visit(ast.parse(content))
+    return visitor.definitions, visitor.references
+
+def extract_definitions(content: str) -> List[Tuple]:
+    """(name, class, line_start, line_end, snippet, docstring) for every definition"""
+    return extract_symbols(content)[0]
+
+def iter_python_files(project_path: str) -> Iterator[Tuple[str, int, int]]:
+    """(path, size, mtime_ns) of every Python file below project_path"""
+    stack = [project_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.') and entry.name not in IGNORED_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith('.py') and entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime_ns
+            except OSError:
+                continue
+
+def parse_source_file(filepath: str) -> Dict[str, any]:
+    """Read, hash and parse one file; safe to run in a worker process"""
+    record = {'filepath': filepath, 'error': None}
+    try:
+        stat = os.stat(filepath)
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        record['error'] = str(e)
+        return record
+
+    record.update({
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'content': content,
+        'file_hash': hashlib.md5(content.encode()).hexdigest()
+    })
+    module = os.path.splitext(os.path.basename(filepath))[0]
+    try:
+        record['definitions'], record['references'] = extract_symbols(content, module)
+    except (SyntaxError, ValueError):
+        record['definitions'], record['references'] = [], []
+    return record
+
+def _parse_source_batch(filepaths: List[str]) -> List[Dict]:
+    return [parse_source_file(filepath) for filepath in filepaths]
 
 class CodeIndexer:
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self.fts_enabled = True
+        self.watcher = PeriodicTask()
+        # Set once index_project has completed in this process
+        self.indexed = threading.Event()
+        self.closure_cache = {}
+        self.closure_generation = None
+        self.retrieval_cache = OrderedDict()
+        self.retrieval_generation = None
         self.init_db()
     
     def init_db(self):
@@ -31,6 +260,13 @@ class CodeIndexer:
             )
         ''')
         
+        # Size and mtime let an unchanged file be skipped without reading it
+        cursor.execute('PRAGMA table_info(code_files)')
+        columns = {row[1] for row in cursor.fetchall()}
+        for column in ('file_size', 'file_mtime'):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE code_files ADD COLUMN {column} INTEGER')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS code_functions (
                 id INTEGER PRIMARY KEY,
@@ -44,6 +280,7 @@ class CodeIndexer:
                 FOREIGN KEY (file_id) REFERENCES code_files (id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_code_functions_file ON code_functions (file_id)')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS code_patterns (
@@ -56,97 +293,434 @@ class CodeIndexer:
             )
         ''')
         
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS code_references (
+                id INTEGER PRIMARY KEY,
+                file_id INTEGER,
+                source TEXT,
+                target TEXT,
+                target_name TEXT,
+                kind TEXT,
+                line_number INTEGER,
+                FOREIGN KEY (file_id) REFERENCES code_files (id)
+            )
+        ''')
+        # Adjacency indexes: outgoing edges by source, incoming by target
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_code_references_source ON code_references (source)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_code_references_target ON code_references (target, kind)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_code_references_name ON code_references (target_name, kind)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_code_references_file ON code_references (file_id)')
+        
+        # Bumped whenever a file's content changes so cached closures know they are stale
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS code_index_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO code_index_state (key, value) VALUES ('generation', 0)")
+        for name, event in (('insert', 'INSERT'), ('update', 'UPDATE OF file_hash'), ('delete', 'DELETE')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS code_files_generation_{name} AFTER {event} ON code_files
+                BEGIN
+                    UPDATE code_index_state SET value = value + 1 WHERE key = 'generation';
+                END
+            ''')
+        
+        self._init_search_index(cursor)
+        
         conn.commit()
         conn.close()
     
-    def index_project(self, project_path: str):
-        """Index all Python files in the project"""
-        for py_file in Path(project_path).glob("*.py"):
-            self.index_file(str(py_file))
-    
-    def index_file(self, filepath: str):
-        """Index a single Python file"""
+    def _init_search_index(self, cursor):
+        """Full-text index over code_functions, kept in sync by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'code_search'")
+        exists = cursor.fetchone() is not None
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            file_hash = hashlib.md5(content.encode()).hexdigest()
-            filename = os.path.basename(filepath)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if file already indexed with same hash
-            cursor.execute('SELECT file_hash FROM code_files WHERE filepath = ?', (filepath,))
-            result = cursor.fetchone()
-            if result and result[0] == file_hash:
-                conn.close()
-                return
-            
-            # Insert/update file
             cursor.execute('''
-                INSERT OR REPLACE INTO code_files 
-                (filepath, filename, content, file_hash, last_modified, file_type)
-                VALUES (?, ?, ?, ?, datetime('now'), 'python')
-            ''', (filepath, filename, content, file_hash))
-            
-            file_id = cursor.lastrowid
-            
-            # Parse and index functions/classes
-            self._parse_python_file(cursor, file_id, content)
-            
+                CREATE VIRTUAL TABLE IF NOT EXISTS code_search USING fts5 (
+                    function_name, class_name, docstring, code_snippet,
+                    content='code_functions', content_rowid='id'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE scans
+            print(f"Full-text search unavailable: {e}")
+            self.fts_enabled = False
+            return
+        
+        columns = 'function_name, class_name, docstring, code_snippet'
+        values = 'NEW.function_name, NEW.class_name, NEW.docstring, NEW.code_snippet'
+        old_values = 'OLD.function_name, OLD.class_name, OLD.docstring, OLD.code_snippet'
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS code_functions_search_insert AFTER INSERT ON code_functions
+            BEGIN
+                INSERT INTO code_search (rowid, {columns}) VALUES (NEW.id, {values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS code_functions_search_delete AFTER DELETE ON code_functions
+            BEGIN
+                INSERT INTO code_search (code_search, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS code_functions_search_update AFTER UPDATE ON code_functions
+            BEGIN
+                INSERT INTO code_search (code_search, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO code_search (rowid, {columns}) VALUES (NEW.id, {values});
+            END
+        ''')
+        
+        # Functions indexed before the search table existed
+        if not exists:
+            cursor.execute("INSERT INTO code_search (code_search) VALUES ('rebuild')")
+    
+    def index_project(self, project_path: str, workers: int = None,
+                      batch_size: int = INDEX_BATCH_SIZE) -> Dict[str, int]:
+        """Index every Python file below project_path, re-parsing only changed files
+        
+        Files whose size and mtime match the index are skipped without being
+        read. Changed files are parsed in a process pool and written one
+        transaction per batch; files that disappeared are removed.
+        """
+        project_path = os.path.abspath(project_path)
+        on_disk = {path: (size, mtime) for path, size, mtime in iter_python_files(project_path)}
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, filepath, file_size, file_mtime, file_hash FROM code_files')
+        indexed = {}
+        for file_id, filepath, size, mtime, file_hash in cursor.fetchall():
+            if filepath == project_path or filepath.startswith(project_path + os.sep):
+                indexed[filepath] = (file_id, size, mtime, file_hash)
+        
+        changed = [path for path, stat in on_disk.items()
+                   if path not in indexed or indexed[path][1:3] != stat]
+        removed = [indexed[path][0] for path in indexed if path not in on_disk]
+        stats = {'scanned': len(on_disk), 'changed': len(changed), 'indexed': 0,
+                 'removed': len(removed), 'errors': 0}
+        
+        if removed:
+            self._delete_files(cursor, removed)
             conn.commit()
+        
+        if changed:
+            # A pool only pays for itself once there is more than one batch of work
+            if len(changed) <= batch_size:
+                workers = 1
+            batches = [changed[i:i + batch_size] for i in range(0, len(changed), batch_size)]
+            for records in parallel_map(_parse_source_batch, batches, workers,
+                                        ordered=False, initializer=None):
+                for record in records:
+                    if record['error']:
+                        print(f"Error indexing {record['filepath']}: {record['error']}")
+                        stats['errors'] += 1
+                    elif self._store_file(cursor, record, indexed.get(record['filepath'])):
+                        stats['indexed'] += 1
+                conn.commit()
+        
+        conn.close()
+        self.indexed.set()
+        return stats
+    
+    def index_file(self, filepath: str):
+        """Index a single Python file"""
+        filepath = os.path.abspath(filepath)
+        record = parse_source_file(filepath)
+        if record['error']:
+            print(f"Error indexing {filepath}: {record['error']}")
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, file_size, file_mtime, file_hash FROM code_files WHERE filepath = ?',
+                       (filepath,))
+        self._store_file(cursor, record, cursor.fetchone())
+        conn.commit()
+        conn.close()
+    
+    def _store_file(self, cursor, record: Dict, existing: Optional[Tuple]) -> bool:
+        """Write one parsed file; returns False when only its stat info changed"""
+        filepath = record['filepath']
+        if existing and existing[3] == record['file_hash']:
+            # Touched but not edited: remember the new stat so it is skipped next time
+            cursor.execute('UPDATE code_files SET file_size = ?, file_mtime = ? WHERE id = ?',
+                           (record['size'], record['mtime'], existing[0]))
+            return False
+        
+        # Insert/update file, keeping its id so old definitions can be replaced
+        cursor.execute('''
+            INSERT INTO code_files 
+            (filepath, filename, content, file_hash, last_modified, file_type, file_size, file_mtime)
+            VALUES (?, ?, ?, ?, datetime('now'), 'python', ?, ?)
+            ON CONFLICT (filepath) DO UPDATE SET
+                content = excluded.content, file_hash = excluded.file_hash,
+                last_modified = excluded.last_modified,
+                file_size = excluded.file_size, file_mtime = excluded.file_mtime
+        ''', (filepath, os.path.basename(filepath), record['content'], record['file_hash'],
+              record['size'], record['mtime']))
+        
+        file_id = existing[0] if existing else cursor.lastrowid
+        cursor.execute('DELETE FROM code_functions WHERE file_id = ?', (file_id,))
+        cursor.executemany('''
+            INSERT INTO code_functions 
+            (file_id, function_name, class_name, line_start, line_end, 
+             code_snippet, docstring)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(file_id,) + definition for definition in record['definitions']])
+        
+        cursor.execute('DELETE FROM code_references WHERE file_id = ?', (file_id,))
+        cursor.executemany('''
+            INSERT INTO code_references (file_id, source, target, target_name, kind, line_number)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(file_id, source, target, target.rsplit('.', 1)[-1], kind, line)
+              for source, target, kind, line in record['references']])
+        return True
+    
+    def _delete_files(self, cursor, file_ids: List[int]):
+        """Drop files and everything indexed from them"""
+        rows = [(file_id,) for file_id in file_ids]
+        cursor.executemany('DELETE FROM code_functions WHERE file_id = ?', rows)
+        cursor.executemany('DELETE FROM code_patterns WHERE file_id = ?', rows)
+        cursor.executemany('DELETE FROM code_references WHERE file_id = ?', rows)
+        cursor.executemany('DELETE FROM code_files WHERE id = ?', rows)
+    
+    def _reference_rows(self, cursor, where: str, params: tuple) -> List[Dict]:
+        cursor.execute(f'''
+            SELECT r.source, r.target, r.kind, cf.filename, r.line_number
+            FROM code_references r JOIN code_files cf ON cf.id = r.file_id
+            WHERE {where}
+            ORDER BY cf.filename, r.line_number
+        ''', params)
+        return [{'source': row[0], 'target': row[1], 'kind': row[2], 'file': row[3], 'line': row[4]}
+                for row in cursor.fetchall()]
+    
+    def _callers(self, cursor, symbol: str, include_unresolved: bool) -> List[Dict]:
+        name = symbol.rsplit('.', 1)[-1]
+        if '.' not in symbol:
+            # A bare name matches every call to something with that name
+            return self._reference_rows(cursor, "r.target_name = ? AND r.kind = 'call'", (name,))
+        if include_unresolved:
+            return self._reference_rows(cursor, "r.target IN (?, ?) AND r.kind = 'call'",
+                                        (symbol, f"{UNRESOLVED}.{name}"))
+        return self._reference_rows(cursor, "r.target = ? AND r.kind = 'call'", (symbol,))
+    
+    def _dependencies(self, cursor, symbol: str) -> List[Dict]:
+        # The symbol itself plus everything nested in it (a class's methods);
+        # the range keeps the lookup on the source index
+        return self._reference_rows(cursor, "r.source = ? OR (r.source >= ? AND r.source < ?)",
+                                    (symbol, symbol + '.', symbol + '/'))
+    
+    def find_callers(self, symbol: str, include_unresolved: bool = True) -> List[Dict]:
+        """Call sites of symbol ('Class.method', 'function' or 'Class' for constructions)
+        
+        include_unresolved also returns obj.method() calls whose receiver type is unknown.
+        """
+        conn = sqlite3.connect(self.db_path)
+        results = self._callers(conn.cursor(), symbol, include_unresolved)
+        conn.close()
+        return results
+    
+    def find_dependencies(self, symbol: str) -> List[Dict]:
+        """Calls, imports, inheritance and attribute reads made by symbol and its members"""
+        conn = sqlite3.connect(self.db_path)
+        results = self._dependencies(conn.cursor(), symbol)
+        conn.close()
+        return results
+    
+    def _known_symbols(self, cursor) -> set:
+        cursor.execute('SELECT function_name, class_name FROM code_functions')
+        symbols = set()
+        for name, class_name in cursor.fetchall():
+            if name.startswith('class_') and name[6:] == class_name:
+                symbols.add(class_name)
+            elif class_name:
+                symbols.add(f"{class_name}.{name}")
+            else:
+                symbols.add(name)
+        return symbols
+    
+    def _closure(self, symbol: str, direction: str, max_depth: Optional[int]) -> Dict[str, int]:
+        """Breadth-first reachable symbols with their distance, cached until the index changes"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM code_index_state WHERE key = 'generation'")
+        generation = cursor.fetchone()[0]
+        if generation != self.closure_generation:
+            self.closure_cache = {}
+            self.closure_generation = generation
+        
+        key = (direction, symbol, max_depth)
+        if key in self.closure_cache:
             conn.close()
-            
-        except Exception as e:
-            print(f"Error indexing {filepath}: {e}")
+            return self.closure_cache[key]
+        
+        known = self._known_symbols(cursor) if direction == 'dependencies' else None
+        reached = {}
+        frontier = [symbol]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                if direction == 'callers':
+                    neighbours = [row['source'] for row in self._callers(cursor, current, False)]
+                else:
+                    neighbours = [row['target'] for row in self._dependencies(cursor, current)
+                                  if row['kind'] != 'attribute']
+                for neighbour in neighbours:
+                    if neighbour in reached or neighbour == symbol or neighbour.startswith(UNRESOLVED + '.'):
+                        continue
+                    reached[neighbour] = depth
+                    # Only project code has further edges worth following
+                    if known is None or neighbour in known:
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        
+        conn.close()
+        self.closure_cache[key] = reached
+        return reached
+    
+    def transitive_callers(self, symbol: str, max_depth: int = None) -> Dict[str, int]:
+        """Every function that reaches symbol through resolved calls, with its distance"""
+        return self._closure(symbol, 'callers', max_depth)
+    
+    def transitive_dependencies(self, symbol: str, max_depth: int = None) -> Dict[str, int]:
+        """Everything symbol uses directly or through project code, with its distance"""
+        return self._closure(symbol, 'dependencies', max_depth)
+    
+    def start_watching(self, project_path: str, interval: float = WATCH_INTERVAL,
+                       on_change: Callable = None):
+        """Re-index the project in a background thread whenever files change"""
+        self.watcher.start(lambda stop_event: self._reindex(project_path, on_change), interval)
     
-    def _parse_python_file(self, cursor, file_id: int, content: str):
-        """Parse Python file and extract functions/classes"""
+    def stop_watching(self):
+        self.watcher.stop()
+    
+    @property
+    def watching(self) -> bool:
+        return self.watcher.running
+    
+    def _reindex(self, project_path: str, on_change: Callable):
         try:
-            tree = ast.parse(content)
-            lines = content.split('\n')
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    docstring = ast.get_docstring(node) or ""
-                    class_name = None
-                    
-                    # Find parent class if any
-                    for parent in ast.walk(tree):
-                        if isinstance(parent, ast.ClassDef):
-                            for child in ast.walk(parent):
-                                if child is node:
-                                    class_name = parent.name
-                                    break
-                    
-                    cursor.execute('''
-                        INSERT INTO code_functions 
-                        (file_id, function_name, class_name, line_start, line_end, 
-                         code_snippet, docstring)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        file_id, node.name, class_name, node.lineno,
-                        node.end_lineno or node.lineno + 10,
-                        '\n'.join(lines[node.lineno-1:node.end_lineno or node.lineno+10]),
-                        docstring
-                    ))
-                
-                elif isinstance(node, ast.ClassDef):
-                    docstring = ast.get_docstring(node) or ""
-                    cursor.execute('''
-                        INSERT INTO code_functions 
-                        (file_id, function_name, class_name, line_start, line_end, 
-                         code_snippet, docstring)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        file_id, f"class_{node.name}", node.name, node.lineno,
-                        node.end_lineno or node.lineno + 20,
-                        '\n'.join(lines[node.lineno-1:node.end_lineno or node.lineno+20]),
-                        docstring
-                    ))
-        except:
-            pass
+            stats = self.index_project(project_path)
+            if on_change and (stats['indexed'] or stats['removed']):
+                on_change(stats)
+        except Exception as e:
+            print(f"Code index watch failed: {e}")
+    
+    def search(self, query: str, limit: int = SEARCH_LIMIT, any_word: bool = False) -> List[Dict]:
+        """Functions and classes matching every word of query (or any, for questions), best first"""
+        match = fts_any_query(query) if any_word else fts_query(query)
+        if not match:
+            return []
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if self.fts_enabled:
+            weights = ', '.join(map(str, SEARCH_WEIGHTS))
+            # An exact name match always comes first, then bm25 (lower is better)
+            cursor.execute(f'''
+                SELECT f.function_name, f.class_name, f.code_snippet,
+                       cf.filename, f.line_start, bm25(code_search, {weights}) AS rank
+                FROM code_search
+                JOIN code_functions f ON f.id = code_search.rowid
+                JOIN code_files cf ON f.file_id = cf.id
+                WHERE code_search MATCH ?
+                ORDER BY f.function_name = ? DESC, rank
+                LIMIT ?
+            ''', (match, query.strip(), limit))
+        else:
+            like = f'%{query}%'
+            cursor.execute('''
+                SELECT f.function_name, f.class_name, f.code_snippet, 
+                       cf.filename, f.line_start, 0
+                FROM code_functions f
+                JOIN code_files cf ON f.file_id = cf.id
+                WHERE f.function_name LIKE ? OR f.docstring LIKE ? OR f.code_snippet LIKE ?
+                ORDER BY f.function_name
+                LIMIT ?
+            ''', (like, like, like, limit))
+        
+        results = []
+        for row in cursor.fetchall():
+            results.append({
+                'function': row[0],
+                'class': row[1],
+                'code': row[2],
+                'file': row[3],
+                'line': row[4],
+                'score': -row[5]
+            })
+        
+        conn.close()
+        return results
+
+    def generation(self) -> int:
+        """Counter bumped by every change to the indexed files"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM code_index_state WHERE key = 'generation'")
+        generation = cursor.fetchone()[0]
+        conn.close()
+        return generation
+    
+    def retrieve_context(self, question: str, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                         limit: int = RETRIEVAL_LIMIT, include_tests: bool = False) -> Dict[str, any]:
+        """Best matching snippets for question, packed into token_budget for a prompt
+        
+        Test files are left out unless include_tests is set, since they
+        describe usage rather than how the code works. Results are cached
+        per query until the index changes.
+        """
+        generation = self.generation()
+        if generation != self.retrieval_generation:
+            self.retrieval_cache.clear()
+            self.retrieval_generation = generation
+        
+        key = (fts_any_query(question), token_budget, limit, include_tests)
+        if key in self.retrieval_cache:
+            self.retrieval_cache.move_to_end(key)
+            return self.retrieval_cache[key]
+        
+        parts = []
+        snippets = []
+        used = 0
+        results = [result for result in self.search(question, SEARCH_LIMIT, any_word=True)
+                   if include_tests or not result['file'].startswith('test_')]
+        for result in results[:limit]:
+            if any(result['code'] in included['code'] for included in snippets):
+                # A method already shown inside its class snippet
+                continue
+            if result['function'].startswith('class_'):
+                name = f"class {result['class']}"
+            elif result['class']:
+                name = f"{result['class']}.{result['function']}"
+            else:
+                name = result['function']
+            header = f"# {result['file']}:{result['line']} {name}"
+            lines = [header]
+            cost = estimate_tokens(header)
+            for line in result['code'].split('\n'):
+                line_cost = estimate_tokens(line) + 1
+                if used + cost + line_cost > token_budget:
+                    break
+                lines.append(line)
+                cost += line_cost
+            if len(lines) == 1:
+                # Not even the first line fits; smaller snippets further down might
+                continue
+            parts.append('\n'.join(lines))
+            snippets.append(result)
+            used += cost
+        
+        context = {'text': '\n\n'.join(parts), 'tokens': used, 'snippets': snippets}
+        self.retrieval_cache[key] = context
+        if len(self.retrieval_cache) > RETRIEVAL_CACHE_SIZE:
+            self.retrieval_cache.popitem(last=False)
+        return context
 
 class SmartEncryptAI:
     def __init__(self, project_path: str):
@@ -181,33 +755,37 @@ class SmartEncryptAI:
             ]
         }
     
-    def search_code(self, query: str) -> List[Dict]:
-        """Search for code snippets matching query"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Search in function names and docstrings
-        cursor.execute('''
-            SELECT f.function_name, f.class_name, f.code_snippet, 
-                   cf.filename, f.line_start
-            FROM code_functions f
-            JOIN code_files cf ON f.file_id = cf.id
-            WHERE f.function_name LIKE ? OR f.docstring LIKE ? OR f.code_snippet LIKE ?
-            ORDER BY f.function_name
-        ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'function': row[0],
-                'class': row[1],
-                'code': row[2],
-                'file': row[3],
-                'line': row[4]
-            })
-        
-        conn.close()
-        return results
+    def search_code(self, query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """Search for code snippets matching query, ranked by relevance"""
+        return self.indexer.search(query, limit)
+    
+    def who_calls(self, symbol: str, transitive: bool = False):
+        """Call sites of symbol, or every transitive caller with its distance"""
+        if transitive:
+            return self.indexer.transitive_callers(symbol)
+        return self.indexer.find_callers(symbol)
+    
+    def depends_on(self, symbol: str, transitive: bool = False):
+        """What symbol uses, directly or through other project code"""
+        if transitive:
+            return self.indexer.transitive_dependencies(symbol)
+        return self.indexer.find_dependencies(symbol)
+    
+    def answer_symbol_query(self, user_request: str) -> Optional[Dict]:
+        """Answer a cross-reference question, or None if the request is not one"""
+        match = CALLERS_QUESTION.search(user_request)
+        if match:
+            symbol = match.group(1).rstrip('.')
+            return {'type': 'references', 'direction': 'callers', 'symbol': symbol,
+                    'results': self.who_calls(symbol),
+                    'transitive': self.who_calls(symbol, transitive=True)}
+        match = DEPENDENCIES_QUESTION.search(user_request)
+        if match:
+            symbol = match.group(1).rstrip('.')
+            return {'type': 'references', 'direction': 'dependencies', 'symbol': symbol,
+                    'results': self.depends_on(symbol),
+                    'transitive': self.depends_on(symbol, transitive=True)}
+        return None
     
     def analyze_request(self, user_request: str) -> Dict:
         """Analyze user request and determine intent"""
@@ -381,6 +959,10 @@ def new_function(self, parameter):
     
     def process_request(self, user_request: str) -> Dict:
         """Process user request and return response"""
+        symbol_answer = self.answer_symbol_query(user_request)
+        if symbol_answer:
+            return symbol_answer
+        
         analysis = self.analyze_request(user_request)
         
         if analysis['intent'] == 'search':
@@ -1,60 +1,67 @@
 """AI Engine for Smart-Encrypt"""
-import re
 import hashlib
 import time
 import random
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Tuple
 import threading
+from text_analysis import (TextAnalyzer, TextAnalysis, PHISHING_INDICATORS, MALWARE_SIGNATURES,
+                           SENSITIVE_PATTERNS, CHUNK_SIZE, analyze_documents, iter_text_chunks)
+from anomaly_detection import batch_anomalies, StreamingAnomalyDetector
+from url_analysis import UrlAnalyzer
 
 class AIEngine:
     def __init__(self):
-        self.threat_patterns = [
-            r'(?i)(malware|virus|trojan|ransomware)',
-            r'(?i)(phishing|scam|fraud)',
-            r'(?i)(exploit|vulnerability|0day)',
-            r'(?i)(botnet|ddos|attack)',
-            r'(?i)(keylogger|spyware|backdoor)'
-        ]
-        
-        self.phishing_indicators = [
-            'urgent action required',
-            'verify your account',
-            'suspended account',
-            'click here immediately',
-            'limited time offer'
-        ]
-        
-        self.malware_signatures = {
-            'trojan': ['CreateRemoteThread', 'WriteProcessMemory', 'VirtualAllocEx'],
-            'ransomware': ['CryptEncrypt', 'FindFirstFile', 'MoveFile'],
-            'keylogger': ['GetAsyncKeyState', 'SetWindowsHookEx', 'CallNextHookEx']
+        self.text_analyzer = TextAnalyzer()
+        self.url_analyzer = UrlAnalyzer()
+        self.phishing_indicators = PHISHING_INDICATORS
+        self.malware_signatures = MALWARE_SIGNATURES
+    
+    def analyze_text(self, text: str) -> Dict:
+        """Run threat, phishing, malware and pattern analysis from one scan of the text"""
+        return self._combined_result(self.text_analyzer.analyze(text))
+    
+    def analyze_many(self, documents: Iterable[str], workers: int = None,
+                     ordered: bool = True) -> Iterator[Tuple[int, Dict]]:
+        """Stream (index, analyze_text result) for each document using a process pool
+        
+        Pass ordered=False to get results as soon as they finish, e.g. to triage a
+        mailbox with text_analysis.iter_mbox_messages.
+        """
+        for index, analysis in analyze_documents(documents, workers, ordered):
+            yield index, self._combined_result(analysis)
+    
+    def analyze_file(self, file_path: str, workers: int = None, chunk_size: int = CHUNK_SIZE) -> Dict:
+        """Analyze a large text file chunk by chunk in parallel and merge the results"""
+        merged = TextAnalysis()
+        chunks = 0
+        for _, analysis in analyze_documents(iter_text_chunks(file_path, chunk_size), workers,
+                                             ordered=True, task_characters=chunk_size):
+            merged.merge(analysis)
+            chunks += 1
+        
+        result = self._combined_result(merged)
+        result['chunks'] = chunks
+        result['characters'] = merged.characters
+        return result
+    
+    def _combined_result(self, analysis: TextAnalysis) -> Dict:
+        return {
+            'threat_intelligence': self._threat_result(analysis),
+            'phishing': self._phishing_result(analysis),
+            'malware': self._malware_result(analysis),
+            'patterns': self._pattern_result(analysis)
         }
     
     def analyze_threat_intelligence(self, text: str) -> Dict:
         """Analyze text for threat intelligence"""
-        threats = []
-        confidence = 0
-        
-        for pattern in self.threat_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                threats.extend(matches)
-                confidence += len(matches) * 20
-        
-        # Analyze suspicious patterns
-        suspicious_patterns = [
-            r'(?i)\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b',  # IP addresses
-            r'(?i)[a-z0-9]{32,}',  # Long hex strings (hashes)
-            r'(?i)(base64|encoded|encrypted)',
-            r'(?i)(payload|shellcode|exploit)'
-        ]
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, text):
-                confidence += 10
+        return self._threat_result(self.text_analyzer.analyze(text))
+    
+    def _threat_result(self, analysis: TextAnalysis) -> Dict:
+        threats = list(analysis.threat_terms)
+        confidence = analysis.threat_count * 20 + len(analysis.suspicious_categories) * 10
         
         return {
-            'threats_detected': list(set(threats)),
+            'threats_detected': threats,
             'confidence_score': min(confidence, 100),
             'risk_level': self._calculate_risk_level(confidence),
             'recommendations': self._generate_recommendations(threats)
@@ -62,21 +69,16 @@ class AIEngine:
     
     def classify_malware(self, file_content: str) -> Dict:
         """Classify potential malware based on content"""
-        classifications = []
-        confidence_scores = {}
-        
-        for malware_type, signatures in self.malware_signatures.items():
-            matches = 0
-            for signature in signatures:
-                if signature.lower() in file_content.lower():
-                    matches += 1
-            
-            if matches > 0:
-                classifications.append(malware_type)
-                confidence_scores[malware_type] = (matches / len(signatures)) * 100
+        return self._malware_result(self.text_analyzer.analyze(file_content))
+    
+    def _malware_result(self, analysis: TextAnalysis) -> Dict:
+        confidence_scores = {
+            malware_type: (matches / len(self.malware_signatures[malware_type])) * 100
+            for malware_type, matches in analysis.malware_matches().items()
+        }
         
         return {
-            'classifications': classifications,
+            'classifications': list(confidence_scores),
             'confidence_scores': confidence_scores,
             'total_signatures': sum(len(sigs) for sigs in self.malware_signatures.values()),
             'matches_found': sum(confidence_scores.values()) / 100 if confidence_scores else 0
@@ -84,21 +86,12 @@ class AIEngine:
     
     def detect_phishing(self, text: str) -> Dict:
         """Detect phishing attempts in text"""
-        indicators_found = []
-        
-        for indicator in self.phishing_indicators:
-            if indicator.lower() in text.lower():
-                indicators_found.append(indicator)
-        
-        # Check for suspicious URLs
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        urls = re.findall(url_pattern, text)
-        
-        suspicious_urls = []
-        for url in urls:
-            if any(suspicious in url.lower() for suspicious in ['bit.ly', 'tinyurl', 'short']):
-                suspicious_urls.append(url)
-        
+        return self._phishing_result(self.text_analyzer.analyze(text))
+    
+    def _phishing_result(self, analysis: TextAnalysis) -> Dict:
+        indicators_found = analysis.phishing_indicators
+        url_results = [r for r in self.url_analyzer.analyze_urls(analysis.patterns['urls']) if r['suspicious']]
+        suspicious_urls = [r['url'] for r in url_results]
         risk_score = len(indicators_found) * 20 + len(suspicious_urls) * 15
         
         return {
@@ -106,6 +99,7 @@ class AIEngine:
             'risk_score': min(risk_score, 100),
             'indicators_found': indicators_found,
             'suspicious_urls': suspicious_urls,
+            'url_analysis': url_results,
             'recommendation': 'HIGH RISK - Do not click links' if risk_score > 50 else 'MEDIUM RISK - Verify sender'
         }
     
@@ -114,42 +108,28 @@ class AIEngine:
         if len(data_points) < 3:
             return {'anomalies': [], 'threshold': 0}
         
-        mean = sum(data_points) / len(data_points)
-        variance = sum((x - mean) ** 2 for x in data_points) / len(data_points)
-        std_dev = variance ** 0.5
-        
-        threshold = mean + (2 * std_dev)  # 2 standard deviations
-        anomalies = [i for i, x in enumerate(data_points) if x > threshold]
-        
-        return {
-            'anomalies': anomalies,
-            'threshold': threshold,
-            'mean': mean,
-            'std_deviation': std_dev,
-            'anomaly_count': len(anomalies)
-        }
+        return batch_anomalies(data_points, sigma=2.0)  # 2 standard deviations
+    
+    def stream_anomaly_detection(self, values: Iterable[float], window: int = 60,
+                                 z_threshold: float = 3.0) -> Iterator[Dict]:
+        """Score an unbounded metric stream value by value against its recent history"""
+        return StreamingAnomalyDetector(window=window, z_threshold=z_threshold).stream(values)
     
     def pattern_recognition(self, text: str) -> Dict:
         """Recognize patterns in text data"""
-        patterns = {
-            'email_addresses': re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text),
-            'ip_addresses': re.findall(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', text),
-            'phone_numbers': re.findall(r'\b\d{3}-\d{3}-\d{4}\b|\b\(\d{3}\)\s*\d{3}-\d{4}\b', text),
-            'credit_cards': re.findall(r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b', text),
-            'social_security': re.findall(r'\b\d{3}-\d{2}-\d{4}\b', text),
-            'urls': re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text),
-            'bitcoin_addresses': re.findall(r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b', text),
-            'file_hashes': re.findall(r'\b[a-fA-F0-9]{32}\b|\b[a-fA-F0-9]{40}\b|\b[a-fA-F0-9]{64}\b', text)
-        }
+        return self._pattern_result(self.text_analyzer.analyze(text))
+    
+    def _pattern_result(self, analysis: TextAnalysis) -> Dict:
+        counts = analysis.pattern_counts
         
         # Calculate sensitivity score
-        sensitive_count = sum(len(patterns[key]) for key in ['credit_cards', 'social_security', 'bitcoin_addresses'])
+        sensitive_count = sum(counts[key] for key in SENSITIVE_PATTERNS)
         sensitivity_score = min(sensitive_count * 25, 100)
         
         return {
-            'patterns': patterns,
+            'patterns': analysis.patterns,
             'sensitivity_score': sensitivity_score,
-            'total_patterns': sum(len(v) for v in patterns.values()),
+            'total_patterns': sum(counts.values()),
             'high_risk_patterns': sensitive_count
         }
     
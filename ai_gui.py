@@ -3,16 +3,30 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
 import traceback
-from ai_assistant import SmartEncryptAI
-from ai_model import LightweightCodeModel
+from functools import cached_property
+
+# System prompt for the code assistant when it answers with the shared local model
+ASSISTANT_PERSONALITY = ("You are Smart-Encrypt AI, a concise coding assistant for the Smart-Encrypt "
+                         "Python codebase (Tkinter GUI, Fernet encryption, SQLite storage, OSINT tools). "
+                         "Answer directly and format code in markdown blocks.")
+ASSISTANT_LATENCY_BUDGET = 60.0
 
 class AIAssistantGUI:
     def __init__(self, parent_gui):
         self.parent = parent_gui
-        self.ai_core = SmartEncryptAI(parent_gui.storage.db_path.replace('notes.db', ''))
-        self.ai_model = LightweightCodeModel()
         self.ai_window = None
     
+    @cached_property
+    def ai_core(self):
+        """Code index of the project, built when the assistant is first opened"""
+        from ai_assistant import SmartEncryptAI
+        return SmartEncryptAI(self.parent.storage.db_path.replace('notes.db', ''))
+    
+    @cached_property
+    def ai_model(self):
+        from ai_model import LightweightCodeModel
+        return LightweightCodeModel()
+    
     def show_ai_assistant(self):
         """Show AI Assistant interface"""
         if self.ai_window and self.ai_window.winfo_exists():
@@ -115,6 +129,11 @@ class AIAssistantGUI:
         
         def process_chat():
             try:
+                reply = self._model_reply(message)
+                if reply:
+                    self.ai_window.after(0, lambda: self._replace_last_message("AI", reply))
+                    return
+                
                 # Real conversational AI responses
                 message_lower = message.lower()
                 
@@ -167,6 +186,15 @@ class AIAssistantGUI:
         
         threading.Thread(target=process_chat, daemon=True).start()
     
+    def _model_reply(self, message):
+        """Answer with the model Aaliya has loaded, queued behind any generation in progress"""
+        inference = self.parent.inference
+        if not inference.manager.is_loaded:
+            return None
+        request = inference.submit(message, max_latency=ASSISTANT_LATENCY_BUDGET,
+                                   personality=ASSISTANT_PERSONALITY)
+        return request.result().strip()
+    
     def _quick_chat(self, message):
         """Send quick chat message"""
         self.chat_entry.delete(0, tk.END)
@@ -374,10 +402,14 @@ class AIAssistantGUI:
         
         def process_async():
             try:
+                # Cross-reference questions are answered from the code index
+                symbol_answer = self.ai_core.answer_symbol_query(request)
                 # Use lightweight model for better code generation
-                intent = self.ai_model.analyze_intent(request)
+                intent = None if symbol_answer else self.ai_model.analyze_intent(request)
                 
-                if intent['confidence'] > 0.5:
+                if symbol_answer:
+                    response = symbol_answer
+                elif intent['confidence'] > 0.5:
                     # Use lightweight model
                     generated_code = self.ai_model.generate_code(intent)
                     response = {
@@ -429,6 +461,25 @@ class AIAssistantGUI:
                 self.response_text.insert(tk.END, f" - {result['file']}:{result['line']}\n")
                 self.response_text.insert(tk.END, "-" * 40 + "\n")
                 self.response_text.insert(tk.END, result['code'][:200] + "...\n\n")
+        
+        elif response['type'] == 'references':
+            results = response['results']
+            if response['direction'] == 'callers':
+                self.response_text.insert(tk.END, f"📞 {len(results)} call sites of {response['symbol']}:\n\n")
+                for result in results:
+                    self.response_text.insert(tk.END, f"  {result['source']} - {result['file']}:{result['line']}\n")
+                label = "Indirect callers"
+            else:
+                self.response_text.insert(tk.END, f"🔗 {response['symbol']} depends on:\n\n")
+                for target in sorted({result['target'] for result in results}):
+                    self.response_text.insert(tk.END, f"  {target}\n")
+                label = "Through project code"
+            
+            indirect = sorted((depth, name) for name, depth in response['transitive'].items() if depth > 1)
+            if indirect:
+                self.response_text.insert(tk.END, f"\n{label} ({len(indirect)}):\n")
+                for depth, name in indirect[:50]:
+                    self.response_text.insert(tk.END, f"  {'  ' * (depth - 1)}{name}\n")
     
     def _display_error(self, error_msg):
         """Display error message"""
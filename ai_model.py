@@ -2,8 +2,15 @@
 import json
 import re
 import os
+from collections import deque
 from typing import Dict, List, Tuple
 import sqlite3
+from suggestion_index import SuggestionIndex, with_dotted_prefixes
+
+# One pass over learned code: whole import lines, or identifier chains
+CODE_TOKEN = re.compile(r'^[ \t]*(?:from[ \t]+\S+[ \t]+)?import[ \t]+([^\n]+)|[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*',
+                        re.MULTILINE)
+CONTEXT_MEMORY_SIZE = 50
 
 class LightweightCodeModel:
     """Simple rule-based model for code generation - under 1MB"""
@@ -12,7 +19,9 @@ class LightweightCodeModel:
         self.model_path = model_path or "smart_encrypt_model.json"
         self.patterns = self._load_patterns()
         self.templates = self._load_templates()
-        self.context_memory = []
+        self.context_memory = deque(maxlen=CONTEXT_MEMORY_SIZE)
+        # Loaded from disk on first use
+        self.suggestions = SuggestionIndex(os.path.splitext(self.model_path)[0] + '_suggestions.db')
         
     def _load_patterns(self) -> Dict:
         """Load code patterns and rules"""
@@ -342,17 +351,27 @@ def {action}_{params['name']}(self):
     pass'''
     
     def learn_from_code(self, code: str, context: str = None):
-        """Learn patterns from existing code (simple pattern extraction)"""
-        # Extract function definitions
-        functions = re.findall(r'def\s+(\w+)\s*\([^)]*\):', code)
-        
-        # Extract class definitions
-        classes = re.findall(r'class\s+(\w+)\s*[:\(]', code)
-        
-        # Extract imports
-        imports = re.findall(r'(?:from\s+\S+\s+)?import\s+([^\n]+)', code)
-        
-        # Store in context memory
+        """Learn identifiers and definitions from existing code in one pass"""
+        functions, classes, imports, chains = [], [], [], []
+        previous = None
+        for match in CODE_TOKEN.finditer(code):
+            imported = match.group(1)
+            if imported is not None:
+                imports.append(imported)
+                chains.extend(re.findall(r'[A-Za-z_][\w.]*', imported))
+                previous = None
+                continue
+            token = match.group(0)
+            if previous == 'def':
+                functions.append(token)
+            elif previous == 'class':
+                classes.append(token)
+            chains.append(token)
+            previous = token
+        
+        self.suggestions.learn(with_dotted_prefixes(chains))
+        
+        # Keep only the last CONTEXT_MEMORY_SIZE entries
         self.context_memory.append({
             'code': code[:500],  # First 500 chars
             'functions': functions,
@@ -360,14 +379,10 @@ def {action}_{params['name']}(self):
             'imports': imports,
             'context': context
         })
-        
-        # Keep only last 50 entries
-        if len(self.context_memory) > 50:
-            self.context_memory = self.context_memory[-50:]
     
     def get_suggestions(self, partial_code: str) -> List[str]:
-        """Get code completion suggestions"""
-        suggestions = []
+        """Get code completion suggestions, learned identifiers first"""
+        suggestions = self.suggestions.suggest(partial_code)
         
         # Common Smart-Encrypt patterns
         if 'tk.' in partial_code:
@@ -388,18 +403,19 @@ def {action}_{params['name']}(self):
                 'conn.commit()', 'conn.close()'
             ])
         
-        return suggestions[:10]  # Top 10 suggestions
+        return list(dict.fromkeys(suggestions))[:10]  # Top 10 suggestions
     
     def save_model(self):
         """Save model state to file"""
         model_data = {
             'patterns': self.patterns,
             'templates': self.templates,
-            'context_memory': self.context_memory[-20:]  # Save last 20 entries
+            'context_memory': list(self.context_memory)[-20:]  # Save last 20 entries
         }
         
         with open(self.model_path, 'w') as f:
-            json.dump(model_data, f, indent=2)
+            json.dump(model_data, f, separators=(',', ':'))
+        self.suggestions.save()
     
     def load_model(self):
         """Load model state from file"""
@@ -410,7 +426,7 @@ def {action}_{params['name']}(self):
                 
                 self.patterns.update(model_data.get('patterns', {}))
                 self.templates.update(model_data.get('templates', {}))
-                self.context_memory = model_data.get('context_memory', [])
+                self.context_memory.extend(model_data.get('context_memory', []))
                 
             except Exception as e:
                 print(f"Error loading model: {e}")
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""Batch and streaming anomaly detection for Smart-Encrypt"""
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, List
+
+DEFAULT_WINDOW = 60
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_EWMA_ALPHA = 0.1
+DEFAULT_WARMUP = 10
+# Event counts are whole numbers: a history that never varied is still a
+# spread of about one event, not zero, so a single extra event is no spike
+MIN_RATE_STD = 1.0
+# Intervals with fewer events than this never alert, however quiet the baseline
+MIN_ALERT_COUNT = 10
+
+def batch_anomalies(data_points: Iterable[float], sigma: float = 2.0) -> Dict[str, any]:
+    """Indices of points more than sigma standard deviations above the mean"""
+    values = np.asarray(data_points, dtype=np.float64)
+    mean = float(values.mean())
+    std_dev = float(values.std())
+    threshold = mean + sigma * std_dev
+    anomalies = np.flatnonzero(values > threshold).tolist()
+
+    return {
+        'anomalies': anomalies,
+        'threshold': threshold,
+        'mean': mean,
+        'std_deviation': std_dev,
+        'anomaly_count': len(anomalies)
+    }
+
+def _zscore(value: float, mean: float, std_dev: float) -> float:
+    if std_dev > 0:
+        return (value - mean) / std_dev
+    if value == mean:
+        return 0.0
+    return math.copysign(math.inf, value - mean)
+
+class StreamingAnomalyDetector:
+    """Scores an unbounded metric stream in O(1) time and memory per value
+
+    Each value is scored against the history before it: a rolling window
+    (ring buffer with running sums), an exponentially weighted mean and
+    variance, and the all-time mean and variance via Welford's method.
+    Z-scores divide by at least min_std, so a constant history does not turn
+    every small change into an infinite score.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, z_threshold: float = DEFAULT_Z_THRESHOLD,
+                 alpha: float = DEFAULT_EWMA_ALPHA, warmup: int = DEFAULT_WARMUP, min_std: float = 0.0):
+        self.window = window
+        self.z_threshold = z_threshold
+        self.alpha = alpha
+        self.warmup = warmup
+        self.min_std = min_std
+
+        self.ring = np.zeros(window)
+        self.ring_index = 0
+        self.ring_sum = 0.0
+        self.ring_sumsq = 0.0
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        self.ewma = 0.0
+        self.ewm_var = 0.0
+
+    def _rolling_stats(self) -> tuple:
+        n = min(self.count, self.window)
+        if n == 0:
+            return 0.0, 0.0
+        mean = self.ring_sum / n
+        variance = max(self.ring_sumsq / n - mean * mean, 0.0)
+        return mean, math.sqrt(variance)
+
+    def score(self, value: float) -> Dict[str, any]:
+        """Score a value against the history without recording it"""
+        rolling_mean, rolling_std = self._rolling_stats()
+        global_std = math.sqrt(self.m2 / self.count) if self.count else 0.0
+        zscore = _zscore(value, rolling_mean, max(rolling_std, self.min_std))
+
+        return {
+            'value': value,
+            'count': self.count,
+            'rolling_mean': rolling_mean,
+            'rolling_std': rolling_std,
+            'zscore': zscore,
+            'ewma': self.ewma,
+            'ewma_zscore': _zscore(value, self.ewma, max(math.sqrt(self.ewm_var), self.min_std)),
+            'global_mean': self.mean,
+            'global_zscore': _zscore(value, self.mean, max(global_std, self.min_std)),
+            'is_anomaly': self.count >= self.warmup and zscore > self.z_threshold
+        }
+
+    def update(self, value: float) -> Dict[str, any]:
+        """Score a value, then fold it into the running statistics"""
+        value = float(value)
+        result = self.score(value)
+
+        # Rolling window: swap the oldest value out of the running sums
+        old = self.ring[self.ring_index]
+        self.ring[self.ring_index] = value
+        self.ring_sum += value - old
+        self.ring_sumsq += value * value - old * old
+        self.ring_index = (self.ring_index + 1) % self.window
+        if self.ring_index == 0:
+            # Resync once per lap so floating point drift cannot build up
+            self.ring_sum = float(self.ring.sum())
+            self.ring_sumsq = float(np.dot(self.ring, self.ring))
+
+        # Welford's online mean and variance
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        # Exponentially weighted mean and variance
+        if self.count == 1:
+            self.ewma = value
+        else:
+            diff = value - self.ewma
+            increment = self.alpha * diff
+            self.ewma += increment
+            self.ewm_var = (1 - self.alpha) * (self.ewm_var + diff * increment)
+
+        return result
+
+    def stream(self, values: Iterable[float]) -> Iterator[Dict[str, any]]:
+        """Score every value of a (possibly unbounded) stream as it arrives"""
+        for value in values:
+            yield self.update(value)
+
+class EventRateMonitor:
+    """Turns individual events into per-interval rates and scores them
+
+    Each closed interval that saw events is scored and folded into the
+    baseline; the open interval alerts early once its running count alone is
+    anomalous. Idle intervals are not scored: a quiet vault says nothing
+    about its normal access rate, and counting them as zero would make the
+    first access after a break look like a spike. An interval alerts only
+    with at least min_count events.
+    """
+
+    def __init__(self, detector: StreamingAnomalyDetector = None, interval: float = 60.0,
+                 alert_callback: Callable = None, min_count: int = MIN_ALERT_COUNT):
+        self.detector = detector or StreamingAnomalyDetector(min_std=MIN_RATE_STD)
+        self.interval = interval
+        self.alert_callback = alert_callback
+        self.min_count = min_count
+        self.bucket_start = None
+        self.bucket_count = 0
+        self.bucket_alerted = False
+
+    def record(self, timestamp: float = None) -> List[Dict]:
+        """Count one event; returns scores for intervals it closed and any early alert"""
+        timestamp = time.time() if timestamp is None else timestamp
+        results = self.flush(timestamp)
+        self.bucket_count += 1
+
+        # A spike is visible before its interval closes: alert as soon as the
+        # running count alone is anomalous, once per interval
+        if not self.bucket_alerted:
+            result = self.detector.score(self.bucket_count)
+            if result['is_anomaly'] and self.bucket_count >= self.min_count:
+                self.bucket_alerted = True
+                result['interval_start'] = self.bucket_start
+                result['partial'] = True
+                results.append(result)
+                if self.alert_callback:
+                    self.alert_callback(result)
+        return results
+
+    def flush(self, now: float = None) -> List[Dict]:
+        """Close the open interval if it ended before now; idle intervals are skipped"""
+        now = time.time() if now is None else now
+        if self.bucket_start is None:
+            self.bucket_start = now - now % self.interval
+            return []
+
+        results = []
+        closed = int((now - self.bucket_start) // self.interval)
+        if closed and self.bucket_count:
+            result = self.detector.update(self.bucket_count)
+            result['interval_start'] = self.bucket_start
+            result['partial'] = False
+            results.append(result)
+            if (result['is_anomaly'] and self.bucket_count >= self.min_count and
+                    not self.bucket_alerted and self.alert_callback):
+                self.alert_callback(result)
+        if closed:
+            self.bucket_start += closed * self.interval
+            self.bucket_count = 0
+            self.bucket_alerted = False
+        return results
@@ -5,25 +5,18 @@ Production-ready encrypted notes manager
 """
 import sys
 import os
+from importlib.util import find_spec
+from startup_profile import enable_from_argv
 
 def check_dependencies():
     """Check if required dependencies are available"""
     missing = []
     
-    try:
-        import cryptography
-    except ImportError:
-        missing.append('cryptography')
-    
-    try:
-        import numpy
-    except ImportError:
-        missing.append('numpy')
-    
-    try:
-        import tkinter
-    except ImportError:
-        missing.append('tkinter')
+    # find_spec only locates a package; importing numpy here would add to
+    # every launch although only the audio and AI tools use it
+    for module in ('cryptography', 'numpy', 'tkinter'):
+        if find_spec(module) is None:
+            missing.append(module)
     
     if missing:
         print("Missing required dependencies:")
@@ -35,6 +28,7 @@ def check_dependencies():
     return True
 
 def main():
+    enable_from_argv()
     print("◉ SMART-ENCRYPT v1.0 ◉")
     print("Secure Personal Vault")
     print("=" * 30)
@@ -0,0 +1,334 @@
+"""Parallel bulk directory scanning for the Honeypot Defense System"""
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from honeypot import FileThreatAnalyzer
+
+TASK_SIZE = 32  # files per worker task, amortizes process round trips
+LOG_BATCH_SIZE = 500
+TASKS_IN_FLIGHT_PER_WORKER = 4
+PROGRESS_INTERVAL = 0.25
+
+_worker_analyzer = None
+
+def _init_worker():
+    """Create one analyzer per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = FileThreatAnalyzer()
+
+def _analyze_batch(paths: List[str]) -> List[Dict]:
+    results = []
+    for path in paths:
+        try:
+            results.append(_worker_analyzer.analyze_file(path))
+        except Exception as e:
+            results.append({'file_path': path, 'error': str(e)})
+    return results
+
+def _sorted_entries(path: str) -> list:
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return []
+
+def walk_files(root: str, resume_after: Optional[tuple] = None) -> Iterator[Tuple[str, tuple, int]]:
+    """Yield (path, key, size) for every regular file in sorted depth-first order
+
+    Keys are tuples of path components relative to root, so walk order is key order
+    and a checkpoint key is enough to skip everything that was already scanned.
+    """
+    stack = [((), iter(_sorted_entries(root)))]
+    while stack:
+        prefix, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        key = prefix + (entry.name,)
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                # Skip subtrees that sort entirely before the checkpoint
+                if resume_after and key < resume_after[:len(key)]:
+                    continue
+                stack.append((key, iter(_sorted_entries(entry.path))))
+            elif entry.is_file(follow_symlinks=False):
+                if resume_after and key <= resume_after:
+                    continue
+                yield entry.path, key, entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+
+class BulkScanner:
+    """Fan a directory tree out to a process pool and stream results into the honeypot logs"""
+
+    def __init__(self, honeypot, workers: int = None, checkpoint_path: str = None):
+        self.honeypot = honeypot
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path or os.path.expanduser('~/.smart_encrypt/bulk_scan_checkpoint.json')
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Stop dispatching work; in-flight results are still recorded"""
+        self.cancel_event.set()
+
+    def load_checkpoint(self, root: str) -> Optional[Dict]:
+        """Return the saved checkpoint for root, if any"""
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get('root') != os.path.abspath(root):
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, root: str, last_key: tuple, stats: Dict):
+        checkpoint = {
+            'root': os.path.abspath(root),
+            'last_key': list(last_key),
+            'files_scanned': stats['files_scanned'],
+            'threats_found': stats['threats_found'],
+            'updated_at': time.time()
+        }
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    def scan(self, root: str, progress_callback: Callable = None, resume: bool = False) -> Dict[str, any]:
+        """Scan every file under root and return a summary"""
+        self.cancel_event.clear()
+        root = os.path.abspath(root)
+
+        resume_after = None
+        stats = {
+            'root': root,
+            'files_discovered': 0,
+            'bytes_discovered': 0,
+            'files_scanned': 0,
+            'bytes_scanned': 0,
+            'cached': 0,
+            'errors': 0,
+            'failed_tasks': 0,
+            'threats_found': 0,
+            'walk_complete': False,
+            'cancelled': False,
+            'resumed_from': 0
+        }
+        if resume:
+            checkpoint = self.load_checkpoint(root)
+            if checkpoint:
+                resume_after = tuple(checkpoint['last_key'])
+                stats['resumed_from'] = checkpoint['files_scanned']
+                stats['files_scanned'] = checkpoint['files_scanned']
+                stats['threats_found'] = checkpoint['threats_found']
+
+        started = time.time()
+        scanned_at_start = stats['files_scanned']
+        last_progress = 0.0
+        pending_logs = []
+        pending_cache = []
+
+        # Tasks complete out of order; the checkpoint only advances past a
+        # contiguous run of finished tasks so a resume never skips unscanned files
+        task_last_key = {}
+        finished_tasks = set()
+        next_task_to_commit = 0
+        committed_key = resume_after or ()
+        # Counts saved with the checkpoint cover only committed tasks; files
+        # past the committed key are scanned (and counted) again on resume
+        task_counts = {}
+        committed_counts = {'files_scanned': stats['files_scanned'],
+                            'threats_found': stats['threats_found']}
+
+        def record(results: List[Dict], fresh: bool, task_id: int):
+            counts = task_counts.setdefault(task_id, {'files_scanned': 0, 'threats_found': 0})
+            for result in results:
+                stats['files_scanned'] += 1
+                counts['files_scanned'] += 1
+                if 'error' in result:
+                    stats['errors'] += 1
+                    continue
+                stats['bytes_scanned'] += result.get('file_size') or 0
+                if fresh and result.get('file_hash'):
+                    pending_cache.append((result['file_path'], result))
+                if result['threat_level'] in ['MEDIUM', 'HIGH']:
+                    stats['threats_found'] += 1
+                    counts['threats_found'] += 1
+                    pending_logs.append((result['file_path'], result))
+
+        def flush(force: bool = False):
+            if not force and len(pending_logs) + len(pending_cache) < LOG_BATCH_SIZE:
+                return
+            if pending_logs:
+                self.honeypot._log_honeypot_events('BULK_SCAN_THREAT', pending_logs)
+                pending_logs.clear()
+            if pending_cache:
+                self.honeypot.scan_cache.put_many(pending_cache)
+                pending_cache.clear()
+            if committed_key:
+                self._save_checkpoint(root, committed_key, committed_counts)
+
+        def report(force: bool = False):
+            nonlocal last_progress
+            now = time.time()
+            if not progress_callback or (not force and now - last_progress < PROGRESS_INTERVAL):
+                return
+            last_progress = now
+            elapsed = max(now - started, 1e-6)
+            files_rate = (stats['files_scanned'] - scanned_at_start) / elapsed
+            bytes_rate = stats['bytes_scanned'] / elapsed
+            eta = None
+            if stats['walk_complete'] and bytes_rate > 0:
+                eta = max(stats['bytes_discovered'] - stats['bytes_scanned'], 0) / bytes_rate
+            progress_callback(dict(stats, elapsed=elapsed, files_per_sec=files_rate,
+                                   mb_per_sec=bytes_rate / (1024 * 1024), eta_seconds=eta))
+
+        def task_done(task_id: int):
+            nonlocal next_task_to_commit, committed_key
+            finished_tasks.add(task_id)
+            while next_task_to_commit in finished_tasks:
+                finished_tasks.discard(next_task_to_commit)
+                committed_key = task_last_key.pop(next_task_to_commit)
+                for name, count in task_counts.pop(next_task_to_commit, {}).items():
+                    committed_counts[name] += count
+                next_task_to_commit += 1
+
+        walker = walk_files(root, resume_after)
+        max_in_flight = self.workers * TASKS_IN_FLIGHT_PER_WORKER
+        in_flight = {}
+        task_id = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            while True:
+                # Top up the pool while the walk continues
+                while not stats['walk_complete'] and len(in_flight) < max_in_flight and not self.cancel_event.is_set():
+                    batch = []
+                    for path, key, size in walker:
+                        batch.append((path, key))
+                        stats['files_discovered'] += 1
+                        stats['bytes_discovered'] += size
+                        if len(batch) >= TASK_SIZE:
+                            break
+                    else:
+                        stats['walk_complete'] = True
+                    if not batch:
+                        break
+
+                    task_last_key[task_id] = batch[-1][1]
+                    paths = [path for path, _ in batch]
+                    cached = self.honeypot.scan_cache.get_many(paths)
+                    hits = [result for result in cached.values() if result is not None]
+                    misses = [path for path in paths if cached[path] is None]
+                    stats['cached'] += len(hits)
+                    record(hits, fresh=False, task_id=task_id)
+
+                    if misses:
+                        in_flight[executor.submit(_analyze_batch, misses)] = task_id
+                    else:
+                        task_done(task_id)
+                    task_id += 1
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(list(in_flight), timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    done_id = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception:
+                        # Never committed, so the checkpoint stops before its files
+                        stats['errors'] += 1
+                        stats['failed_tasks'] += 1
+                        continue
+                    record(results, fresh=True, task_id=done_id)
+                    task_done(done_id)
+
+                flush()
+                report()
+
+                if self.cancel_event.is_set():
+                    for future in in_flight:
+                        future.cancel()
+                    # Keep results from tasks that were already running
+                    for future, running_id in list(in_flight.items()):
+                        if not future.cancelled():
+                            try:
+                                results = future.result()
+                            except Exception:
+                                stats['errors'] += 1
+                                stats['failed_tasks'] += 1
+                                continue
+                            record(results, fresh=True, task_id=running_id)
+                            task_done(running_id)
+                    in_flight.clear()
+                    stats['cancelled'] = True
+                    break
+
+        flush(force=True)
+        stats['elapsed'] = time.time() - started
+        report(force=True)
+
+        if stats['cancelled']:
+            self.honeypot._log_honeypot_event('BULK_SCAN_CANCELLED', root, dict(stats))
+        elif stats['failed_tasks']:
+            # The checkpoint stops at the first failed task, so --resume scans its files again
+            self.honeypot._log_honeypot_event('BULK_SCAN_INCOMPLETE', root, dict(stats))
+        else:
+            self.clear_checkpoint()
+            self.honeypot._log_honeypot_event('BULK_SCAN_COMPLETE', root, dict(stats))
+
+        return stats
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Render an ETA in seconds as H:MM:SS"""
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def main():
+    import argparse
+    from storage import StorageManager
+    from honeypot import HoneypotDefenseSystem
+
+    parser = argparse.ArgumentParser(description="Bulk honeypot scan of a directory tree")
+    parser.add_argument('root', help="Directory to scan")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--resume', action='store_true', help="Continue from the last checkpoint")
+    args = parser.parse_args()
+
+    scanner = BulkScanner(HoneypotDefenseSystem(StorageManager()), workers=args.workers)
+
+    def progress(p):
+        sys.stdout.write(f"\r{p['files_scanned']:,}/{p['files_discovered']:,} files  "
+                         f"{p['files_per_sec']:,.0f} files/s  {p['mb_per_sec']:.1f} MB/s  "
+                         f"threats: {p['threats_found']}  ETA {format_eta(p['eta_seconds'])}  ")
+        sys.stdout.flush()
+
+    try:
+        summary = scanner.scan(args.root, progress, resume=args.resume)
+    except KeyboardInterrupt:
+        print("\n[!] Scan interrupted; rerun with --resume to continue")
+        return
+
+    print(f"\nScanned {summary['files_scanned']:,} files, {summary['threats_found']} threats, "
+          f"{summary['cached']:,} from cache, {summary['errors']} errors")
+    if summary['failed_tasks']:
+        print(f"[!] {summary['failed_tasks']} batches failed; rerun with --resume to scan them again")
+
+if __name__ == "__main__":
+    main()
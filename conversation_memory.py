@@ -0,0 +1,183 @@
+"""Bounded multi-turn memory for Aaliya conversations"""
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Tuple
+
+from utils import estimate_tokens
+
+MEMORY_TOKEN_BUDGET = 768
+# Most recent turns kept word for word
+RECENT_TURNS = 4
+# Older turns are summarized in groups of this many
+CHUNK_TURNS = 4
+SUMMARY_CLAUSE_CHARS = 120
+
+def _first_sentence(text: str) -> str:
+    text = re.sub(r'```.*?```', ' [code] ', text, flags=re.DOTALL)
+    text = re.sub(r'\s+', ' ', text).strip()
+    sentence = re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    if len(sentence) > SUMMARY_CLAUSE_CHARS:
+        sentence = sentence[:SUMMARY_CLAUSE_CHARS].rsplit(' ', 1)[0] + '…'
+    return sentence
+
+def extractive_summary(turns: List[Tuple[str, str]]) -> str:
+    """Instant summary: the opening sentence of each question and answer"""
+    return ' '.join(f"User asked: {_first_sentence(user)} Aaliya: {_first_sentence(reply)}"
+                    for user, reply in turns)
+
+def format_turns(turns: List[Tuple[str, str]]) -> str:
+    return ''.join(f"User: {user}\nAaliya: {reply}\n" for user, reply in turns)
+
+class ConversationMemory:
+    """Recent turns verbatim plus summaries of older ones, within a token budget
+
+    The prompt prefix is rebuilt once per turn, so building a prompt costs
+    nothing extra. A chunk of old turns gets an extractive summary at once;
+    when a summarizer is set it refines that summary in the background and
+    the refined text is stored by content hash, so it is never recomputed.
+    A refined summary replaces the extractive one at the next fold, when the
+    prefix is rewritten anyway. epoch changes whenever the new prefix does
+    not simply extend the old one (a chunk folded into a summary, a turn
+    pushed out by the budget); while it is unchanged a backend can keep its
+    KV cache.
+    """
+
+    def __init__(self, db_path: str = None, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 recent_turns: int = RECENT_TURNS, chunk_turns: int = CHUNK_TURNS):
+        self.db_path = db_path
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.chunk_turns = chunk_turns
+        self.summarizer = None
+        self.lock = threading.Lock()
+        self.turns = []
+        self.summaries = []
+        # Refined summaries waiting for the next fold, by chunk hash
+        self.refined = {}
+        self.epoch = 0
+        # Turns ever added, so a caller can tell whether others came in between
+        self.turn_count = 0
+        self.prefix = ""
+        self.prefix_tokens = 0
+        if db_path:
+            self.init_db()
+
+    def init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversation_summaries (
+                chunk_hash TEXT PRIMARY KEY,
+                summary TEXT,
+                created_at REAL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _stored_summary(self, chunk_hash: str) -> str:
+        if not self.db_path:
+            return None
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT summary FROM conversation_summaries WHERE chunk_hash = ?', (chunk_hash,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _store_summary(self, chunk_hash: str, summary: str):
+        if not self.db_path:
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('INSERT OR REPLACE INTO conversation_summaries (chunk_hash, summary, created_at) VALUES (?, ?, ?)',
+                     (chunk_hash, summary, time.time()))
+        conn.commit()
+        conn.close()
+
+    def seed(self, turns: List[Tuple[str, str]]):
+        """Start from saved history (oldest first) without summarizing it again"""
+        with self.lock:
+            self.turns = []
+            self.summaries = []
+            self.refined = {}
+            for turn in turns:
+                self._append(turn, refine=False)
+            self.turn_count += len(turns)
+            self.epoch += 1
+            self._rebuild_prefix()
+
+    def add_turn(self, user_message: str, reply: str):
+        with self.lock:
+            self._append((user_message, reply), refine=True)
+            self.turn_count += 1
+            self._rebuild_prefix()
+
+    def clear(self):
+        with self.lock:
+            self.turns = []
+            self.summaries = []
+            self.refined = {}
+            self.epoch += 1
+            self._rebuild_prefix()
+
+    def _append(self, turn: Tuple[str, str], refine: bool):
+        self.turns.append(turn)
+        if len(self.turns) < self.recent_turns + self.chunk_turns:
+            return
+        chunk = self.turns[:self.chunk_turns]
+        del self.turns[:self.chunk_turns]
+        for entry in self.summaries:
+            if entry[0] in self.refined:
+                entry[1] = self.refined.pop(entry[0])
+        chunk_hash = hashlib.sha256(format_turns(chunk).encode()).hexdigest()
+        stored = self._stored_summary(chunk_hash)
+        entry = [chunk_hash, stored or extractive_summary(chunk)]
+        self.summaries.append(entry)
+        if stored is None and refine and self.summarizer:
+            threading.Thread(target=self._refine, args=(entry, format_turns(chunk)), daemon=True).start()
+
+    def _refine(self, entry: list, text: str):
+        """Summarize a chunk with the summarizer, off the response path"""
+        try:
+            summary = self.summarizer(text)
+        except Exception as e:
+            print(f"Conversation summary failed: {e}")
+            return
+        if not summary:
+            return
+        self._store_summary(entry[0], summary)
+        with self.lock:
+            if entry in self.summaries:
+                self.refined[entry[0]] = summary
+
+    def _rebuild_prefix(self):
+        """Newest turns first claim the budget, then the newest summaries"""
+        budget = self.token_budget
+        recent = []
+        for turn in reversed(self.turns):
+            cost = estimate_tokens(format_turns([turn]))
+            if cost > budget:
+                break
+            recent.insert(0, turn)
+            budget -= cost
+
+        summaries = []
+        header_cost = estimate_tokens("Earlier in this conversation:")
+        for _, summary in reversed(self.summaries):
+            cost = estimate_tokens(summary) + header_cost * (not summaries)
+            if cost > budget:
+                break
+            summaries.insert(0, summary)
+            budget -= cost
+
+        prefix = ""
+        if summaries:
+            prefix += "Earlier in this conversation:\n" + '\n'.join(summaries) + "\n\n"
+        prefix += format_turns(recent)
+        if not prefix.startswith(self.prefix):
+            self.epoch += 1
+        self.prefix = prefix
+        self.prefix_tokens = self.token_budget - budget
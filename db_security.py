@@ -3,10 +3,13 @@ import sqlite3
 import json
 from typing import Dict, List, Optional
 from datetime import datetime
+from anomaly_detection import EventRateMonitor
 
 class SecurityDatabaseManager:
     def __init__(self, storage_manager):
         self.storage = storage_manager
+        self.access_listeners = []
+        self.access_rate_monitor = EventRateMonitor(alert_callback=self._on_access_rate_anomaly)
         self.init_security_tables()
     
     def init_security_tables(self):
@@ -186,6 +189,25 @@ class SecurityDatabaseManager:
         
         conn.commit()
         conn.close()
+        
+        self.access_rate_monitor.record()
+        if resource_path:
+            for listener in self.access_listeners:
+                listener(resource_path, process_name or 'unknown')
+    
+    def _on_access_rate_anomaly(self, result: Dict):
+        """Raise an alert when the access rate of an interval is anomalous"""
+        self.log_security_alert(
+            'ACCESS_RATE_ANOMALY', 'HIGH',
+            f"Access rate spike: {int(result['value'])} events/min",
+            f"Rolling mean {result['rolling_mean']:.1f}/min, z-score {result['zscore']:.1f}",
+            'db_security',
+            {key: result[key] for key in ('value', 'rolling_mean', 'rolling_std', 'ewma', 'interval_start')}
+        )
+    
+    def add_access_listener(self, listener):
+        """Forward every logged access to listener(resource_path, process_name)"""
+        self.access_listeners.append(listener)
     
     def get_access_logs(self, access_type: str = None, 
                        failed_only: bool = False, 
@@ -0,0 +1,188 @@
+"""Entropy and packer detection for the Honeypot Defense System"""
+import os
+import mmap
+import numpy as np
+from typing import Dict, List, Optional
+
+DEFAULT_BLOCK_SIZE = 4096
+WINDOW_BLOCKS = 4096  # 16MB windows with the default block size
+HIGH_ENTROPY_THRESHOLD = 7.2
+MAX_REPORTED_ITEMS = 20
+GROUP_BLOCKS = 256
+PACKER_SCAN_BYTES = 1024 * 1024  # packer markers live in the executable headers
+
+EMBEDDED_SIGNATURES = {
+    b'PK\x03\x04': 'ZIP archive',
+    b'\x1f\x8b\x08': 'GZIP stream',
+    b'7z\xbc\xaf\x27\x1c': '7-Zip archive',
+    b'Rar!\x1a\x07': 'RAR archive',
+    b'BZh91AY&SY': 'BZIP2 stream',
+    b'\xfd7zXZ\x00': 'XZ stream',
+    b'MSCF\x00\x00\x00\x00': 'CAB archive',
+}
+
+PACKER_SIGNATURES = {
+    b'UPX!': 'UPX',
+    b'MPRESS1': 'MPRESS',
+    b'.aspack': 'ASPack',
+    b'PEC2': 'PECompact',
+    b'.themida': 'Themida',
+}
+
+class EntropyAnalyzer:
+    """Per-block Shannon entropy profile computed over memory-mapped windows"""
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE,
+                 high_threshold: float = HIGH_ENTROPY_THRESHOLD):
+        self.block_size = block_size
+        self.high_threshold = high_threshold
+        # Precomputed -p*log2(p) for every possible byte count in a full block
+        counts = np.arange(block_size + 1, dtype=np.float64) / block_size
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._plogp = np.where(counts > 0, -counts * np.log2(counts), 0.0)
+
+    def block_entropies(self, data) -> np.ndarray:
+        """Entropy in bits per byte of each block of a bytes-like buffer"""
+        buf = np.frombuffer(data, dtype=np.uint8)
+        full_blocks = len(buf) // self.block_size
+        entropies = np.empty(full_blocks + (1 if len(buf) % self.block_size else 0))
+
+        # Offset each block into its own 256-bin range so one bincount covers a whole group;
+        # 256 blocks per group keeps the combined index within uint16
+        offsets = (np.arange(GROUP_BLOCKS, dtype=np.uint16) * 256)[:, None]
+        for first in range(0, full_blocks, GROUP_BLOCKS):
+            count = min(GROUP_BLOCKS, full_blocks - first)
+            blocks = buf[first * self.block_size:(first + count) * self.block_size]
+            blocks = blocks.reshape(count, self.block_size)
+            hist = np.bincount((blocks + offsets[:count]).ravel(), minlength=count * 256)
+            entropies[first:first + count] = self._plogp[hist.reshape(count, 256)].sum(axis=1)
+
+        if len(entropies) > full_blocks:
+            tail = buf[full_blocks * self.block_size:]
+            p = np.bincount(tail, minlength=256) / len(tail)
+            p = p[p > 0]
+            entropies[-1] = float(-(p * np.log2(p)).sum())
+
+        return entropies
+
+    def entropy_profile(self, file_path: str) -> np.ndarray:
+        """Entropy of every block in a file, streamed window by window"""
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return np.empty(0)
+
+        window = self.block_size * WINDOW_BLOCKS
+        parts = []
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, size, window):
+                    view = memoryview(mm)[start:start + window]
+                    try:
+                        parts.append(self.block_entropies(view))
+                    finally:
+                        view.release()
+        return np.concatenate(parts)
+
+    def find_signatures(self, file_path: str, signatures: Dict[bytes, str],
+                        ranges: Optional[List[tuple]] = None, skip_start: bool = True) -> List[Dict]:
+        """Locate magic byte sequences in a file, optionally only within byte ranges"""
+        found = []
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return found
+        if ranges is None:
+            ranges = [(0, size)]
+
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for magic, name in signatures.items():
+                    # A container's own local headers are not embedded payloads
+                    if skip_start and mm[:len(magic)] == magic:
+                        continue
+                    for start, end in ranges:
+                        pos = mm.find(magic, max(start, 1 if skip_start else 0), end)
+                        while pos != -1 and len(found) < MAX_REPORTED_ITEMS * len(signatures):
+                            found.append({'offset': pos, 'type': name})
+                            pos = mm.find(magic, pos + 1, end)
+
+        return sorted(found, key=lambda item: item['offset'])[:MAX_REPORTED_ITEMS]
+
+    def high_entropy_runs(self, entropies: np.ndarray) -> np.ndarray:
+        """Block index pairs (start, end) of consecutive high-entropy blocks"""
+        high = np.concatenate(([False], entropies >= self.high_threshold, [False]))
+        edges = np.flatnonzero(high[1:] != high[:-1])
+        return edges.reshape(-1, 2)
+
+    def high_entropy_sections(self, entropies: np.ndarray) -> List[Dict]:
+        """Merge consecutive high-entropy blocks into byte ranges, largest first"""
+        if len(entropies) == 0:
+            return []
+
+        sections = []
+        for start, end in self.high_entropy_runs(entropies):
+            sections.append({
+                'start': int(start) * self.block_size,
+                'end': int(end) * self.block_size,
+                'mean_entropy': round(float(entropies[start:end].mean()), 3)
+            })
+
+        sections.sort(key=lambda s: s['end'] - s['start'], reverse=True)
+        return sections[:MAX_REPORTED_ITEMS]
+
+    def analyze(self, file_path: str) -> Dict[str, any]:
+        """Summarize entropy, embedded archives and packer markers for a file"""
+        try:
+            entropies = self.entropy_profile(file_path)
+            # Compressed payloads show up as a jump to high entropy right after their header,
+            # so only the blocks around each rising edge need a signature search
+            boundaries = [(max(int(start) - 1, 0) * self.block_size, (int(start) + 1) * self.block_size)
+                          for start, _ in self.high_entropy_runs(entropies)]
+            embedded = self.find_signatures(file_path, EMBEDDED_SIGNATURES, boundaries)
+            packers = self.find_signatures(file_path, PACKER_SIGNATURES,
+                                           [(0, PACKER_SCAN_BYTES)], skip_start=False)
+        except (OSError, ValueError):
+            return {'analyzed': False}
+
+        if len(entropies):
+            sizes = np.full(len(entropies), self.block_size, dtype=np.float64)
+            sizes[-1] = os.path.getsize(file_path) - self.block_size * (len(entropies) - 1)
+            overall = float((entropies * sizes).sum() / sizes.sum())
+            high_ratio = float(sizes[entropies >= self.high_threshold].sum() / sizes.sum())
+        else:
+            overall = 0.0
+            high_ratio = 0.0
+
+        return {
+            'analyzed': True,
+            'block_size': self.block_size,
+            'overall_entropy': round(overall, 3),
+            'max_entropy': round(float(entropies.max()), 3) if len(entropies) else 0.0,
+            'high_entropy_ratio': round(high_ratio, 3),
+            'high_entropy_sections': self.high_entropy_sections(entropies),
+            'embedded_archives': embedded,
+            'packers': sorted({p['type'] for p in packers})
+        }
+
+    def entropy_strip(self, file_path: str, buckets: int = 256,
+                      entropies: Optional[np.ndarray] = None) -> List[float]:
+        """Downsample the entropy profile to a fixed number of buckets for display"""
+        if entropies is None:
+            entropies = self.entropy_profile(file_path)
+        if len(entropies) == 0:
+            return []
+        if len(entropies) <= buckets:
+            return [round(float(e), 3) for e in entropies]
+
+        edges = np.linspace(0, len(entropies), buckets + 1).astype(np.int64)
+        sums = np.add.reduceat(entropies, edges[:-1])
+        return [round(float(e), 3) for e in sums / np.diff(edges)]
+
+def entropy_color(entropy: float) -> str:
+    """Map an entropy value (0-8 bits) onto the honeypot UI palette"""
+    if entropy >= HIGH_ENTROPY_THRESHOLD:
+        return '#ff0040'
+    if entropy >= 6.0:
+        return '#ffaa00'
+    if entropy >= 3.0:
+        return '#00ff41'
+    return '#003300'
@@ -2,19 +2,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import time
+from functools import cached_property
 from storage import StorageManager
 # from sound import SoundManager  # Removed
 from utils import AutoLockManager
-from darkweb_tools import DarkWebTools
-from ai_engine import AIEngine
-from secure_communication import SecureCommunication
-from data_visualization import DataVisualizer
-from audio_visual import AudioVisualFeedback
-from ui_browser import BrowserUI
-from ui_honeypot import HoneypotUI
-from ai_gui import AIAssistantGUI
-from aaliya_gui import AaliyaGUI
-from ui_osint_image import OSINTImageGUI
+from startup_profile import profiler
+
+# Tools are imported and built on first use (see the cached properties of
+# SmartEncryptGUI), so the login window only waits for Tk and the vault DB
 
 
 DEFAULT_AUTOLOCK_MINUTES = 5
@@ -23,28 +18,93 @@ ENABLE_SOUND_BY_DEFAULT = True
 
 class SmartEncryptGUI:
     def __init__(self):
-        self.root = tk.Tk()
-        self.storage = StorageManager()
+        with profiler.timed('Tk root window'):
+            self.root = tk.Tk()
+        with profiler.timed('StorageManager'):
+            self.storage = StorageManager()
         # self.sound = SoundManager()  # Removed
         self.auto_lock = AutoLockManager(DEFAULT_AUTOLOCK_MINUTES, self.lock_app)
-        self.darkweb = DarkWebTools()
-        self.ai_engine = AIEngine()
         self.secure_comm = None
-        self.visualizer = DataVisualizer(self.root)
-        self.audio_visual = AudioVisualFeedback(self.root)
-        self.browser_ui = None
-        self.honeypot_ui = None
+        self.vault_scanner = None
         self.is_locked = True
         self.current_theme = DEFAULT_THEME
         
-        self.setup_window()
-        self.setup_styles()
-        self.load_settings()
+        with profiler.timed('window, styles and settings'):
+            self.setup_window()
+            self.setup_styles()
+            self.load_settings()
         
         if self.storage.is_first_run():
             self.setup_master_password()
         else:
             self.show_login()
+        profiler.mark_ready(self.root)
+    
+    @cached_property
+    def darkweb(self):
+        with profiler.timed('DarkWebTools'):
+            from darkweb_tools import DarkWebTools
+            return DarkWebTools()
+    
+    @cached_property
+    def ai_engine(self):
+        with profiler.timed('AIEngine'):
+            from ai_engine import AIEngine
+            return AIEngine()
+    
+    @cached_property
+    def visualizer(self):
+        with profiler.timed('DataVisualizer'):
+            from data_visualization import DataVisualizer
+            return DataVisualizer(self.root)
+    
+    @cached_property
+    def audio_visual(self):
+        with profiler.timed('AudioVisualFeedback'):
+            from audio_visual import AudioVisualFeedback
+            return AudioVisualFeedback(self.root)
+    
+    @cached_property
+    def browser_ui(self):
+        with profiler.timed('BrowserUI'):
+            from ui_browser import BrowserUI
+            return BrowserUI(self)
+    
+    @cached_property
+    def security_db(self):
+        """Access log and security alerts, shared with the honeypot's intrusion detector"""
+        with profiler.timed('SecurityDatabaseManager'):
+            from db_security import SecurityDatabaseManager
+            return SecurityDatabaseManager(self.storage)
+    
+    def log_vault_access(self, access_type, success=True, metadata=None):
+        self.security_db.log_access_attempt(access_type, self.storage.db_path, 'smart_encrypt',
+                                            success, metadata)
+    
+    @cached_property
+    def honeypot_ui(self):
+        with profiler.timed('HoneypotUI'):
+            from ui_honeypot import HoneypotUI
+            return HoneypotUI(self)
+    
+    @cached_property
+    def ai_assistant(self):
+        with profiler.timed('AIAssistantGUI'):
+            from ai_gui import AIAssistantGUI
+            return AIAssistantGUI(self)
+    
+    @cached_property
+    def inference(self):
+        """The one local language model, shared by Aaliya and the code assistant"""
+        with profiler.timed('InferenceWorker'):
+            from inference_worker import InferenceWorker
+            return InferenceWorker()
+    
+    @cached_property
+    def aaliya(self):
+        with profiler.timed('AaliyaGUI'):
+            from aaliya_gui import AaliyaGUI
+            return AaliyaGUI(self)
     
     def setup_window(self):
         self.root.title("Smart-Encrypt")
@@ -154,11 +214,15 @@ class SmartEncryptGUI:
         
         def unlock():
             password = password_var.get()
-            if self.storage.verify_master_password(password):
+            unlocked = self.storage.verify_master_password(password)
+            self.log_vault_access('VAULT_UNLOCK', unlocked)
+            if unlocked:
                 self.is_locked = False
                 dialog.destroy()
                 self.create_main_interface()
                 self.auto_lock.start()
+                # Warm Aaliya's model while the vault is in use, so the chat opens ready
+                self.root.after_idle(self.inference.preload)
                 # self.sound.play_startup_chime()  # Removed
             else:
                 messagebox.showerror("Error", "Invalid password")
@@ -250,14 +314,6 @@ class SmartEncryptGUI:
         tk.Label(sidebar_frame, text="◢ QUICK ACTIONS ◣", 
                 bg='#001100', fg='#00ff41', font=('Courier', 10, 'bold')).pack(pady=(10, 5))
         
-        # Initialize UI modules
-        self.browser_ui = BrowserUI(self)
-        self.honeypot_ui = HoneypotUI(self)
-        self.ai_assistant = AIAssistantGUI(self)
-        self.aaliya = AaliyaGUI(self)
-        self.osint_image = OSINTImageGUI(self.root, {'bg': '#000000', 'fg': '#00ff41', 'accent': '#40ff80', 'entry_bg': '#001100'})
-
-        
         actions = [
             ("+ New Entry", self.new_entry),
             ("🌐 Dark Web", self.show_darkweb_tools),
@@ -265,6 +321,7 @@ class SmartEncryptGUI:
             ("💬 Secure Chat", self.show_secure_comm),
             ("🔍 Image OSINT", self.show_osint_image),
             ("📈 Dashboard", self.show_dashboard),
+            ("⚠ Risky Notes", self.show_risky_notes),
             ("⚙ Settings", self.show_settings),
             ("↑ Export", self.export_data),
             ("↓ Import", self.import_data)
@@ -295,6 +352,7 @@ class SmartEncryptGUI:
         # Add honeypot buttons
         self.honeypot_ui.add_honeypot_button(sidebar_frame)
         self.honeypot_ui.add_file_scanner_button(sidebar_frame)
+        self.honeypot_ui.add_bulk_scan_button(sidebar_frame)
         
         # Add AI assistant button
         self.ai_assistant.add_ai_button(sidebar_frame)
@@ -363,6 +421,16 @@ class SmartEncryptGUI:
         self.load_categories()
         self.load_entries()
         self.update_status()
+        
+        # Score new and edited notes for sensitive data in the background
+        if self.vault_scanner is None:
+            with profiler.timed('VaultSensitivityScanner'):
+                from vault_scanner import VaultSensitivityScanner
+                self.vault_scanner = VaultSensitivityScanner(self.storage)
+        self.vault_scanner.start()
+        
+        # Trap files and the decoy vault are laid out once the vault is open
+        self.root.after_idle(lambda: self.honeypot_ui.honeypot)
     
     def load_categories(self):
         self.category_listbox.delete(0, tk.END)
@@ -375,6 +443,7 @@ class SmartEncryptGUI:
             self.entries_tree.delete(item)
         
         entries = self.storage.get_entries(category_id)
+        self.log_vault_access('VAULT_READ', metadata={'category_id': category_id})
         for entry in entries:
             date_str = entry['updated_at'][:16] if entry['updated_at'] else ''
             self.entries_tree.insert('', tk.END, values=(
@@ -400,6 +469,7 @@ class SmartEncryptGUI:
             self.entries_tree.delete(item)
         
         results = self.storage.search_entries(query)
+        self.log_vault_access('VAULT_SEARCH')
         for entry in results:
             date_str = entry['updated_at'][:16] if entry['updated_at'] else ''
             self.entries_tree.insert('', tk.END, values=(
@@ -422,6 +492,7 @@ class SmartEncryptGUI:
         
         entry_id = self.entries_tree.item(selection[0])['tags'][0]
         entries = self.storage.get_entries()
+        self.log_vault_access('VAULT_READ', metadata={'entry_id': entry_id})
         entry = next((e for e in entries if e['id'] == entry_id), None)
         if entry:
             self.open_entry_editor(entry)
@@ -492,8 +563,7 @@ class SmartEncryptGUI:
                 category_id = self.storage.add_category(category_name)
             
             if entry:
-                # Update existing entry (would need update method in storage)
-                pass
+                self.storage.update_entry(entry['id'], category_id, title, content, entry.get('meta'))
             else:
                 self.storage.add_entry(category_id, title, content)
             
@@ -649,6 +719,7 @@ class SmartEncryptGUI:
     def show_secure_comm(self):
         """Show secure communication interface"""
         if not self.secure_comm:
+            from secure_communication import SecureCommunication
             self.secure_comm = SecureCommunication(self.storage.encryption)
         
         comm_window = tk.Toplevel(self.root)
@@ -728,6 +799,43 @@ class SmartEncryptGUI:
         
         dashboard.after(1000, update_dashboard)
     
+    def show_risky_notes(self):
+        """List notes containing card numbers, SSNs, wallets and similar data
+        
+        Shows what the background scanner has already scored; decrypting the
+        queue here would block the UI and race the scanner's own thread.
+        """
+        risky = self.vault_scanner.get_risky_entries()
+        pending = self.vault_scanner.pending_count()
+        
+        window = tk.Toplevel(self.root)
+        window.title("Risky Notes")
+        window.geometry("700x400")
+        window.configure(bg='#000000')
+        
+        tk.Label(window, text="◢ RISKY NOTES ◣", bg='#000000', fg='#ff0040',
+                font=('Courier', 14, 'bold')).pack(pady=10)
+        if pending:
+            tk.Label(window, text=f"{pending} notes still waiting to be scanned", bg='#000000', fg='#ffff00',
+                    font=('Courier', 9)).pack(pady=(0, 5))
+        
+        tree = ttk.Treeview(window, columns=('Title', 'Score', 'Findings'),
+                           show='headings', style='Dark.Treeview')
+        tree.heading('Title', text='◢ TITLE ◣')
+        tree.heading('Score', text='◢ SCORE ◣')
+        tree.heading('Findings', text='◢ FINDINGS ◣')
+        tree.column('Title', width=250)
+        tree.column('Score', width=70)
+        tree.column('Findings', width=330)
+        tree.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
+        
+        for entry in risky:
+            findings = ', '.join(f"{name.replace('_', ' ')}: {count}" for name, count in entry['findings'].items())
+            tree.insert('', tk.END, values=(entry['title'][:40], entry['score'], findings))
+        
+        if not risky:
+            tree.insert('', tk.END, values=('No risky notes found', '', ''))
+    
     def show_settings(self):
         settings = tk.Toplevel(self.root)
         settings.title("Advanced Settings")
@@ -869,9 +977,11 @@ class SmartEncryptGUI:
         osint_window.configure(bg='#000000')
         
         # Initialize OSINT GUI in the window
-        osint_gui = OSINTImageGUI(osint_window, {
-            'bg': '#000000', 'fg': '#00ff41', 'accent': '#40ff80', 'entry_bg': '#001100'
-        })
+        with profiler.timed('OSINTImageGUI'):
+            from ui_osint_image import OSINTImageGUI
+            osint_gui = OSINTImageGUI(osint_window, {
+                'bg': '#000000', 'fg': '#00ff41', 'accent': '#40ff80', 'entry_bg': '#001100'
+            })
         
         # Audio effects removed
         pass
@@ -879,6 +989,8 @@ class SmartEncryptGUI:
     def lock_app(self):
         self.is_locked = True
         self.auto_lock.stop()
+        if self.vault_scanner:
+            self.vault_scanner.stop()
         # Audio effects removed
         pass
         self.show_login()
@@ -0,0 +1,349 @@
+"""Virtualized, memory-mapped hex viewer for Smart-Encrypt"""
+import os
+import mmap
+import threading
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import messagebox
+import numpy as np
+from typing import List, Optional, Callable
+from entropy_analysis import entropy_color
+
+ROW_WIDTH = 16
+SEARCH_CHUNK = 16 * 1024 * 1024
+
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+def column_layout(offset_digits: int) -> tuple:
+    """Start columns of the hex and ascii parts of a row"""
+    # Offset column + 2 spaces + hex column (3 per byte) + ' |' + ascii column + '|'
+    hex_start = offset_digits + 2
+    return hex_start, hex_start + ROW_WIDTH * 3 + 1
+
+def format_hex_rows(data: bytes, base_offset: int, offset_digits: int = 8) -> List[str]:
+    """Format bytes as hexdump rows using array operations instead of per-byte loops"""
+    if not data:
+        return []
+
+    hex_start, ascii_start = column_layout(offset_digits)
+
+    rows = (len(data) + ROW_WIDTH - 1) // ROW_WIDTH
+    padded = np.zeros(rows * ROW_WIDTH, dtype=np.uint8)
+    padded[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    grid = padded.reshape(rows, ROW_WIDTH)
+
+    line_width = ascii_start + ROW_WIDTH + 1
+    out = np.full((rows, line_width), ord(' '), dtype=np.uint8)
+
+    # Offset column from the row numbers, one hex digit at a time
+    offsets = base_offset + np.arange(rows, dtype=np.int64) * ROW_WIDTH
+    for digit in range(offset_digits):
+        out[:, offset_digits - 1 - digit] = HEX_DIGITS[(offsets >> (4 * digit)) & 0xf]
+
+    hex_cols = out[:, hex_start:hex_start + ROW_WIDTH * 3].reshape(rows, ROW_WIDTH, 3)
+    hex_cols[:, :, 0] = HEX_DIGITS[grid >> 4]
+    hex_cols[:, :, 1] = HEX_DIGITS[grid & 0xf]
+
+    printable = (grid >= 32) & (grid <= 126)
+    out[:, ascii_start - 1] = ord('|')
+    out[:, ascii_start:ascii_start + ROW_WIDTH] = np.where(printable, grid, ord('.'))
+    out[:, -1] = ord('|')
+
+    # Blank out the padding of a short final row
+    tail = len(data) % ROW_WIDTH
+    if tail:
+        out[-1, hex_start + tail * 3:ascii_start - 1] = ord(' ')
+        out[-1, ascii_start + tail] = ord('|')
+        out[-1, ascii_start + tail + 1:] = ord(' ')
+
+    text = out.tobytes().decode('ascii')
+    return [text[i * line_width:(i + 1) * line_width].rstrip() for i in range(rows)]
+
+def parse_search_pattern(pattern: str, as_hex: bool) -> bytes:
+    """Convert user search input into the bytes to look for"""
+    if as_hex:
+        return bytes.fromhex(pattern.replace('0x', '').replace(' ', ''))
+    return pattern.encode('utf-8')
+
+class HexDocument:
+    """Read-only memory-mapped view of a file addressed by row"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.size = os.path.getsize(file_path)
+        self._file = open(file_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.offset_digits = 8 if self.size <= 0xffffffff else 12
+
+    @property
+    def row_count(self) -> int:
+        return (self.size + ROW_WIDTH - 1) // ROW_WIDTH
+
+    def read_rows(self, first_row: int, count: int) -> List[str]:
+        """Format only the requested rows"""
+        if not self._mm:
+            return []
+        start = first_row * ROW_WIDTH
+        return format_hex_rows(self._mm[start:start + count * ROW_WIDTH], start, self.offset_digits)
+
+    def find(self, pattern: bytes, start: int = 0, cancel_event: threading.Event = None,
+             progress_callback: Callable = None) -> int:
+        """Find the next occurrence of pattern at or after start, or -1"""
+        if not self._mm or not pattern:
+            return -1
+
+        pos = start
+        while pos < self.size:
+            if cancel_event and cancel_event.is_set():
+                return -1
+            # Overlap chunks so matches spanning a boundary are not missed
+            end = min(pos + SEARCH_CHUNK + len(pattern) - 1, self.size)
+            try:
+                found = self._mm.find(pattern, pos, end)
+            except (ValueError, AttributeError):
+                return -1  # document closed while searching
+            if found != -1:
+                return found
+            pos += SEARCH_CHUNK
+            if progress_callback:
+                progress_callback(min(pos, self.size) / self.size)
+        return -1
+
+    def close(self):
+        if self._mm:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+class HexViewer:
+    """Hex viewer window that only formats the rows currently on screen"""
+
+    def __init__(self, root, file_path: str, entropy_analyzer=None):
+        self.file_path = file_path
+        self.document = HexDocument(file_path)
+        self.entropy_analyzer = entropy_analyzer
+        self.top_row = 0
+        self.visible_rows = 40
+        self.highlight = None
+        self.search_cancel = None
+        self.strip = []
+
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Hex Viewer - {os.path.basename(file_path)}")
+        self.window.geometry("900x600")
+        self.window.configure(bg='#000000')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self._create_widgets()
+        self.window.after(0, self.refresh)
+
+        if self.entropy_analyzer and self.document.size:
+            threading.Thread(target=self._compute_strip, daemon=True).start()
+
+    def _create_widgets(self):
+        tk.Label(self.window, text="◢ HEX VIEWER ◣",
+                bg='#000000', fg='#00ff41', font=('Courier', 16, 'bold')).pack(pady=10)
+
+        # Navigation and search controls
+        controls = tk.Frame(self.window, bg='#000000')
+        controls.pack(fill=tk.X, padx=20)
+
+        tk.Label(controls, text="Offset:", bg='#000000', fg='#00ff41',
+                font=('Courier', 9)).pack(side=tk.LEFT)
+        self.offset_var = tk.StringVar()
+        offset_entry = tk.Entry(controls, textvariable=self.offset_var, width=14,
+                               bg='#001100', fg='#00ff41', insertbackground='#00ff41',
+                               font=('Courier', 9))
+        offset_entry.pack(side=tk.LEFT, padx=5)
+        offset_entry.bind('<Return>', lambda e: self.jump_to_offset())
+        tk.Button(controls, text="GO", bg='#003300', fg='#00ff41', font=('Courier', 9, 'bold'),
+                 command=self.jump_to_offset).pack(side=tk.LEFT)
+
+        tk.Label(controls, text="  Find:", bg='#000000', fg='#00ff41',
+                font=('Courier', 9)).pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(controls, textvariable=self.search_var, width=24,
+                               bg='#001100', fg='#00ff41', insertbackground='#00ff41',
+                               font=('Courier', 9))
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind('<Return>', lambda e: self.start_search())
+        self.search_hex = tk.BooleanVar(value=False)
+        tk.Checkbutton(controls, text="hex", variable=self.search_hex, bg='#000000', fg='#00ff41',
+                      selectcolor='#001100', activebackground='#000000',
+                      font=('Courier', 9)).pack(side=tk.LEFT)
+        tk.Button(controls, text="NEXT", bg='#003300', fg='#00ff41', font=('Courier', 9, 'bold'),
+                 command=self.start_search).pack(side=tk.LEFT, padx=2)
+        tk.Button(controls, text="STOP", bg='#330000', fg='#ff0040', font=('Courier', 9, 'bold'),
+                 command=self.cancel_search).pack(side=tk.LEFT, padx=2)
+
+        self.status_var = tk.StringVar(value=f"{self.document.size:,} bytes")
+        tk.Label(controls, textvariable=self.status_var, bg='#000000', fg='#40ff80',
+                font=('Courier', 9)).pack(side=tk.RIGHT)
+
+        body = tk.Frame(self.window, bg='#000000')
+        body.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        # Entropy strip alongside the dump; click to jump
+        self.strip_canvas = tk.Canvas(body, bg='#000000', width=24, highlightthickness=0)
+        self.strip_canvas.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
+        self.strip_canvas.bind('<Configure>', lambda e: self._draw_strip())
+        self.strip_canvas.bind('<Button-1>', self._on_strip_click)
+
+        self.v_scroll = tk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scroll)
+        self.v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.font = tkfont.Font(family='Courier', size=9)
+        self.hex_text = tk.Text(body, bg='#001100', fg='#00ff41', font=self.font,
+                               wrap=tk.NONE, cursor='arrow')
+        self.hex_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.hex_text.tag_configure('match', background='#ff0040', foreground='#000000')
+
+        self.hex_text.bind('<Configure>', lambda e: self.refresh())
+        self.hex_text.bind('<MouseWheel>', lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.hex_text.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.hex_text.bind('<Button-5>', lambda e: self.scroll_rows(3))
+        self.hex_text.bind('<Prior>', lambda e: self.scroll_rows(-self.visible_rows))
+        self.hex_text.bind('<Next>', lambda e: self.scroll_rows(self.visible_rows))
+
+    def refresh(self):
+        """Re-render the visible window of rows"""
+        if not self.window.winfo_exists():
+            return
+
+        line_height = max(self.font.metrics('linespace'), 1)
+        self.visible_rows = max(self.hex_text.winfo_height() // line_height, 1)
+        max_top = max(self.document.row_count - self.visible_rows, 0)
+        self.top_row = min(max(self.top_row, 0), max_top)
+
+        if self.document.size == 0:
+            lines = ['[empty file]']
+        else:
+            lines = self.document.read_rows(self.top_row, self.visible_rows)
+
+        self.hex_text.configure(state='normal')
+        self.hex_text.delete(1.0, tk.END)
+        self.hex_text.insert(tk.END, '\n'.join(lines))
+        self._apply_highlight()
+        self.hex_text.configure(state='disabled')
+
+        total = max(self.document.row_count, 1)
+        self.v_scroll.set(self.top_row / total, min((self.top_row + self.visible_rows) / total, 1.0))
+
+    def _apply_highlight(self):
+        if not self.highlight:
+            return
+        start, length = self.highlight
+        hex_start, ascii_start = column_layout(self.document.offset_digits)
+        for offset in range(start, start + length):
+            row = offset // ROW_WIDTH - self.top_row
+            if 0 <= row < self.visible_rows:
+                col = hex_start + (offset % ROW_WIDTH) * 3
+                self.hex_text.tag_add('match', f'{row + 1}.{col}', f'{row + 1}.{col + 2}')
+                ascii_col = ascii_start + offset % ROW_WIDTH
+                self.hex_text.tag_add('match', f'{row + 1}.{ascii_col}', f'{row + 1}.{ascii_col + 1}')
+
+    def _on_scroll(self, action, amount=None, unit=None):
+        if action == 'moveto':
+            self.top_row = int(float(amount) * self.document.row_count)
+            self.refresh()
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_rows(int(amount) * step)
+
+    def scroll_rows(self, delta: int):
+        self.top_row += delta
+        self.refresh()
+        return 'break'
+
+    def jump_to_offset(self, offset: Optional[int] = None):
+        """Scroll so that the given byte offset is on the top row"""
+        if offset is None:
+            try:
+                offset = int(self.offset_var.get().strip(), 0)
+            except ValueError:
+                messagebox.showerror("Invalid Offset", "Enter a decimal or 0x-prefixed offset",
+                                     parent=self.window)
+                return
+        offset = min(max(offset, 0), max(self.document.size - 1, 0))
+        self.top_row = offset // ROW_WIDTH
+        self.refresh()
+
+    def start_search(self):
+        """Search for the next match in a background thread"""
+        text = self.search_var.get()
+        if not text:
+            return
+        try:
+            pattern = parse_search_pattern(text, self.search_hex.get())
+        except ValueError:
+            messagebox.showerror("Invalid Pattern", "Hex patterns must be pairs of hex digits",
+                                 parent=self.window)
+            return
+
+        self.cancel_search()
+        cancel = threading.Event()
+        self.search_cancel = cancel
+        start = self.highlight[0] + 1 if self.highlight else self.top_row * ROW_WIDTH
+        self.status_var.set("Searching...")
+
+        def progress(fraction):
+            self._post(self.status_var.set, f"Searching... {fraction * 100:.0f}%")
+
+        def search():
+            found = self.document.find(pattern, start, cancel, progress)
+            if not cancel.is_set():
+                self._post(self._on_search_done, found, len(pattern))
+
+        threading.Thread(target=search, daemon=True).start()
+
+    def _on_search_done(self, found: int, length: int):
+        self.search_cancel = None
+        if found == -1:
+            self.status_var.set("No further matches")
+            return
+        self.highlight = (found, length)
+        self.status_var.set(f"Match at 0x{found:x}")
+        self.jump_to_offset(found)
+
+    def cancel_search(self):
+        if self.search_cancel:
+            self.search_cancel.set()
+            self.search_cancel = None
+            self.status_var.set("Search cancelled")
+
+    def _compute_strip(self):
+        try:
+            strip = self.entropy_analyzer.entropy_strip(self.file_path, buckets=128)
+        except Exception:
+            return
+        self._post(self._set_strip, strip)
+
+    def _post(self, callback, *args):
+        """Run callback on the Tk thread; dropped once the viewer has been closed"""
+        try:
+            self.window.after(0, callback, *args)
+        except (tk.TclError, RuntimeError):
+            pass
+
+    def _set_strip(self, strip: List[float]):
+        self.strip = strip
+        self._draw_strip()
+
+    def _draw_strip(self):
+        self.strip_canvas.delete('all')
+        if not self.strip:
+            return
+        height = max(self.strip_canvas.winfo_height(), 1)
+        row_height = height / len(self.strip)
+        for i, value in enumerate(self.strip):
+            self.strip_canvas.create_rectangle(0, i * row_height, 24, (i + 1) * row_height,
+                                               fill=entropy_color(value), outline='')
+
+    def _on_strip_click(self, event):
+        height = max(self.strip_canvas.winfo_height(), 1)
+        self.jump_to_offset(int(event.y / height * self.document.size))
+
+    def close(self):
+        self.cancel_search()
+        self.window.destroy()
+        self.document.close()
@@ -4,16 +4,147 @@ import hashlib
 import mimetypes
 from pathlib import Path
 from typing import Dict, List, Optional
-from datetime import datetime
 import json
+from scan_cache import ScanCache
+from entropy_analysis import EntropyAnalyzer, HIGH_ENTROPY_THRESHOLD
+from quarantine_store import QuarantineStore
+from intrusion_detector import StreamingIntrusionDetector, ALERT_RISK_SCORE
+from db_security import SecurityDatabaseManager
 
-class HoneypotDefenseSystem:
-    def __init__(self, storage_manager):
+class FileThreatAnalyzer:
+    """Stateless file threat checks, safe to run in worker processes"""
+    SUSPICIOUS_EXTENSIONS = ['.exe', '.scr', '.bat', '.cmd', '.com', '.pif', '.vbs', '.js']
+    DANGEROUS_COMBOS = [
+        '.jpg.exe', '.pdf.exe', '.doc.exe', '.txt.exe',
+        '.png.scr', '.gif.scr', '.mp3.exe', '.avi.exe',
+        '.pdf.scr', '.doc.scr', '.xls.exe'
+    ]
+    DOC_EXTENSIONS = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']
+    LARGE_FILE_THRESHOLD = 100 * 1024 * 1024  # 100MB
+    HIGH_ENTROPY_RATIO = 0.9
+    # Formats that are compressed by design and naturally score high entropy
+    COMPRESSED_MIME_PREFIXES = ['image/', 'video/', 'audio/', 'application/zip', 'application/gzip',
+                                'application/x-7z', 'application/x-rar', 'application/x-bzip2',
+                                'application/x-xz', 'application/vnd.openxmlformats']
+    
+    def __init__(self):
+        self.entropy_analyzer = EntropyAnalyzer()
+    
+    def get_rules_version(self) -> str:
+        """Fingerprint of the active rule set, used to invalidate cached scans"""
+        rules = {
+            'suspicious_extensions': self.SUSPICIOUS_EXTENSIONS,
+            'dangerous_combos': self.DANGEROUS_COMBOS,
+            'doc_extensions': self.DOC_EXTENSIONS,
+            'large_file_threshold': self.LARGE_FILE_THRESHOLD,
+            'high_entropy_threshold': HIGH_ENTROPY_THRESHOLD,
+            'high_entropy_ratio': self.HIGH_ENTROPY_RATIO,
+            'compressed_mime_prefixes': self.COMPRESSED_MIME_PREFIXES
+        }
+        return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+    
+    def analyze_file(self, file_path: str) -> Dict[str, any]:
+        """Run every threat check against the file"""
+        threats = []
+        threat_level = 'LOW'
+        
+        filename = os.path.basename(file_path)
+        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        
+        # Check for double extensions (common malware trick)
+        if self._has_double_extension(filename):
+            threats.append('Double file extension detected')
+            threat_level = 'HIGH'
+        
+        # Check for suspicious extensions
+        if any(filename.lower().endswith(ext) for ext in self.SUSPICIOUS_EXTENSIONS):
+            threats.append('Suspicious executable extension')
+            threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+        
+        # Check for hidden extensions in common file types
+        if self._has_hidden_executable(filename):
+            threats.append('Hidden executable in document')
+            threat_level = 'HIGH'
+        
+        # Check file size anomalies
+        if file_size > self.LARGE_FILE_THRESHOLD:
+            threats.append('Unusually large file size')
+            threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+        
+        mime_type = mimetypes.guess_type(filename)[0]
+        
+        # Check for packed, encrypted or embedded payloads
+        entropy = self.entropy_analyzer.analyze(file_path) if file_size else {'analyzed': False}
+        if entropy['analyzed']:
+            if entropy['packers']:
+                threats.append(f"Packer signature detected: {', '.join(entropy['packers'])}")
+                threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+            
+            naturally_compressed = mime_type and any(mime_type.startswith(prefix) for prefix in self.COMPRESSED_MIME_PREFIXES)
+            if entropy['high_entropy_ratio'] >= self.HIGH_ENTROPY_RATIO and not naturally_compressed:
+                threats.append('High-entropy content (possible encrypted or packed payload)')
+                threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+            
+            if entropy['embedded_archives']:
+                first = entropy['embedded_archives'][0]
+                threats.append(f"Embedded {first['type']} at offset 0x{first['offset']:x}")
+                threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+        
+        # Calculate file hash
+        file_hash = self._calculate_file_hash(file_path) if os.path.exists(file_path) else None
+        
+        return {
+            'filename': filename,
+            'file_path': file_path,
+            'file_size': file_size,
+            'file_hash': file_hash,
+            'threats': threats,
+            'threat_level': threat_level,
+            'mime_type': mime_type,
+            'entropy': entropy
+        }
+    
+    def _has_double_extension(self, filename: str) -> bool:
+        """Check for double file extensions"""
+        filename_lower = filename.lower()
+        return any(combo in filename_lower for combo in self.DANGEROUS_COMBOS)
+    
+    def _has_hidden_executable(self, filename: str) -> bool:
+        """Check for executables disguised as documents"""
+        filename_lower = filename.lower()
+        
+        # Check if it appears to be a document but has executable characteristics
+        for doc_ext in self.DOC_EXTENSIONS:
+            if doc_ext in filename_lower and filename_lower.endswith('.exe'):
+                return True
+        
+        return False
+    
+    def _calculate_file_hash(self, file_path: str) -> str:
+        """Calculate SHA-256 hash of file"""
+        try:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except:
+            return None
+
+class HoneypotDefenseSystem(FileThreatAnalyzer):
+    def __init__(self, storage_manager, security_db: SecurityDatabaseManager = None):
         self.storage = storage_manager
         self.trap_dir = os.path.expanduser('~/.smart_encrypt/trap')
         self.decoy_dir = os.path.expanduser('~/.smart_encrypt/decoy_vault')
+        super().__init__()
         self.init_honeypot_tables()
+        self.scan_cache = ScanCache(self.storage.db_path, self.get_rules_version())
         self.setup_trap_directories()
+        self.quarantine = QuarantineStore(self.storage, self.trap_dir)
+        self.intrusion_detector = StreamingIntrusionDetector(alert_callback=self._log_intrusion_alert)
+        # Every access logged for the vault is streamed to the intrusion detector
+        self.security_db = security_db or SecurityDatabaseManager(self.storage)
+        self.security_db.add_access_listener(self.record_access)
         self.create_decoy_vault()
     
     def init_honeypot_tables(self):
@@ -95,104 +226,56 @@ class HoneypotDefenseSystem:
         
         os.chmod(decoy_file, 0o600)
     
-    def analyze_file_threat(self, file_path: str) -> Dict[str, any]:
-        """Analyze file for potential threats"""
-        threats = []
-        threat_level = 'LOW'
-        
-        filename = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-        
-        # Check for double extensions (common malware trick)
-        if self._has_double_extension(filename):
-            threats.append('Double file extension detected')
-            threat_level = 'HIGH'
-        
-        # Check for suspicious extensions
-        suspicious_exts = ['.exe', '.scr', '.bat', '.cmd', '.com', '.pif', '.vbs', '.js']
-        if any(filename.lower().endswith(ext) for ext in suspicious_exts):
-            threats.append('Suspicious executable extension')
-            threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
-        
-        # Check for hidden extensions in common file types
-        if self._has_hidden_executable(filename):
-            threats.append('Hidden executable in document')
-            threat_level = 'HIGH'
-        
-        # Check file size anomalies
-        if file_size > 100 * 1024 * 1024:  # > 100MB
-            threats.append('Unusually large file size')
-            threat_level = 'MEDIUM' if threat_level == 'LOW' else threat_level
+    def analyze_file_threat(self, file_path: str, use_cache: bool = True) -> Dict[str, any]:
+        """Analyze file for potential threats, reusing cached results for unchanged files"""
+        if use_cache:
+            cached = self.scan_cache.get(file_path)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
         
-        # Calculate file hash
-        file_hash = self._calculate_file_hash(file_path) if os.path.exists(file_path) else None
-        
-        return {
-            'filename': filename,
-            'file_path': file_path,
-            'file_size': file_size,
-            'file_hash': file_hash,
-            'threats': threats,
-            'threat_level': threat_level,
-            'mime_type': mimetypes.guess_type(filename)[0]
-        }
-    
-    def _has_double_extension(self, filename: str) -> bool:
-        """Check for double file extensions"""
-        dangerous_combos = [
-            '.jpg.exe', '.pdf.exe', '.doc.exe', '.txt.exe',
-            '.png.scr', '.gif.scr', '.mp3.exe', '.avi.exe',
-            '.pdf.scr', '.doc.scr', '.xls.exe'
-        ]
-        filename_lower = filename.lower()
-        return any(combo in filename_lower for combo in dangerous_combos)
-    
-    def _has_hidden_executable(self, filename: str) -> bool:
-        """Check for executables disguised as documents"""
-        doc_extensions = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']
-        filename_lower = filename.lower()
+        analysis = self.analyze_file(file_path)
         
-        # Check if it appears to be a document but has executable characteristics
-        for doc_ext in doc_extensions:
-            if doc_ext in filename_lower and filename_lower.endswith('.exe'):
-                return True
+        if use_cache and analysis['file_hash']:
+            self.scan_cache.put(file_path, analysis)
         
-        return False
-    
-    def _calculate_file_hash(self, file_path: str) -> str:
-        """Calculate SHA-256 hash of file"""
-        try:
-            with open(file_path, 'rb') as f:
-                return hashlib.sha256(f.read()).hexdigest()
-        except:
-            return None
+        analysis['cached'] = False
+        return analysis
     
     def trap_suspicious_file(self, file_path: str, source: str = 'unknown') -> Dict[str, any]:
-        """Move suspicious file to honeypot trap"""
+        """Move suspicious file into the encrypted quarantine store"""
         analysis = self.analyze_file_threat(file_path)
         
         if analysis['threat_level'] in ['MEDIUM', 'HIGH']:
-            # Move file to trap directory
-            filename = os.path.basename(file_path)
-            trap_path = os.path.join(self.trap_dir, f"trapped_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}")
+            trap_path = None
             
             try:
                 if os.path.exists(file_path):
-                    os.rename(file_path, trap_path)
-                    os.chmod(trap_path, 0o600)  # Restrict access
+                    # Store compressed and encrypted, then remove the live sample
+                    stored = self.quarantine.add_file(file_path)
+                    analysis['file_hash'] = stored['sha256']
+                    analysis['deduplicated'] = stored['deduplicated']
+                    trap_path = stored['object_path']
+                    self.scan_cache.invalidate(file_path)
+                    os.remove(file_path)
                 
                 # Log to database
                 self._log_trapped_file(analysis, file_path, trap_path, source)
                 self._log_honeypot_event('FILE_TRAPPED', file_path, analysis)
+                self.security_db.log_access_attempt('HONEYPOT_TRAP', file_path, source,
+                                                    metadata={'file_hash': analysis['file_hash']})
                 
                 return {
                     'trapped': True,
                     'trap_path': trap_path,
+                    'file_hash': analysis['file_hash'],
                     'threat_level': analysis['threat_level'],
                     'threats': analysis['threats']
                 }
             except Exception as e:
                 self._log_honeypot_event('TRAP_FAILED', file_path, {'error': str(e)})
+                self.security_db.log_access_attempt('HONEYPOT_TRAP', file_path, source, success=False,
+                                                    metadata={'error': str(e)})
                 return {'trapped': False, 'error': str(e)}
         
         return {'trapped': False, 'reason': 'No significant threats detected'}
@@ -223,29 +306,36 @@ class HoneypotDefenseSystem:
     
     def _log_honeypot_event(self, event_type: str, file_path: str, metadata: Dict):
         """Log honeypot event"""
+        self._log_honeypot_events(event_type, [(file_path, metadata)])
+    
+    def _log_honeypot_events(self, event_type: str, events: List[tuple]):
+        """Log a batch of (file_path, metadata) events in one transaction"""
         import sqlite3
         
+        rows = []
+        for file_path, metadata in events:
+            file_hash = metadata.get('file_hash')
+            file_size = metadata.get('file_size', 0)
+            threat_level = metadata.get('threat_level', 'UNKNOWN')
+            action_taken = f"File analyzed and {'trapped' if metadata.get('trapped') else 'monitored'}"
+            rows.append((
+                event_type,
+                file_path,
+                file_hash,
+                file_size,
+                threat_level,
+                action_taken,
+                json.dumps(metadata)
+            ))
+        
         conn = sqlite3.connect(self.storage.db_path)
         cursor = conn.cursor()
         
-        file_hash = metadata.get('file_hash')
-        file_size = metadata.get('file_size', 0)
-        threat_level = metadata.get('threat_level', 'UNKNOWN')
-        action_taken = f"File analyzed and {'trapped' if metadata.get('trapped') else 'monitored'}"
-        
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO honeypot_logs 
             (event_type, file_path, file_hash, file_size, threat_level, action_taken, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            event_type,
-            file_path,
-            file_hash,
-            file_size,
-            threat_level,
-            action_taken,
-            json.dumps(metadata)
-        ))
+        ''', rows)
         
         conn.commit()
         conn.close()
@@ -261,13 +351,10 @@ class HoneypotDefenseSystem:
             risk_score += 30
         
         # Check for system file access attempts
-        system_paths = ['/etc/passwd', '/etc/shadow', '~/.ssh', '~/.gnupg']
-        accessed_paths = access_pattern.get('paths_accessed', [])
-        
-        for sys_path in system_paths:
-            if any(sys_path in path for path in accessed_paths):
-                suspicious_indicators.append(f'System file access attempt: {sys_path}')
-                risk_score += 40
+        matched = {self.intrusion_detector.trie.match(path) for path in access_pattern.get('paths_accessed', [])}
+        for sys_path in sorted(matched - {None}):
+            suspicious_indicators.append(f'System file access attempt: {sys_path}')
+            risk_score += 40
         
         # Check for credential harvesting patterns
         if access_pattern.get('password_files_accessed', 0) > 3:
@@ -275,7 +362,7 @@ class HoneypotDefenseSystem:
             risk_score += 50
         
         # Log intrusion attempt
-        if risk_score > 50:
+        if risk_score > ALERT_RISK_SCORE:
             self._log_honeypot_event('INTRUSION_DETECTED', 'multiple_files', {
                 'risk_score': risk_score,
                 'indicators': suspicious_indicators,
@@ -283,11 +370,18 @@ class HoneypotDefenseSystem:
             })
         
         return {
-            'intrusion_detected': risk_score > 50,
+            'intrusion_detected': risk_score > ALERT_RISK_SCORE,
             'risk_score': risk_score,
             'indicators': suspicious_indicators
         }
     
+    def record_access(self, path: str, process: str = 'unknown', timestamp: float = None) -> Optional[Dict]:
+        """Feed a raw file access event to the streaming intrusion detector"""
+        return self.intrusion_detector.process_event(process, path, timestamp)
+    
+    def _log_intrusion_alert(self, alert: Dict):
+        self._log_honeypot_event('INTRUSION_DETECTED', alert['path'], dict(alert, threat_level='HIGH'))
+    
     def get_honeypot_logs(self, limit: int = 100) -> List[Dict]:
         """Retrieve honeypot event logs"""
         import sqlite3
@@ -349,37 +443,43 @@ class HoneypotDefenseSystem:
         conn.close()
         return files
     
+    def restore_trapped_file(self, file_hash: str, dest_path: str):
+        """Decrypt a quarantined sample back to disk"""
+        self.quarantine.restore(file_hash, dest_path)
+        self._log_honeypot_event('FILE_RESTORED', dest_path, {'file_hash': file_hash})
+        self.security_db.log_access_attempt('HONEYPOT_RESTORE', dest_path, 'smart_encrypt',
+                                            metadata={'file_hash': file_hash})
+    
     def cleanup_old_traps(self, days_old: int = 30):
-        """Clean up old trapped files"""
+        """Clean up old trapped files and garbage-collect unreferenced samples"""
         import sqlite3
-        from datetime import timedelta
-        
-        cutoff_date = datetime.now() - timedelta(days=days_old)
         
         conn = sqlite3.connect(self.storage.db_path)
         cursor = conn.cursor()
         
-        # Get old trapped files
+        cutoff = f'{-int(days_old)} days'
+        
+        # Files trapped before the quarantine store existed are plain files in the trap dir
         cursor.execute('''
-            SELECT trap_path FROM trapped_files 
-            WHERE quarantine_date < ?
-        ''', (cutoff_date.isoformat(),))
+            SELECT trap_path FROM trapped_files
+            WHERE quarantine_date < datetime('now', ?) AND trap_path IS NOT NULL
+              AND trap_path NOT LIKE ?
+        ''', (cutoff, os.path.join(self.quarantine.objects_dir, '%')))
+        legacy_files = [row[0] for row in cursor.fetchall()]
         
-        old_files = cursor.fetchall()
+        cursor.execute("DELETE FROM trapped_files WHERE quarantine_date < datetime('now', ?)", (cutoff,))
+        removed = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
         
-        # Delete physical files
-        for (trap_path,) in old_files:
+        for trap_path in legacy_files:
             try:
                 if os.path.exists(trap_path):
                     os.remove(trap_path)
             except:
                 pass
         
-        # Remove from database
-        cursor.execute('DELETE FROM trapped_files WHERE quarantine_date < ?', 
-                      (cutoff_date.isoformat(),))
-        
-        conn.commit()
-        conn.close()
+        self.quarantine.collect_garbage()
         
-        return len(old_files)
\ No newline at end of file
+        return removed
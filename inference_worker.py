@@ -0,0 +1,251 @@
+"""Single worker thread that serves every request to the local language model"""
+import time
+import heapq
+import queue
+import itertools
+import threading
+from typing import Dict
+
+from response_cache import normalize_prompt
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+MAX_TOKENS = 300
+SUMMARY_TOKENS = 96
+SUMMARY_PERSONALITY = ("You summarize conversations between a user and Aaliya, a coding assistant. "
+                       "Reply with at most two plain sentences: what the user wanted and what Aaliya answered.")
+# Latency samples kept for the metrics
+LATENCY_WINDOW = 100
+# How often deferred requests check whether Aaliya's chat session went stale
+DEFER_POLL_SECONDS = 1.0
+
+_DONE = object()
+
+class InferenceRequest:
+    """One queued prompt; iterate it for tokens as the worker produces them
+
+    cancel() works while queued or generating. Identical prompts that are
+    waiting together share one generation; the model only stops early
+    when every request sharing it has been cancelled. A deferrable request
+    waits while Aaliya's chat session is live, so it never costs its KV cache.
+    """
+
+    def __init__(self, message: str, priority: int, max_latency: float, max_tokens: int,
+                 personality: str = None, grounded: bool = True, deferrable: bool = False):
+        self.message = message
+        self.priority = priority
+        self.max_latency = max_latency
+        self.max_tokens = max_tokens
+        self.personality = personality
+        self.grounded = grounded
+        self.deferrable = deferrable
+        self.key = (normalize_prompt(message), max_tokens, personality, grounded)
+        self.tokens = queue.Queue()
+        self.parts = []
+        self.batch = [self]
+        self.stream = None
+        self.cancel_event = threading.Event()
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.timed_out = False
+        self.cached = False
+        self.error = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        stream = self.stream
+        if stream and all(request.cancel_event.is_set() for request in self.batch):
+            stream.cancel()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        token = self.tokens.get()
+        if token is _DONE:
+            self.tokens.put(_DONE)
+            if self.error:
+                raise self.error
+            raise StopIteration
+        self.parts.append(token)
+        return token
+
+    def result(self) -> str:
+        """Block until the response is complete and return its text"""
+        for _ in self:
+            pass
+        return self.text
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started or time.monotonic()) - self.submitted
+
+class InferenceWorker:
+    """Owns the one AaliyaAI model and serializes every generation on one thread
+
+    Both the Aaliya chat and the code assistant submit here, so a single
+    loaded model is shared and never called from two threads at once.
+    Lower priority numbers run first; equal priorities run in order.
+    """
+
+    def __init__(self, aaliya=None, manager=None):
+        if aaliya is None:
+            from aaliya_ai import AaliyaAI
+            aaliya = AaliyaAI()
+        if manager is None:
+            from model_manager import ModelManager
+            manager = ModelManager(aaliya)
+        self.aaliya = aaliya
+        self.manager = manager
+        # Old conversation turns are summarized here, behind interactive requests
+        aaliya.memory.summarizer = self.summarize
+        self.pending = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.busy = False
+        self.stats = {'submitted': 0, 'completed': 0, 'batched': 0, 'errors': 0}
+        self.wait_times = []
+        self.latencies = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.manager.start()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def preload(self):
+        """Start the worker and warm the model in the background"""
+        self.start()
+        self.manager.preload()
+
+    def submit(self, message: str, priority: int = PRIORITY_INTERACTIVE, max_latency: float = None,
+               max_tokens: int = MAX_TOKENS, personality: str = None,
+               grounded: bool = True, deferrable: bool = False) -> InferenceRequest:
+        request = InferenceRequest(message, priority, max_latency, max_tokens, personality, grounded,
+                                   deferrable)
+        self.start()
+        with self.condition:
+            heapq.heappush(self.pending, (priority, next(self.order), request))
+            self.stats['submitted'] += 1
+            self.condition.notify()
+        return request
+
+    def summarize(self, text: str) -> str:
+        """Model summary of conversation turns; None keeps memory's extractive one
+        
+        It runs only once Aaliya's chat session is stale: memory folds a chunk
+        just before asking, so that is normally straight away.
+        """
+        if not self.manager.is_loaded:
+            return None
+        request = self.submit(f"Summarize this conversation:\n{text}", priority=PRIORITY_BACKGROUND,
+                              max_tokens=SUMMARY_TOKENS, personality=SUMMARY_PERSONALITY, grounded=False,
+                              deferrable=True)
+        summary = request.result().strip()
+        return None if request.timed_out or request.cancelled else summary
+
+    def _next_batch(self) -> list:
+        """Highest priority ready request plus every waiting request with the same prompt"""
+        with self.condition:
+            while self.running:
+                if self.pending and not self.pending[0][2].deferrable:
+                    leader = self.pending[0][2]
+                    break
+                live = self.aaliya.session_live()
+                ready = [entry for entry in self.pending if not (entry[2].deferrable and live)]
+                if ready:
+                    leader = min(ready)[2]
+                    break
+                # Deferred requests wait for the chat session to go stale
+                self.condition.wait(DEFER_POLL_SECONDS if self.pending else None)
+            if not self.running:
+                return []
+            batch = [leader] + [entry[2] for entry in self.pending
+                                if entry[2].key == leader.key and entry[2] is not leader]
+            self.pending = [entry for entry in self.pending if entry[2].key != leader.key]
+            heapq.heapify(self.pending)
+            self.stats['batched'] += len(batch) - 1
+            self.busy = True
+        return batch
+
+    def _serve(self, batch: list):
+        leader = batch[0]
+        now = time.monotonic()
+        for request in batch:
+            request.batch = batch
+            request.started = now
+
+        if all(request.cancel_event.is_set() for request in batch):
+            return
+
+        with self.manager.in_use():
+            self.manager.ensure_loaded()
+            stream = self.aaliya.stream_response(leader.message, max_latency=leader.max_latency,
+                                                 max_tokens=leader.max_tokens,
+                                                 personality=leader.personality,
+                                                 grounded=leader.grounded)
+            for request in batch:
+                request.stream = stream
+            # A cancel that arrived before the stream existed could not stop it
+            if all(request.cancel_event.is_set() for request in batch):
+                stream.cancel()
+            for token in stream:
+                for request in batch:
+                    if not request.cancel_event.is_set():
+                        request.tokens.put(token)
+
+        for request in batch:
+            request.timed_out = stream.timed_out
+            request.cached = stream.cached
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._serve(batch)
+            except Exception as e:
+                print(f"Inference error: {e}")
+                self.stats['errors'] += 1
+                for request in batch:
+                    request.error = e
+            finally:
+                finished = time.monotonic()
+                with self.condition:
+                    self.busy = False
+                    for request in batch:
+                        request.finished = finished
+                        request.cancelled = request.cancel_event.is_set()
+                        self.stats['completed'] += 1
+                        self.wait_times.append(request.wait_seconds)
+                        self.latencies.append(finished - request.submitted)
+                    del self.wait_times[:-LATENCY_WINDOW]
+                    del self.latencies[:-LATENCY_WINDOW]
+                for request in batch:
+                    request.tokens.put(_DONE)
+
+    def get_stats(self) -> Dict[str, any]:
+        with self.condition:
+            latencies = sorted(self.latencies)
+            return dict(self.stats,
+                        queue_depth=len(self.pending),
+                        busy=self.busy,
+                        mean_wait=sum(self.wait_times) / len(self.wait_times) if self.wait_times else 0.0,
+                        mean_latency=sum(latencies) / len(latencies) if latencies else 0.0,
+                        p95_latency=latencies[int(len(latencies) * 0.95)] if latencies else 0.0)
@@ -0,0 +1,198 @@
+"""Streaming intrusion detection for the Honeypot Defense System"""
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+SENSITIVE_PATHS = ['/etc/passwd', '/etc/shadow', '/etc/sudoers', '~/.ssh', '~/.gnupg', '~/.aws']
+CREDENTIAL_FILE_PATTERN = re.compile(
+    r'passw|credential|secret|\.kdbx$|\.pem$|\.key$|\.pfx$|\.p12$|^id_(rsa|dsa|ecdsa|ed25519)|'
+    r'^\.netrc$|^\.pgpass$|^shadow$|wallet', re.IGNORECASE)
+
+WINDOW_SECONDS = 60
+RAPID_ACCESS_THRESHOLD = 10  # files per window
+CREDENTIAL_ACCESS_THRESHOLD = 3
+ALERT_RISK_SCORE = 50
+MAX_TRACKED_PROCESSES = 4096
+
+class PathTrie:
+    """Prefix trie over path components, so lookups cost one step per component"""
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self.root = {}
+        for path in paths:
+            self.insert(path)
+
+    @staticmethod
+    def _components(path: str) -> List[str]:
+        return [part for part in os.path.expanduser(path).split(os.sep) if part]
+
+    def insert(self, path: str, label: str = None):
+        """Register a path prefix; matches report label (defaults to the path as given)"""
+        node = self.root
+        for part in self._components(path):
+            node = node.setdefault(part, {})
+        node[None] = label or path
+
+    def match(self, path: str) -> Optional[str]:
+        """Label of the shortest registered prefix of path, or None"""
+        if path.startswith('~'):
+            path = os.path.expanduser(path)
+        node = self.root
+        for part in path.split(os.sep):
+            if not part:
+                continue
+            node = node.get(part)
+            if node is None:
+                return None
+            if None in node:
+                return node[None]
+        return None
+
+class SlidingWindowCounter:
+    """Event count over the last N seconds, kept in a ring of one-second buckets"""
+    __slots__ = ('buckets', 'head', 'total')
+
+    def __init__(self, window_seconds: int = WINDOW_SECONDS):
+        self.buckets = [0] * window_seconds
+        self.head = 0
+        self.total = 0
+
+    def _advance(self, second: int):
+        size = len(self.buckets)
+        steps = min(second - self.head, size)
+        # Expire the buckets that fell out of the window since the last event
+        for s in range(self.head + 1, self.head + steps + 1):
+            index = s % size
+            self.total -= self.buckets[index]
+            self.buckets[index] = 0
+        self.head = second
+
+    def add(self, second: int, amount: int = 1) -> int:
+        """Count amount events at second and return the window total"""
+        if second > self.head:
+            self._advance(second)
+        elif second <= self.head - len(self.buckets):
+            return self.total  # older than the window
+        self.buckets[second % len(self.buckets)] += amount
+        self.total += amount
+        return self.total
+
+    def count(self, second: int) -> int:
+        if second > self.head:
+            self._advance(second)
+        return self.total
+
+class ProcessActivity:
+    """Sliding-window state for a single process"""
+    __slots__ = ('accesses', 'credential_accesses', 'sensitive_hits', 'alerted')
+
+    def __init__(self, window_seconds: int):
+        self.accesses = SlidingWindowCounter(window_seconds)
+        self.credential_accesses = SlidingWindowCounter(window_seconds)
+        self.sensitive_hits = {}  # sensitive path label -> last second seen
+        self.alerted = {}  # indicator -> second it was last alerted
+
+class StreamingIntrusionDetector:
+    """Consume raw access events and raise alerts as soon as a process crosses the risk threshold"""
+
+    def __init__(self, alert_callback: Callable = None, sensitive_paths: List[str] = None,
+                 window_seconds: int = WINDOW_SECONDS, max_processes: int = MAX_TRACKED_PROCESSES):
+        self.alert_callback = alert_callback
+        self.window_seconds = window_seconds
+        self.max_processes = max_processes
+        self.trie = PathTrie(sensitive_paths or SENSITIVE_PATHS)
+        self.processes = OrderedDict()
+        self.events_processed = 0
+        self.alerts_raised = 0
+
+    def _activity(self, process: str) -> ProcessActivity:
+        activity = self.processes.get(process)
+        if activity is None:
+            # Bounded memory: forget the least recently active process
+            if len(self.processes) >= self.max_processes:
+                self.processes.popitem(last=False)
+            activity = self.processes[process] = ProcessActivity(self.window_seconds)
+        else:
+            self.processes.move_to_end(process)
+        return activity
+
+    def score(self, activity: ProcessActivity, second: int) -> tuple:
+        """Risk score and indicators for a process as of second"""
+        indicators = []
+        risk_score = 0
+
+        if activity.accesses.count(second) > RAPID_ACCESS_THRESHOLD:
+            indicators.append('Rapid file enumeration detected')
+            risk_score += 30
+
+        for label, seen in activity.sensitive_hits.items():
+            if second - seen < self.window_seconds:
+                indicators.append(f'System file access attempt: {label}')
+                risk_score += 40
+
+        if activity.credential_accesses.count(second) > CREDENTIAL_ACCESS_THRESHOLD:
+            indicators.append('Credential harvesting pattern detected')
+            risk_score += 50
+
+        return risk_score, indicators
+
+    def process_event(self, process: str, path: str, timestamp: float = None) -> Optional[Dict]:
+        """Feed one access event; returns an alert dict when one is raised"""
+        second = int(timestamp if timestamp is not None else time.time())
+        activity = self._activity(process or 'unknown')
+        self.events_processed += 1
+
+        activity.accesses.add(second)
+        label = self.trie.match(path)
+        if label is not None:
+            activity.sensitive_hits[label] = second
+        if CREDENTIAL_FILE_PATTERN.search(os.path.basename(path)):
+            activity.credential_accesses.add(second)
+
+        # Cheap early exit: nothing can push the score over the threshold yet
+        if (activity.accesses.total <= RAPID_ACCESS_THRESHOLD and not activity.sensitive_hits
+                and activity.credential_accesses.total <= CREDENTIAL_ACCESS_THRESHOLD):
+            return None
+
+        risk_score, indicators = self.score(activity, second)
+        if risk_score <= ALERT_RISK_SCORE:
+            return None
+
+        # Alert once per indicator per window instead of on every event
+        new_indicators = [i for i in indicators
+                          if second - activity.alerted.get(i, -self.window_seconds) >= self.window_seconds]
+        if not new_indicators:
+            return None
+        for indicator in indicators:
+            activity.alerted[indicator] = second
+
+        alert = {
+            'process': process,
+            'path': path,
+            'timestamp': second,
+            'risk_score': risk_score,
+            'indicators': indicators,
+            'new_indicators': new_indicators
+        }
+        self.alerts_raised += 1
+        if self.alert_callback:
+            self.alert_callback(alert)
+        return alert
+
+    def process_events(self, events: Iterable[tuple]) -> List[Dict]:
+        """Feed (process, path, timestamp) events and return the alerts raised"""
+        alerts = []
+        for process, path, timestamp in events:
+            alert = self.process_event(process, path, timestamp)
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'events_processed': self.events_processed,
+            'alerts_raised': self.alerts_raised,
+            'tracked_processes': len(self.processes)
+        }
@@ -0,0 +1,290 @@
+"""Resumable, checksum-verified downloads for large model files"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, List
+
+CHUNK_SIZE = 1024 * 1024
+SEGMENTS = 4
+# Files smaller than this per segment are fetched as a single stream
+MIN_SEGMENT_SIZE = 32 * 1024 * 1024
+TIMEOUT = 30
+PROGRESS_INTERVAL = 0.25
+# Segment progress is written to the state file after this many bytes
+STATE_SAVE_BYTES = 16 * 1024 * 1024
+# Hugging Face sends the SHA-256 and size of LFS files as X-Linked-Etag and
+# X-Linked-Size on the redirect to its CDN, not on the final response
+SHA256_HEADER = re.compile(r'^(?:W/)?"?([0-9a-f]{64})"?$')
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _verified_record_path(path: str) -> str:
+    return path + '.verified.json'
+
+def _remember_verified(path: str, sha256: str):
+    stat = os.stat(path)
+    with open(_verified_record_path(path), 'w') as f:
+        json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}, f)
+
+def verify_file(path: str, sha256: str) -> bool:
+    """True if path hashes to sha256; a match is remembered by size and mtime
+
+    Model files run to gigabytes, so an unchanged file is only hashed once.
+    """
+    sha256 = sha256.lower()
+    stat = os.stat(path)
+    try:
+        with open(_verified_record_path(path)) as f:
+            record = json.load(f)
+        if record == {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}:
+            return True
+    except (OSError, ValueError):
+        pass
+    if file_sha256(path) != sha256:
+        return False
+    _remember_verified(path, sha256)
+    return True
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Surface 3xx responses as HTTPError so their headers can be read"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class ModelDownloader:
+    """Download url to dest through dest.part, renaming it only once verified
+
+    An interrupted download resumes from the .part file with an HTTP Range
+    request. When the server accepts ranges and the file is large enough,
+    it is fetched as parallel segments whose progress is kept in
+    dest.part.json. A single stream is hashed while it downloads; segments
+    arrive out of order, so they are hashed in one pass at the end.
+    """
+
+    def __init__(self, url: str, dest: str, sha256: str = None, segments: int = SEGMENTS,
+                 progress: Callable = None, chunk_size: int = CHUNK_SIZE,
+                 min_segment_size: int = MIN_SEGMENT_SIZE):
+        self.url = url
+        self.dest = dest
+        self.part_path = dest + '.part'
+        self.state_path = self.part_path + '.json'
+        self.sha256 = sha256.lower() if sha256 else None
+        self.segments = max(1, segments)
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.min_segment_size = min_segment_size
+        self.lock = threading.Lock()
+        self.total = 0
+        self.completed = 0
+        self.transferred = 0
+        self.started = None
+        self.last_report = 0.0
+        self.segment_count = 1
+
+    def _open(self, start: int = 0, end: int = None, method: str = 'GET'):
+        headers = {}
+        if start or end is not None:
+            headers['Range'] = f"bytes={start}-{'' if end is None else end}"
+        request = urllib.request.Request(self.url, headers=headers, method=method)
+        return urllib.request.urlopen(request, timeout=TIMEOUT)
+
+    def _first_head(self) -> tuple:
+        """(status, headers) of the HEAD response before any redirect is followed"""
+        opener = urllib.request.build_opener(_NoRedirect)
+        request = urllib.request.Request(self.url, method='HEAD')
+        try:
+            with opener.open(request, timeout=TIMEOUT) as response:
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:
+            if 300 <= e.code < 400:
+                return e.code, e.headers
+            raise
+
+    def _probe(self) -> tuple:
+        """(total size, accepts ranges, SHA-256 advertised by the server)"""
+        status, first = self._first_head()
+        responses = [first]
+        if 300 <= status < 400:
+            with self._open(method='HEAD') as response:
+                responses.append(response.headers)
+        final = responses[-1]
+
+        total = int(first.get('X-Linked-Size') or final.get('Content-Length') or 0)
+        ranges = final.get('Accept-Ranges', '').lower() == 'bytes'
+        advertised = None
+        for header in ('X-Linked-Etag', 'ETag'):
+            for headers in responses:
+                match = SHA256_HEADER.match(headers.get(header, '').strip().lower())
+                if match:
+                    advertised = match.group(1)
+                    break
+            if advertised:
+                break
+        return total, ranges, advertised
+
+    def _advance(self, count: int):
+        with self.lock:
+            self.completed += count
+            self.transferred += count
+            now = time.monotonic()
+            if not self.progress or now - self.last_report < PROGRESS_INTERVAL:
+                return
+            self.last_report = now
+            completed, rate = self.completed, self.transferred / max(now - self.started, 1e-6)
+        percent = completed * 100 / self.total if self.total else 0
+        self.progress(f"Downloading... {completed // 1024 // 1024}MB at {rate / 1024 / 1024:.1f}MB/s", percent)
+
+    def _download_stream(self, ranges: bool) -> str:
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        if not ranges or (self.total and offset > self.total):
+            offset = 0
+
+        digest = hashlib.sha256()
+        if offset:
+            with open(self.part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    digest.update(chunk)
+        self.completed = offset
+        if self.total and offset == self.total:
+            return digest.hexdigest()
+
+        with self._open(start=offset) as response:
+            if offset and response.status != 206:
+                # The server ignored the range and is sending the whole file
+                offset = self.completed = 0
+                digest = hashlib.sha256()
+            with open(self.part_path, 'ab' if offset else 'wb') as f:
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    self._advance(len(chunk))
+        return digest.hexdigest()
+
+    def _load_segments(self) -> List[List[int]]:
+        """[start, end, written] per segment, resumed when the saved state matches"""
+        if os.path.exists(self.state_path) and os.path.exists(self.part_path):
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+                if state.get('url') == self.url and state.get('total') == self.total:
+                    return state['segments']
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring download state: {e}")
+
+        size = -(-self.total // self.segments)
+        with open(self.part_path, 'wb') as f:
+            f.truncate(self.total)
+        return [[start, min(start + size, self.total) - 1, 0] for start in range(0, self.total, size)]
+
+    def _save_segments(self, segments: List[List[int]]):
+        with self.lock:
+            with open(self.state_path, 'w') as f:
+                json.dump({'url': self.url, 'total': self.total, 'segments': segments}, f)
+
+    def _fetch_segment(self, segment: List[int], segments: List[List[int]], errors: List[Exception]):
+        start, end, written = segment
+        if start + written > end:
+            return
+        try:
+            with self._open(start=start + written, end=end) as response, open(self.part_path, 'r+b') as f:
+                if response.status != 206:
+                    raise OSError(f"Server ignored range request for bytes {start + written}-{end}")
+                f.seek(start + written)
+                unsaved = 0
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    with self.lock:
+                        segment[2] += len(chunk)
+                    self._advance(len(chunk))
+                    unsaved += len(chunk)
+                    if unsaved >= STATE_SAVE_BYTES:
+                        # Only bytes already handed to the OS are recorded as written
+                        f.flush()
+                        self._save_segments(segments)
+                        unsaved = 0
+        except Exception as e:
+            errors.append(e)
+        finally:
+            self._save_segments(segments)
+
+    def _download_segments(self) -> str:
+        segments = self._load_segments()
+        self.segment_count = len(segments)
+        self.completed = sum(written for _, _, written in segments)
+        errors = []
+        threads = [threading.Thread(target=self._fetch_segment, args=(segment, segments, errors), daemon=True)
+                   for segment in segments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        if any(start + written <= end for start, end, written in segments):
+            raise OSError("Download ended before every segment was complete")
+        return file_sha256(self.part_path, self.chunk_size)
+
+    def _discard(self):
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def download(self) -> Dict[str, any]:
+        """Fetch, verify and atomically move the file into place; returns transfer stats"""
+        self.started = time.monotonic()
+        self.total, ranges, advertised = self._probe()
+        expected = self.sha256 or advertised
+        segmented = (ranges and self.segments > 1 and
+                     self.total >= self.segments * self.min_segment_size)
+
+        if segmented:
+            actual = self._download_segments()
+        else:
+            if os.path.exists(self.state_path):
+                # A segmented .part has holes, so it cannot be resumed as one stream
+                self._discard()
+            actual = self._download_stream(ranges)
+        resumed_from = self.completed - self.transferred
+
+        if self.total and os.path.getsize(self.part_path) != self.total:
+            raise OSError(f"Incomplete download: {os.path.getsize(self.part_path)} of {self.total} bytes")
+        if expected and actual != expected:
+            self._discard()
+            raise ValueError(f"Checksum mismatch: expected {expected}, got {actual}")
+
+        os.replace(self.part_path, self.dest)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        if expected:
+            _remember_verified(self.dest, actual)
+
+        seconds = time.monotonic() - self.started
+        return {
+            'bytes': self.completed,
+            'transferred': self.transferred,
+            'resumed_from': resumed_from,
+            'segments': self.segment_count,
+            'seconds': seconds,
+            'mb_per_s': self.transferred / max(seconds, 1e-6) / (1024 * 1024),
+            'sha256': actual,
+            'verified': bool(expected)
+        }
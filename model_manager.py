@@ -0,0 +1,184 @@
+"""Background loading and memory management for the Aaliya model"""
+import os
+import mmap
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+IDLE_UNLOAD_MINUTES = 15
+# Unload when system memory use crosses this percentage
+MEMORY_PRESSURE_PERCENT = 90.0
+CHECK_INTERVAL = 10
+
+def _rss_mb() -> float:
+    if psutil is None:
+        return 0.0
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+class ModelManager:
+    """Owns the lifecycle of AaliyaAI's model
+
+    preload() loads on a daemon thread so the chat opens without waiting;
+    callers that need the model meanwhile block on the same lock instead of
+    loading twice. The weights file stays memory-mapped after an idle
+    unload, so reloading reads from the page cache instead of disk. Memory
+    pressure drops the mapping as well.
+    """
+
+    def __init__(self, aaliya, idle_minutes: float = IDLE_UNLOAD_MINUTES,
+                 max_rss_mb: float = None, pressure_percent: float = MEMORY_PRESSURE_PERCENT):
+        self.aaliya = aaliya
+        self.idle_minutes = idle_minutes
+        self.max_rss_mb = max_rss_mb
+        self.pressure_percent = pressure_percent
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.active = 0
+        self.weights_map = None
+        self.backend_missing = False
+        self.on_unload = None
+        self.running = False
+        self.thread = None
+        self.stats = {'loads': 0, 'unloads': 0, 'load_seconds': None,
+                      'model_rss_mb': None, 'last_unload_reason': None}
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.aaliya.models_dir, self.aaliya.model_name)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.aaliya.model is not None
+
+    def start(self):
+        """Start watching for idle time and memory pressure"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._monitor, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def preload(self) -> threading.Thread:
+        """Load the model on a background thread if its file is already downloaded"""
+        if self.is_loaded or not os.path.exists(self.model_path):
+            return None
+        thread = threading.Thread(target=self.load, daemon=True)
+        thread.start()
+        return thread
+
+    def _map_weights(self):
+        """Map the weights file read-only and ask the kernel to read it ahead"""
+        if self.weights_map is not None:
+            return
+        try:
+            with open(self.model_path, 'rb') as f:
+                self.weights_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self.weights_map, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+                self.weights_map.madvise(mmap.MADV_WILLNEED)
+        except (OSError, ValueError) as e:
+            print(f"Could not map model weights: {e}")
+            self.weights_map = None
+
+    def _release_weights(self):
+        if self.weights_map is not None:
+            self.weights_map.close()
+            self.weights_map = None
+
+    def load(self) -> bool:
+        """Load the model now; returns True once it is in memory"""
+        with self.lock:
+            self.last_used = time.time()
+            if self.is_loaded:
+                return True
+            # Also checks the file against model_sha256, when one is set
+            if not self.aaliya.model_ready():
+                return False
+
+            start = time.perf_counter()
+            rss_before = _rss_mb()
+            self._map_weights()
+            self.aaliya.model_loaded = False
+            self.aaliya.load_model()
+            if not self.is_loaded:
+                # No usable backend (e.g. gpt4all missing); AaliyaAI answers in fallback mode
+                self.backend_missing = True
+                return False
+
+            self.backend_missing = False
+            self.stats['loads'] += 1
+            self.stats['load_seconds'] = time.perf_counter() - start
+            self.stats['model_rss_mb'] = _rss_mb() - rss_before
+            return True
+
+    def ensure_loaded(self) -> bool:
+        """Reload after an idle or pressure unload; never retries a missing backend"""
+        if self.is_loaded:
+            self.last_used = time.time()
+            return True
+        if self.backend_missing:
+            return False
+        return self.load()
+
+    @contextmanager
+    def in_use(self):
+        """Hold the model while a response is generated so it is not unloaded midway"""
+        with self.lock:
+            self.active += 1
+        try:
+            yield self.aaliya
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.last_used = time.time()
+
+    def unload(self, reason: str = 'manual', release_weights: bool = False) -> bool:
+        """Drop the model; the weights stay mapped unless release_weights is set"""
+        with self.lock:
+            if self.active:
+                return False
+            was_loaded = self.is_loaded
+            self.aaliya.unload_model()
+            if release_weights:
+                self._release_weights()
+            if was_loaded:
+                self.stats['unloads'] += 1
+                self.stats['last_unload_reason'] = reason
+        if was_loaded and self.on_unload:
+            self.on_unload(reason)
+        return was_loaded
+
+    def memory_pressure(self) -> bool:
+        if psutil is None:
+            return False
+        if self.max_rss_mb and _rss_mb() > self.max_rss_mb:
+            return True
+        return psutil.virtual_memory().percent >= self.pressure_percent
+
+    def _check(self):
+        if not self.is_loaded:
+            return
+        if self.memory_pressure():
+            self.unload('memory pressure', release_weights=True)
+        elif time.time() - self.last_used > self.idle_minutes * 60:
+            self.unload('idle')
+
+    def _monitor(self):
+        while self.running:
+            self._check()
+            time.sleep(CHECK_INTERVAL)
+
+    def get_stats(self) -> Dict[str, any]:
+        return dict(self.stats,
+                    loaded=self.is_loaded,
+                    rss_mb=_rss_mb(),
+                    mapped_mb=len(self.weights_map) / (1024 * 1024) if self.weights_map is not None else 0.0,
+                    idle_seconds=time.time() - self.last_used)
@@ -0,0 +1,232 @@
+"""Content-addressed quarantine store for the Honeypot Defense System"""
+import os
+import zlib
+import struct
+import sqlite3
+import hashlib
+import secrets
+import base64
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, BinaryIO
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b'SEQ1'
+CHUNK_SIZE = 1024 * 1024
+NONCE_PREFIX_SIZE = 8
+FINAL_RECORD = 0x80000000  # flag bit in the record length header
+
+class QuarantineStore:
+    """Stores each unique sample once, zlib-compressed and AES-GCM encrypted"""
+
+    def __init__(self, storage_manager, store_dir: str):
+        self.storage = storage_manager
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self._key = None
+
+        Path(self.objects_dir).mkdir(parents=True, exist_ok=True)
+        os.chmod(self.objects_dir, 0o700)
+        self.init_db()
+
+    def init_db(self):
+        """Initialize the object registry"""
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quarantine_objects (
+                sha256 TEXT PRIMARY KEY,
+                original_size INTEGER,
+                stored_size INTEGER,
+                ref_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trapped_files_hash ON trapped_files (file_hash)')
+
+        conn.commit()
+        conn.close()
+
+    def _get_key(self) -> bytes:
+        """Load the quarantine key from the vault settings, creating it on first use
+
+        A key that exists but cannot be decrypted is never replaced, since
+        every stored sample would become unrecoverable.
+        """
+        if self._key is None:
+            if not self.storage.has_setting('quarantine_key'):
+                self._key = AESGCM.generate_key(bit_length=256)
+                self.storage.set_setting('quarantine_key', base64.b64encode(self._key).decode())
+                return self._key
+            stored = self.storage.get_setting('quarantine_key')
+            if not stored:
+                raise ValueError("Quarantine key could not be decrypted; is the vault unlocked?")
+            self._key = base64.b64decode(stored)
+        return self._key
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def has_object(self, sha256: str) -> bool:
+        return os.path.exists(self.object_path(sha256))
+
+    def _write_record(self, out: BinaryIO, aesgcm: AESGCM, prefix: bytes, counter: int,
+                      data: bytes, final: bool):
+        nonce = prefix + struct.pack('>I', counter)
+        sealed = aesgcm.encrypt(nonce, data, struct.pack('>I?', counter, final))
+        out.write(struct.pack('>I', len(sealed) | (FINAL_RECORD if final else 0)))
+        out.write(sealed)
+
+    def add_file(self, file_path: str) -> Dict[str, any]:
+        """Compress and encrypt a file into the store, deduplicating by SHA-256"""
+        aesgcm = AESGCM(self._get_key())
+        prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+        compressor = zlib.compressobj(6)
+        digest = hashlib.sha256()
+        original_size = 0
+        counter = 0
+        pending = b''
+
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, prefix='.incoming_')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as src:
+                out.write(MAGIC + prefix)
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    original_size += len(chunk)
+                    pending += compressor.compress(chunk)
+                    while len(pending) >= CHUNK_SIZE:
+                        self._write_record(out, aesgcm, prefix, counter, pending[:CHUNK_SIZE], False)
+                        pending = pending[CHUNK_SIZE:]
+                        counter += 1
+                pending += compressor.flush()
+                self._write_record(out, aesgcm, prefix, counter, pending, True)
+
+            sha256 = digest.hexdigest()
+            target = self.object_path(sha256)
+            deduplicated = os.path.exists(target)
+            if deduplicated:
+                os.remove(temp_path)
+            else:
+                Path(os.path.dirname(target)).mkdir(exist_ok=True)
+                os.chmod(temp_path, 0o600)
+                os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        stored_size = os.path.getsize(target)
+
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO quarantine_objects (sha256, original_size, stored_size, ref_count)
+            VALUES (?, ?, ?, 0)
+        ''', (sha256, original_size, stored_size))
+        cursor.execute('UPDATE quarantine_objects SET ref_count = ref_count + 1 WHERE sha256 = ?', (sha256,))
+        conn.commit()
+        conn.close()
+
+        return {
+            'sha256': sha256,
+            'object_path': target,
+            'original_size': original_size,
+            'stored_size': stored_size,
+            'deduplicated': deduplicated
+        }
+
+    def read_stream(self, sha256: str) -> Iterator[bytes]:
+        """Yield the decrypted, decompressed sample in chunks"""
+        aesgcm = AESGCM(self._get_key())
+        decompressor = zlib.decompressobj()
+
+        with open(self.object_path(sha256), 'rb') as f:
+            header = f.read(len(MAGIC) + NONCE_PREFIX_SIZE)
+            if header[:len(MAGIC)] != MAGIC:
+                raise ValueError("Not a quarantine object")
+            prefix = header[len(MAGIC):]
+
+            counter = 0
+            while True:
+                length_bytes = f.read(4)
+                if len(length_bytes) < 4:
+                    raise ValueError("Quarantine object is truncated")
+                header_value = struct.unpack('>I', length_bytes)[0]
+                final = bool(header_value & FINAL_RECORD)
+                sealed = f.read(header_value & ~FINAL_RECORD)
+                nonce = prefix + struct.pack('>I', counter)
+                # The final flag is authenticated, so dropping trailing records is detected
+                data = aesgcm.decrypt(nonce, sealed, struct.pack('>I?', counter, final))
+                chunk = decompressor.decompress(data)
+                if chunk:
+                    yield chunk
+                if final:
+                    break
+                counter += 1
+
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+
+    def restore(self, sha256: str, dest_path: str):
+        """Stream a sample back to disk, writing atomically"""
+        dest_dir = os.path.dirname(os.path.abspath(dest_path))
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix='.restore_')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in self.read_stream(sha256):
+                    digest.update(chunk)
+                    out.write(chunk)
+            if digest.hexdigest() != sha256:
+                raise ValueError("Restored sample does not match its hash")
+            os.replace(temp_path, dest_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def collect_garbage(self) -> List[str]:
+        """Delete objects no longer referenced by any trapped_files row"""
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE quarantine_objects SET ref_count = (
+                SELECT COUNT(*) FROM trapped_files t WHERE t.file_hash = quarantine_objects.sha256
+            )
+        ''')
+        cursor.execute('SELECT sha256 FROM quarantine_objects WHERE ref_count = 0')
+        orphaned = [row[0] for row in cursor.fetchall()]
+
+        for sha256 in orphaned:
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+        cursor.execute('DELETE FROM quarantine_objects WHERE ref_count = 0')
+
+        conn.commit()
+        conn.close()
+        return orphaned
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get object counts and space saved by compression and deduplication"""
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(stored_size), 0),
+                   COALESCE(SUM(original_size * ref_count), 0), COALESCE(SUM(ref_count), 0)
+            FROM quarantine_objects
+        ''')
+        objects, stored, logical, references = cursor.fetchone()
+        conn.close()
+
+        return {
+            'unique_samples': objects,
+            'references': references,
+            'stored_bytes': stored,
+            'logical_bytes': logical,
+            'saved_bytes': max(logical - stored, 0)
+        }
@@ -0,0 +1,196 @@
+"""Persistent prompt/response cache for Aaliya AI"""
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+from typing import Dict, List, Optional
+
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 1000
+
+# Near-duplicate lookup: MinHash over word unigrams and bigrams, split into
+# LSH bands so candidates come from an index instead of a table scan
+SIGNATURE_SIZE = 32
+BAND_ROWS = 4
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Words that can differ between near duplicates; every other word must match,
+# so negations (not, never, don't) and changed subjects are always misses
+NEAR_DUPLICATE_STOPWORDS = frozenset('''
+a an the i me my we our you your it its this that these those is are am was were be been
+do does did can could would will please to of in on for with at by from and or so just
+'''.split())
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(SIGNATURE_SIZE)]
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation do not change the question"""
+    return re.sub(r'\s+', ' ', prompt.lower()).strip().rstrip('?!.').strip()
+
+def _shingles(normalized: str) -> set:
+    words = re.findall(r'\w+', normalized)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def content_words(normalized: str) -> frozenset:
+    return frozenset(re.findall(r'\w+', normalized)) - NEAR_DUPLICATE_STOPWORDS
+
+def minhash_signature(normalized: str) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+              for shingle in _shingles(normalized)]
+    if not hashes:
+        return []
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def _bands(signature: List[int]) -> List[str]:
+    return [hashlib.blake2b(repr((i, signature[i:i + BAND_ROWS])).encode(), digest_size=8).hexdigest()
+            for i in range(0, len(signature), BAND_ROWS)]
+
+def estimated_similarity(first: List[int], second: List[int]) -> float:
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+class ResponseCache:
+    """Responses keyed by normalized prompt, model and generation parameters
+
+    Entries expire after ttl seconds and the least recently used are
+    evicted beyond max_entries. With near_duplicates on, a miss falls back
+    to prompts whose MinHash signature is at least the threshold similar and
+    whose words match apart from NEAR_DUPLICATE_STOPWORDS. It is off by
+    default: shingle similarity alone cannot tell long prompts apart that
+    differ in one key word.
+    """
+
+    def __init__(self, db_path: str, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 near_duplicates: bool = False, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.init_db()
+
+    def init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                context_key TEXT NOT NULL,
+                normalized_prompt TEXT,
+                signature TEXT,
+                response TEXT,
+                created_at REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_used ON response_cache (last_used)')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache_bands (
+                band TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                PRIMARY KEY (band, cache_key)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS response_cache_bands_delete AFTER DELETE ON response_cache
+            BEGIN
+                DELETE FROM response_cache_bands WHERE cache_key = OLD.cache_key;
+            END
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _context_key(model: str, params: Dict) -> str:
+        return hashlib.sha256(json.dumps([model, params], sort_keys=True).encode()).hexdigest()
+
+    def _keys(self, prompt: str, model: str, params: Dict) -> tuple:
+        normalized = normalize_prompt(prompt)
+        context_key = self._context_key(model, params)
+        cache_key = hashlib.sha256(f"{context_key}\0{normalized}".encode()).hexdigest()
+        return normalized, context_key, cache_key
+
+    def get(self, prompt: str, model: str, params: Dict) -> Optional[str]:
+        """Cached response for this prompt under this model and parameters, if fresh"""
+        normalized, context_key, cache_key = self._keys(prompt, model, params)
+        oldest = time.time() - self.ttl
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT response FROM response_cache WHERE cache_key = ? AND created_at >= ?',
+                       (cache_key, oldest))
+        row = cursor.fetchone()
+
+        if row is None and self.near_duplicates:
+            signature = minhash_signature(normalized)
+            bands = _bands(signature)
+            words = content_words(normalized)
+            if bands:
+                cursor.execute(f'''
+                    SELECT DISTINCT c.cache_key, c.normalized_prompt, c.signature, c.response
+                    FROM response_cache_bands b JOIN response_cache c ON c.cache_key = b.cache_key
+                    WHERE b.band IN ({', '.join('?' * len(bands))})
+                      AND c.context_key = ? AND c.created_at >= ?
+                ''', (*bands, context_key, oldest))
+                best = 0.0
+                for candidate_key, candidate_prompt, candidate_signature, response in cursor.fetchall():
+                    if content_words(candidate_prompt) != words:
+                        continue
+                    similarity = estimated_similarity(signature, json.loads(candidate_signature))
+                    if similarity >= self.threshold and similarity > best:
+                        best, cache_key, row = similarity, candidate_key, (response,)
+
+        if row is not None:
+            cursor.execute('UPDATE response_cache SET last_used = ?, hits = hits + 1 WHERE cache_key = ?',
+                           (time.time(), cache_key))
+            conn.commit()
+        conn.close()
+        return row[0] if row else None
+
+    def put(self, prompt: str, model: str, params: Dict, response: str):
+        """Store a complete response, evicting expired and least recently used entries"""
+        normalized, context_key, cache_key = self._keys(prompt, model, params)
+        signature = minhash_signature(normalized)
+        now = time.time()
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM response_cache WHERE cache_key = ?', (cache_key,))
+        cursor.execute('''
+            INSERT INTO response_cache
+            (cache_key, context_key, normalized_prompt, signature, response, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (cache_key, context_key, normalized, json.dumps(signature), response, now, now))
+        cursor.executemany('INSERT OR IGNORE INTO response_cache_bands (band, cache_key) VALUES (?, ?)',
+                           [(band, cache_key) for band in _bands(signature)])
+
+        cursor.execute('DELETE FROM response_cache WHERE created_at < ?', (now - self.ttl,))
+        cursor.execute('''
+            DELETE FROM response_cache WHERE cache_key IN (
+                SELECT cache_key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+        conn.commit()
+        conn.close()
+
+    def clear(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('DELETE FROM response_cache')
+        conn.commit()
+        conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM response_cache')
+        entries, hits = cursor.fetchone()
+        conn.close()
+        return {'entries': entries, 'hits': hits}
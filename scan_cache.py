@@ -0,0 +1,185 @@
+"""Persistent scan-result cache for the Honeypot Defense System"""
+import os
+import sqlite3
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+PARTIAL_HASH_BYTES = 4096
+DEFAULT_MAX_ENTRIES = 50000
+
+class ScanCache:
+    """Cache of analyze_file_threat results keyed by (device, inode, size, mtime_ns)"""
+
+    def __init__(self, db_path: str, rules_version: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.rules_version = rules_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.init_db()
+
+    def init_db(self):
+        """Create the cache table and drop entries produced by other rule sets"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                partial_hash TEXT NOT NULL,
+                rules_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (device, inode)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_cache_last_used ON scan_cache (last_used)')
+        cursor.execute('DELETE FROM scan_cache WHERE rules_version != ?', (self.rules_version,))
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def partial_hash(file_path: str, file_size: int) -> Optional[str]:
+        """Hash the head and tail of a file as a cheap content check"""
+        try:
+            digest = hashlib.sha256(str(file_size).encode())
+            with open(file_path, 'rb') as f:
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+                if file_size > PARTIAL_HASH_BYTES:
+                    f.seek(max(file_size - PARTIAL_HASH_BYTES, PARTIAL_HASH_BYTES))
+                    digest.update(f.read(PARTIAL_HASH_BYTES))
+            return digest.hexdigest()
+        except OSError:
+            return None
+
+    def get(self, file_path: str) -> Optional[Dict]:
+        """Return the cached result for an unchanged file, or None"""
+        return self.get_many([file_path])[file_path]
+
+    def get_many(self, file_paths: List[str]) -> Dict[str, Optional[Dict]]:
+        """Look up several files over a single connection"""
+        results = {}
+        now = time.time()
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        for file_path in file_paths:
+            results[file_path] = None
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                self.misses += 1
+                continue
+
+            cursor.execute('''
+                SELECT file_size, mtime_ns, file_path, partial_hash, rules_version, result
+                FROM scan_cache WHERE device = ? AND inode = ?
+            ''', (st.st_dev, st.st_ino))
+            row = cursor.fetchone()
+
+            if (row and row[0] == st.st_size and row[1] == st.st_mtime_ns
+                    and row[2] == file_path and row[4] == self.rules_version
+                    and row[3] == self.partial_hash(file_path, st.st_size)):
+                cursor.execute('UPDATE scan_cache SET last_used = ? WHERE device = ? AND inode = ?',
+                              (now, st.st_dev, st.st_ino))
+                results[file_path] = json.loads(row[5])
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        conn.commit()
+        conn.close()
+        return results
+
+    def put(self, file_path: str, result: Dict):
+        """Store a scan result and evict least recently used entries"""
+        self.put_many([(file_path, result)])
+
+    def put_many(self, items: List[Tuple[str, Dict]]):
+        """Store several scan results in one transaction"""
+        rows = []
+        now = time.time()
+        for file_path, result in items:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            partial = self.partial_hash(file_path, st.st_size)
+            if partial is None:
+                continue
+            rows.append((st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, file_path, partial,
+                         self.rules_version, json.dumps(result), now))
+
+        if not rows:
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.executemany('''
+            INSERT OR REPLACE INTO scan_cache
+            (device, inode, file_size, mtime_ns, file_path, partial_hash, rules_version, result, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+        cursor.execute('SELECT COUNT(*) FROM scan_cache')
+        excess = cursor.fetchone()[0] - self.max_entries
+        if excess > 0:
+            cursor.execute('''
+                DELETE FROM scan_cache WHERE rowid IN (
+                    SELECT rowid FROM scan_cache ORDER BY last_used ASC, rowid ASC LIMIT ?
+                )
+            ''', (excess,))
+
+        conn.commit()
+        conn.close()
+
+    def invalidate(self, file_path: str):
+        """Drop the cached result for a single file"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM scan_cache WHERE device = ? AND inode = ?', (st.st_dev, st.st_ino))
+        conn.commit()
+        conn.close()
+
+    def set_rules_version(self, rules_version: str):
+        """Switch to a new rule set, discarding results from the old one"""
+        if rules_version != self.rules_version:
+            self.rules_version = rules_version
+            self.init_db()
+
+    def clear(self):
+        """Remove all cached results"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM scan_cache')
+        conn.commit()
+        conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache size and hit/miss counters"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM scan_cache')
+        entries = cursor.fetchone()[0]
+        conn.close()
+
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
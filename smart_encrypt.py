@@ -6,28 +6,32 @@ Production launcher with AI model setup
 
 import os
 import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
 import tkinter as tk
 from tkinter import messagebox
 import threading
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Tuple
+from startup_profile import enable_from_argv, profiler
+
+REQUIRED_MODULES = ['cryptography', 'numpy', 'requests', 'PIL']
+MODEL_READ_CHUNK = 16 * 1024 * 1024
 
 def check_dependencies():
-    """Check and install required dependencies"""
-    try:
-        import cryptography
-        import numpy
-        import requests
-        import PIL
-        # gpt4all is optional - will use fallback if not available
-        try:
-            import gpt4all
-        except ImportError:
-            print("Note: gpt4all not available, using fallback mode")
-        return True
-    except ImportError as e:
-        missing = str(e).split("'")[1]
-        print(f"Missing required module: {missing}")
-        print("Please run: pip install -r requirements.txt")
-        return False
+    """Check that required dependencies are installed, without importing them"""
+    for module in REQUIRED_MODULES:
+        if find_spec(module) is None:
+            print(f"Missing required module: {module}")
+            print("Please run: pip install -r requirements.txt")
+            return False
+    # gpt4all is optional - will use fallback if not available
+    if find_spec('gpt4all') is None:
+        print("Note: gpt4all not available, using fallback mode")
+    return True
 
 def setup_directories():
     """Setup required directories"""
@@ -41,9 +45,77 @@ def setup_directories():
     for directory in dirs:
         os.makedirs(directory, exist_ok=True)
 
-def show_splash():
-    """Show splash screen while loading"""
-    splash = tk.Tk()
+def open_vault():
+    """Create or migrate the vault database so the login window opens on a ready DB"""
+    from storage import StorageManager
+    StorageManager()
+
+def load_interface():
+    """Import the GUI while the splash is up; the launcher then finds it loaded"""
+    import gui  # noqa: F401
+
+def preload_model():
+    """Read the Aaliya model file once so loading it later comes from the page cache"""
+    from aaliya_ai import AaliyaAI
+    aaliya = AaliyaAI()
+    model_path = os.path.join(aaliya.models_dir, aaliya.model_name)
+    if not os.path.exists(model_path):
+        return
+    with open(model_path, 'rb') as f:
+        while f.read(MODEL_READ_CHUNK):
+            pass
+
+def startup_tasks(preload_ai: bool = False) -> List[Tuple[str, Callable, int]]:
+    """(label, function, progress weight) for each piece of real startup work"""
+    tasks = [
+        ("Checking dependencies...", check_dependencies, 1),
+        ("Setting up directories...", setup_directories, 1),
+        ("Opening encrypted vault...", open_vault, 3),
+        ("Loading interface...", load_interface, 3)
+    ]
+    if preload_ai:
+        tasks.append(("Loading Aaliya AI...", preload_model, 6))
+    return tasks
+
+def run_startup(progress: Callable = None, preload_ai: bool = False, strict: bool = True) -> Dict[str, any]:
+    """Run the startup tasks in order, reporting (fraction, label) before each one
+
+    A failed task stops startup unless strict is off (the benchmark times every step).
+    """
+    tasks = startup_tasks(preload_ai)
+    total_weight = sum(weight for _, _, weight in tasks)
+    done_weight = 0
+    result = {'ok': True, 'error': None, 'timings': {}}
+    
+    for label, task, weight in tasks:
+        if progress:
+            progress(done_weight / total_weight, label)
+        start = time.perf_counter()
+        try:
+            with profiler.timed(label.rstrip('.')):
+                ok = task()
+        except Exception as e:
+            ok = False
+            result['error'] = f"{label.rstrip('.')} failed: {e}"
+        result['timings'][task.__name__] = time.perf_counter() - start
+        if ok is False:
+            result['ok'] = False
+            if strict:
+                break
+        done_weight += weight
+    
+    if progress and result['ok']:
+        progress(1.0, "Ready! 💜")
+    return result
+
+def show_splash(preload_ai: bool = False) -> Dict[str, any]:
+    """Show splash screen while the startup tasks run; closes as soon as they finish"""
+    try:
+        splash = tk.Tk()
+    except tk.TclError:
+        # No display to draw on: just do the work
+        return run_startup(preload_ai=preload_ai)
+    
     splash.title("Smart-Encrypt")
     splash.geometry("400x300")
     splash.configure(bg='#000000')
@@ -71,7 +143,7 @@ def show_splash():
                            font=('Courier', 12))
     loading_label.pack(pady=20)
     
-    # Progress bar simulation
+    # Progress bar driven by the startup tasks
     progress_frame = tk.Frame(splash, bg='#000000')
     progress_frame.pack(pady=10)
     
@@ -81,45 +153,86 @@ def show_splash():
     progress_fill = tk.Frame(progress_bar, bg='#00ff41', height=20)
     progress_fill.place(x=0, y=0, width=0)
     
-    def animate_progress():
-        for i in range(101):
-            progress_fill.configure(width=i * 3)
-            if i < 30:
-                loading_label.configure(text="Checking dependencies...")
-            elif i < 60:
-                loading_label.configure(text="Setting up directories...")
-            elif i < 90:
-                loading_label.configure(text="Loading Aaliya AI...")
-            else:
-                loading_label.configure(text="Ready! 💜")
-            
-            splash.update()
-            threading.Event().wait(0.02)
-        
-        threading.Event().wait(1)
-        splash.destroy()
+    result = {}
+    
+    def show_progress(fraction, label):
+        progress_fill.place_configure(width=int(fraction * 300))
+        loading_label.configure(text=label)
+    
+    def work():
+        try:
+            result.update(run_startup(
+                lambda fraction, label: splash.after(0, show_progress, fraction, label), preload_ai))
+        finally:
+            splash.after(0, splash.destroy)
+    
+    def on_close():
+        # Startup tasks cannot be stopped halfway, so hide the splash and let them finish
+        result['aborted'] = True
+        splash.withdraw()
     
-    # Start animation
-    threading.Thread(target=animate_progress, daemon=True).start()
+    splash.protocol("WM_DELETE_WINDOW", on_close)
+    threading.Thread(target=work, daemon=True).start()
     
     splash.mainloop()
+    if result.get('aborted'):
+        result['ok'] = False
+    return result
+
+def _measure_launch(home: str, preload_ai: bool) -> Dict[str, float]:
+    """Startup tasks in a fresh interpreter with HOME pointed at home"""
+    code = ("import json, time; start = time.perf_counter(); import smart_encrypt; "
+            f"result = smart_encrypt.run_startup(preload_ai={preload_ai!r}, strict=False); "
+            "result['timings']['total'] = time.perf_counter() - start; "
+            "print(json.dumps(result['timings']))")
+    env = dict(os.environ, HOME=home)
+    launched = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - launched
+    return timings
+
+def benchmark_startup(runs: int = 5, preload_ai: bool = False) -> Dict[str, Dict[str, float]]:
+    """Median startup timings for cold launches (empty data directory, first run)
+    and warm launches (existing vault), each in a new process"""
+    cold, warm = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as home:
+            cold.append(_measure_launch(home, preload_ai))
+            warm.append(_measure_launch(home, preload_ai))
+    
+    report = {}
+    for name, samples in (('cold', cold), ('warm', warm)):
+        report[name] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+    
+    print(f"Startup benchmark, median of {runs} launches (ms)")
+    print(f"{'step':<20}{'cold':>10}{'warm':>10}")
+    for key in report['cold']:
+        print(f"{key:<20}{report['cold'][key] * 1000:>10.1f}{report['warm'][key] * 1000:>10.1f}")
+    print("(the previous splash added a fixed ~3000 ms of animation before any of this)")
+    return report
 
 def main():
     """Main application launcher"""
+    enable_from_argv()
+    if '--benchmark-startup' in sys.argv:
+        benchmark_startup(preload_ai='--preload-ai' in sys.argv)
+        return
+    
     print("◉ SMART-ENCRYPT v1.0 with Aaliya AI ◉")
     print("Secure Personal Vault with AI Assistant")
     print("=" * 40)
     
-    # Show splash screen
-    show_splash()
-    
-    # Check dependencies
-    if not check_dependencies():
+    # Show splash screen while dependencies, directories and the vault are prepared
+    startup = show_splash(preload_ai='--preload-ai' in sys.argv)
+    if not startup.get('ok'):
+        if startup.get('aborted'):
+            print("Startup aborted: the splash screen was closed")
+        elif startup.get('error'):
+            print(f"Error: {startup['error']}")
         return
     
-    # Setup directories
-    setup_directories()
-    
     try:
         # Import and run main application
         from app import main as app_main
@@ -131,4 +244,4 @@ def main():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
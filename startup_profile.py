@@ -0,0 +1,113 @@
+"""Startup profiling for Smart-Encrypt (--profile-startup)"""
+import sys
+import time
+import builtins
+from contextlib import contextmanager
+from typing import Dict, List
+
+REPORT_ROWS = 25
+
+class StartupProfiler:
+    """Records per-module import time and named init steps
+
+    Imports are timed by wrapping __import__; each module gets its own
+    (self) time and its time including the modules it pulled in.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.imports = {}
+        self.steps = []
+        self.import_stack = []
+        self.original_import = None
+        self.reported = False
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        self.original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        if self.enabled and builtins.__import__ is self._timed_import:
+            builtins.__import__ = self.original_import
+        self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+
+        self.import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.import_stack.pop()
+            if self.import_stack:
+                self.import_stack[-1] += elapsed
+            if name not in self.imports:
+                self.imports[name] = {'total': elapsed, 'self': elapsed - children}
+
+    @contextmanager
+    def timed(self, name: str):
+        """Time a named init step; free when profiling is off"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.steps.append((name, elapsed))
+            if self.reported:
+                print(f"[startup] loaded {name} on first use in {elapsed * 1000:.1f} ms")
+
+    def mark_ready(self, root, label: str = 'login window'):
+        """Print the report once the window has been drawn and the event loop is idle"""
+        if not self.enabled or self.reported:
+            return
+
+        def report():
+            ready = time.perf_counter() - self.started
+            print(self.format_report(ready, label))
+            self.reported = True
+
+        root.after_idle(report)
+
+    def slowest_imports(self, rows: int = REPORT_ROWS) -> List[tuple]:
+        return sorted(self.imports.items(), key=lambda item: item[1]['self'], reverse=True)[:rows]
+
+    def format_report(self, ready: float, label: str) -> str:
+        lines = ["", "◉ STARTUP PROFILE ◉", "=" * 59,
+                 f"Time to {label}: {ready * 1000:.1f} ms", "",
+                 f"{'module':<36}{'self ms':>11}{'total ms':>12}", "-" * 59]
+        for name, times in self.slowest_imports():
+            lines.append(f"{name[:35]:<36}{times['self'] * 1000:>11.1f}{times['total'] * 1000:>12.1f}")
+        lines.append(f"({len(self.imports)} modules imported)")
+        lines += ["", f"{'init step':<47}{'ms':>12}", "-" * 59]
+        for name, elapsed in self.steps:
+            lines.append(f"{name[:46]:<47}{elapsed * 1000:>12.1f}")
+        return '\n'.join(lines)
+
+    def get_stats(self) -> Dict[str, any]:
+        return {
+            'modules': len(self.imports),
+            'import_seconds': sum(times['self'] for times in self.imports.values()),
+            'steps': dict(self.steps)
+        }
+
+# Shared by every entry point so imports made before the GUI are counted too
+profiler = StartupProfiler()
+
+def enable_from_argv(argv: List[str] = None) -> bool:
+    """Turn profiling on when --profile-startup is on the command line"""
+    argv = sys.argv if argv is None else argv
+    if '--profile-startup' in argv:
+        profiler.enable()
+        return True
+    return False
@@ -118,6 +118,22 @@ class StorageManager:
         conn.close()
         return entry_id
     
+    def update_entry(self, entry_id: int, category_id: int, title: str, content: str, meta: Dict = None):
+        encrypted_title = self.encryption.encrypt(title)
+        encrypted_content = self.encryption.encrypt(content)
+        encrypted_meta = self.encryption.encrypt(json.dumps(meta or {}))
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE entries
+            SET category_id = ?, title_encrypted = ?, content_encrypted = ?,
+                meta_json_encrypted = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (category_id, encrypted_title, encrypted_content, encrypted_meta, entry_id))
+        conn.commit()
+        conn.close()
+    
     def get_entries(self, category_id: int = None) -> List[Dict]:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -208,6 +224,14 @@ class StorageManager:
                 pass
         return default
     
+    def has_setting(self, key: str) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM settings WHERE key = ?', (key,))
+        result = cursor.fetchone()
+        conn.close()
+        return result is not None
+    
     def set_setting(self, key: str, value: str):
         encrypted_value = self.encryption.encrypt(value)
         conn = sqlite3.connect(self.db_path)
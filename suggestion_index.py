@@ -0,0 +1,183 @@
+"""Frequency-ranked identifier completion for the Smart-Encrypt code model"""
+import os
+import re
+import sqlite3
+import keyword
+from collections import Counter
+from typing import Dict, Iterable, List
+
+# Dotted identifier chains such as self.storage.get_entries
+IDENTIFIER_CHAIN = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
+TRAILING_PREFIX = re.compile(r'[A-Za-z_][\w.]*$')
+
+KEYWORDS = frozenset(keyword.kwlist)
+TOP_K = 10
+MIN_LENGTH = 3
+# Weight of an observation halves after this many learn() calls
+HALF_LIFE = 200
+MAX_WORDS = 20000
+PRUNE_TO = 16000
+# Renormalize stored weights before the growing scale can overflow
+MAX_SCALE = 1e12
+
+def with_dotted_prefixes(chains: Iterable[str]) -> List[str]:
+    """Each identifier chain followed by its dotted prefixes (a.b.c -> a.b.c, a, a.b)"""
+    words = []
+    for chain in chains:
+        words.append(chain)
+        end = chain.find('.')
+        while end != -1:
+            words.append(chain[:end])
+            end = chain.find('.', end + 1)
+    return words
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+class SuggestionIndex:
+    """Prefix trie of learned identifiers, ranked by exponentially decayed counts
+
+    Decay is applied lazily: instead of shrinking every stored weight, each
+    learn() call grows the weight given to new observations. Every trie node
+    caches its TOP_K words, so a completion is a walk down the prefix.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self.loaded = False
+        self.root = _TrieNode()
+        self.weights = {}
+        self.scale = 1.0
+        self.growth = 2 ** (1.0 / HALF_LIFE)
+        self.dirty = set()
+        self.removed = set()
+
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if not self.db_path or not os.path.exists(self.db_path):
+            return
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM suggestion_meta WHERE key = 'scale'")
+            row = cursor.fetchone()
+            self.scale = row[0] if row else 1.0
+            cursor.execute('SELECT word, weight FROM suggestions')
+            self.weights = dict(cursor.fetchall())
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Could not load suggestions: {e}")
+            self.weights = {}
+        self._rebuild()
+
+    def _rebuild(self):
+        """Build the trie heaviest word first, so each node's top list only appends"""
+        self.root = _TrieNode()
+        for word in sorted(self.weights, key=self.weights.get, reverse=True):
+            node = self.root
+            for char in word:
+                node = node.children.setdefault(char, _TrieNode())
+                if len(node.top) < TOP_K:
+                    node.top.append(word)
+
+    def _promote(self, word: str):
+        """Re-rank word on every node along its path after its weight grew"""
+        weight = self.weights[word]
+        node = self.root
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+            top = node.top
+            if word in top:
+                top.remove(word)
+            elif len(top) >= TOP_K and self.weights[top[-1]] >= weight:
+                continue
+            index = len(top)
+            while index > 0 and self.weights[top[index - 1]] < weight:
+                index -= 1
+            top.insert(index, word)
+            del top[TOP_K:]
+
+    def learn(self, words: Iterable[str]):
+        """Count one document's identifiers; earlier documents decay relative to it"""
+        self._ensure_loaded()
+        self.scale *= self.growth
+        for word, count in Counter(words).items():
+            if len(word) < MIN_LENGTH or word in KEYWORDS:
+                continue
+            self.weights[word] = self.weights.get(word, 0.0) + count * self.scale
+            self.removed.discard(word)
+            self.dirty.add(word)
+            self._promote(word)
+
+        if self.scale > MAX_SCALE:
+            # Uniform rescaling keeps every ranking, so the trie stays valid
+            for word in self.weights:
+                self.weights[word] /= self.scale
+            self.scale = 1.0
+            self.dirty = set(self.weights)
+        if len(self.weights) > MAX_WORDS:
+            self._prune()
+
+    def learn_text(self, text: str):
+        """Learn every identifier chain in text, plus each of its dotted prefixes"""
+        self.learn(with_dotted_prefixes(IDENTIFIER_CHAIN.findall(text)))
+
+    def _prune(self):
+        keep = sorted(self.weights, key=self.weights.get, reverse=True)[:PRUNE_TO]
+        dropped = set(self.weights).difference(keep)
+        self.weights = {word: self.weights[word] for word in keep}
+        self.removed |= dropped
+        self.dirty -= dropped
+        self._rebuild()
+
+    def complete(self, prefix: str, limit: int = TOP_K) -> List[str]:
+        """Most frequent learned identifiers starting with prefix"""
+        self._ensure_loaded()
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [word for word in node.top[:limit] if word != prefix]
+
+    def suggest(self, partial_code: str, limit: int = TOP_K) -> List[str]:
+        """Completions for the identifier being typed at the end of partial_code"""
+        match = TRAILING_PREFIX.search(partial_code)
+        return self.complete(match.group(0), limit) if match else []
+
+    def weight(self, word: str) -> float:
+        """Current decayed count of word"""
+        self._ensure_loaded()
+        return self.weights.get(word, 0.0) / self.scale
+
+    def get_stats(self) -> Dict[str, int]:
+        self._ensure_loaded()
+        return {'words': len(self.weights), 'unsaved': len(self.dirty) + len(self.removed)}
+
+    def save(self):
+        """Write words changed since the last save"""
+        if not self.db_path or not self.loaded:
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS suggestions (word TEXT PRIMARY KEY, weight REAL)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS suggestion_meta (key TEXT PRIMARY KEY, value REAL)')
+        cursor.executemany('INSERT OR REPLACE INTO suggestions (word, weight) VALUES (?, ?)',
+                           [(word, self.weights[word]) for word in self.dirty])
+        cursor.executemany('DELETE FROM suggestions WHERE word = ?', [(word,) for word in self.removed])
+        cursor.execute("INSERT OR REPLACE INTO suggestion_meta (key, value) VALUES ('scale', ?)", (self.scale,))
+        conn.commit()
+        conn.close()
+        self.dirty = set()
+        self.removed = set()
@@ -0,0 +1,368 @@
+"""Tests for the Aaliya AI assistant backend"""
+import os
+import time
+from contextlib import contextmanager
+import pytest
+from aaliya_ai import AaliyaAI, SESSION_TOKEN_BUDGET
+from conversation_memory import ConversationMemory
+from response_cache import ResponseCache
+from model_manager import ModelManager
+from inference_worker import InferenceWorker, PRIORITY_BACKGROUND
+
+class FakeStreamingModel:
+    """Stands in for a gpt4all model: streams tokens and honours the stop callback"""
+
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.generated = 0
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+
+    def generate(self, prompt, max_tokens=300, temp=0.8, streaming=False, callback=None):
+        def tokens():
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            try:
+                for token_id, token in enumerate(self.tokens[:max_tokens]):
+                    time.sleep(self.delay)
+                    if callback and not callback(token_id, token):
+                        return
+                    self.generated += 1
+                    yield token
+            finally:
+                self.active -= 1
+        return tokens() if streaming else ''.join(tokens())
+
+class FakeSessionModel(FakeStreamingModel):
+    """A model with gpt4all's chat_session, recording each session's system prompt"""
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.sessions = []
+
+    @contextmanager
+    def chat_session(self, system_prompt=None):
+        self.sessions.append(system_prompt)
+        yield
+
+@pytest.fixture
+def aaliya(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    aaliya = AaliyaAI()
+    # Ground code questions in an empty project instead of indexing this repository
+    aaliya.code_project = str(tmp_path / "project")
+    return aaliya
+
+def test_fallback_streams_the_full_response(aaliya):
+    """Test the fallback response arrives word by word and joins to the blocking result"""
+    stream = aaliya.stream_response("hello there")
+    tokens = list(stream)
+
+    assert len(tokens) > 5
+    assert stream.text.strip() == aaliya.generate_response("hello there")
+    assert stream.first_token_latency is not None and not stream.cancelled
+
+def test_model_stream_cancel_and_latency_budget(aaliya):
+    """Test cancelling or running over budget stops generation and keeps the partial text"""
+    aaliya.model = FakeStreamingModel([f" word{i}" for i in range(100)])
+    stream = aaliya.stream_response("explain")
+    received = []
+    for token in stream:
+        received.append(token)
+        if len(received) == 3:
+            stream.cancel()
+
+    assert stream.cancelled and stream.text == " word0 word1 word2"
+    assert aaliya.model.generated == 3
+
+    aaliya.model = FakeStreamingModel([f" w{i}" for i in range(100)], delay=0.01)
+    stream = aaliya.stream_response("explain", max_latency=0.05)
+    list(stream)
+    assert stream.timed_out and 0 < len(stream.parts) < 100
+
+    aaliya.model = FakeStreamingModel([" all", " at", " once"])
+    assert aaliya.generate_response("explain") == "all at once"
+
+def test_repeated_questions_are_served_from_cache(aaliya):
+    """Test a normalized repeat skips the model, while near duplicates and other settings miss"""
+    aaliya.model = FakeStreamingModel([" use", " AES", " GCM"])
+    assert aaliya.generate_response("How do I encrypt a file with the vault?") == "use AES GCM"
+    assert aaliya.model.generated == 3
+
+    stream = aaliya.stream_response("  how do I ENCRYPT a file with the vault ")
+    assert ''.join(stream).strip() == "use AES GCM" and stream.cached
+    assert not aaliya.stream_response("how do i encrypt a file with the vault please").cached
+    assert aaliya.model.generated == 3
+
+    assert not aaliya.stream_response("how do I encrypt a file with the vault", max_tokens=50).cached
+    assert not aaliya.stream_response("how do I decode base64").cached
+    assert aaliya.response_cache.get_stats()['hits'] == 1
+
+def test_near_duplicate_cache_needs_the_same_content_words(tmp_path):
+    """Test opt-in near-duplicate hits ignore filler words but miss on a changed word or a negation"""
+    cache = ResponseCache(str(tmp_path / "cache.db"), near_duplicates=True)
+    params = {'max_tokens': 300}
+    question = ("I have a long running loop that parses every log file in a directory and it is slow, "
+                "how do I make it faster in python")
+    cache.put(question, "model", params, "Use multiprocessing")
+    assert cache.get(question + " please", "model", params) == "Use multiprocessing"
+    for language in ('java', 'rust', 'go', 'haskell'):
+        assert cache.get(question.replace("python", language), "model", params) is None
+
+    stored = "should I store my passwords in a plain text file on my desktop for convenience"
+    cache.put(stored, "model", params, "No, use the vault")
+    assert cache.get(stored.replace("should I", "should I not"), "model", params) is None
+    assert ResponseCache(str(tmp_path / "other.db")).near_duplicates is False
+
+def test_model_manager_preloads_and_unloads(aaliya, monkeypatch):
+    """Test background preload, idle unload keeping the weights mapped, and pressure unload"""
+    with open(f"{aaliya.models_dir}/{aaliya.model_name}", 'wb') as f:
+        f.write(b'\0' * 4096)
+
+    def load_model():
+        time.sleep(0.05)
+        aaliya.model = FakeStreamingModel([" ready"])
+        aaliya.model_loaded = True
+        return True
+    monkeypatch.setattr(aaliya, 'load_model', load_model)
+
+    manager = ModelManager(aaliya, idle_minutes=0)
+    unloads = []
+    manager.on_unload = unloads.append
+    manager.preload()
+    assert manager.load()
+    assert manager.get_stats()['loads'] == 1 and manager.get_stats()['load_seconds'] >= 0.05
+
+    with manager.in_use():
+        manager._check()
+        assert manager.is_loaded
+    manager._check()
+    assert not manager.is_loaded and unloads == ['idle']
+    assert manager.get_stats()['mapped_mb'] > 0
+
+    assert manager.ensure_loaded() and aaliya.generate_response("hi") == "ready"
+    manager.idle_minutes, manager.max_rss_mb = 60, 1
+    manager._check()
+    assert unloads == ['idle', 'memory pressure'] and manager.get_stats()['mapped_mb'] == 0
+
+def test_unverified_model_file_is_moved_aside_for_resume(aaliya, monkeypatch):
+    """Test a model file that fails its checksum is not loaded but becomes a .part to resume"""
+    import hashlib
+    import model_download
+    content = b"model weights" * 1000
+    model_path = os.path.join(aaliya.models_dir, aaliya.model_name)
+    with open(model_path, 'wb') as f:
+        f.write(content[:5000])
+    aaliya.model_sha256 = hashlib.sha256(content).hexdigest()
+
+    assert not aaliya.model_ready()
+    assert not os.path.exists(model_path) and os.path.getsize(model_path + '.part') == 5000
+
+    # A good file is hashed once, then trusted while its size and mtime are unchanged
+    with open(model_path, 'wb') as f:
+        f.write(content)
+    hashes = []
+    monkeypatch.setattr(model_download, 'file_sha256',
+                        lambda path: hashes.append(path) or hashlib.sha256(content).hexdigest())
+    assert aaliya.model_ready() and aaliya.model_ready()
+    assert hashes == [model_path]
+
+def test_history_pages_and_search(aaliya):
+    """Test keyset pages walk back through history and FTS finds old conversations"""
+    for i in range(45):
+        aaliya.save_chat(f"question {i}", f"answer {i}" + (" about onion routing" if i == 3 else ""))
+
+    pages, before = [], None
+    while True:
+        page = aaliya.get_chat_page(before=before, limit=20)
+        if not page:
+            break
+        pages.append([row[1] for row in page])
+        before = (page[0][3], page[0][0])
+
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert pages[0][-1] == "question 44" and pages[-1][0] == "question 0"
+    assert aaliya.get_chat_history(2) == [row[1:] for row in aaliya.get_chat_page(limit=2)]
+
+    assert [row[1] for row in aaliya.search_history("onion rout")] == ["question 3"]
+    aaliya.clear_history()
+    assert aaliya.search_history("onion") == []
+
+def test_inference_worker_serializes_prioritizes_and_batches(aaliya):
+    """Test one generation at a time, priority order, shared generation for identical prompts"""
+    aaliya.model = FakeStreamingModel([" ok"] * 5, delay=0.01)
+    worker = InferenceWorker(aaliya, ModelManager(aaliya))
+
+    first = worker.submit("first question")
+    while first.started is None:
+        time.sleep(0.001)
+    background = worker.submit("background summary", priority=PRIORITY_BACKGROUND)
+    urgent = worker.submit("urgent question")
+    same = [worker.submit("Shared question?"), worker.submit("shared question")]
+    dropped = worker.submit("never mind")
+    dropped.cancel()
+    assert worker.get_stats()['queue_depth'] == 5
+
+    assert [request.result() for request in [first, urgent, *same, background]] == [" ok" * 5] * 5
+    assert dropped.result() == "" and dropped.cancelled
+    questions = [prompt.split("User: ")[1].split("\n")[0] for prompt in aaliya.model.prompts]
+    assert questions == ["first question", "urgent question", "Shared question?", "background summary"]
+    assert aaliya.model.max_active == 1
+
+    stats = worker.get_stats()
+    assert stats['batched'] == 1 and stats['completed'] == 6 and stats['queue_depth'] == 0
+    assert stats['mean_latency'] >= stats['mean_wait'] > 0
+    worker.stop()
+
+def test_code_questions_are_grounded_in_project_code(aaliya, tmp_path):
+    """Test code questions carry matching project snippets once the background index is ready"""
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "vault.py").write_text(
+        "def rotate_vault_key(storage):\n    \"\"\"Re-encrypt every entry with a new key\"\"\"\n    return storage.rekey()\n")
+    aaliya.model = FakeStreamingModel([" done"])
+
+    # The first question starts indexing in the background instead of waiting for it
+    aaliya.generate_response("How does rotate_vault_key work?")
+    assert aaliya.code_indexer.watching
+    assert aaliya.code_indexer.indexed.wait(5)
+
+    aaliya.generate_response("How does rotate_vault_key work now?")
+    assert "# vault.py:1 rotate_vault_key" in aaliya.model.prompts[-1]
+    assert "return storage.rekey()" in aaliya.model.prompts[-1]
+
+    aaliya.generate_response("good morning")
+    assert "Relevant code" not in aaliya.model.prompts[-1]
+
+    # Edits reach the index without a restart
+    (project / "vault.py").write_text("def rotate_vault_key(storage):\n    return storage.rekey_all()\n")
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        aaliya.generate_response(f"How does rotate_vault_key work at {time.time()}?")
+        if "rekey_all()" in aaliya.model.prompts[-1]:
+            break
+        time.sleep(0.2)
+    assert "rekey_all()" in aaliya.model.prompts[-1]
+
+    aaliya.unload_model()
+    assert not aaliya.code_indexer.watching
+
+def test_conversation_memory_summarizes_within_budget(tmp_path):
+    """Test old turns fold into a summary, the prefix stays in budget, and refined summaries are stored"""
+    db_path = str(tmp_path / "memory.db")
+    memory = ConversationMemory(db_path, token_budget=600)
+    memory.add_turn("How do I rotate the vault key?", "Call rekey(). It re-encrypts every entry.")
+    epoch = memory.epoch
+    turns = [(f"question {i} " + "detail " * 20, f"answer {i}. " + "more " * 20) for i in range(12)]
+    for user, reply in turns:
+        memory.add_turn(user, reply)
+
+    assert memory.summaries and len(memory.turns) < memory.recent_turns + memory.chunk_turns
+    assert memory.prefix.startswith("Earlier in this conversation:\nUser asked: How do I rotate the vault key?")
+    assert memory.prefix_tokens <= 600 and memory.epoch > epoch
+
+    # A tight budget keeps the newest turns and drops what no longer fits
+    tight = ConversationMemory(token_budget=200)
+    tight.seed(turns)
+    assert tight.prefix_tokens <= 200 and tight.prefix.rstrip().endswith(turns[-1][1].strip())
+
+    refined = []
+    memory.summarizer = lambda text: refined.append(text) or "They talked about vault keys."
+    memory.seed([])
+    for user, reply in turns[:8]:
+        memory.add_turn(user, reply)
+    deadline = time.time() + 5
+    while not memory.refined and time.time() < deadline:
+        time.sleep(0.01)
+    # The refined text waits for the next fold instead of starting a new epoch
+    epoch = memory.epoch
+    assert len(refined) == 1 and "They talked about vault keys." not in memory.prefix
+    memory.add_turn("one more", "answer")
+    assert memory.epoch == epoch
+    for user, reply in turns[8:11]:
+        memory.add_turn(user, reply)
+    assert "They talked about vault keys." in memory.prefix
+
+    # The same chunk later reuses the stored summary instead of summarizing again
+    calls = len(refined)
+    again = ConversationMemory(db_path, token_budget=600)
+    again.summarizer = memory.summarizer
+    for user, reply in turns[:8]:
+        again.add_turn(user, reply)
+    assert len(refined) == calls and "They talked about vault keys." in again.prefix
+
+def test_aaliya_remembers_turns_and_reuses_chat_session(aaliya):
+    """Test earlier turns reach the prompt, and a chat session is kept until memory is compacted"""
+    aaliya.model = FakeStreamingModel([" sure"])
+    aaliya.save_chat("My project uses the onion router", "Lovely, onion routing it is!")
+    reply = ''.join(aaliya.stream_response("How should I test that?", use_cache=False))
+    assert reply == " sure"
+    assert "User: My project uses the onion router\nAaliya: Lovely, onion routing it is!\nUser: How should I test that?" \
+        in aaliya.model.prompts[-1]
+
+    aaliya.clear_history()
+    aaliya.model = FakeSessionModel([" ok"])
+    for i in range(3):
+        message = f"Question number {i} about vault keys"
+        aaliya.save_chat(message, ''.join(aaliya.stream_response(message, use_cache=False)))
+    # One session served every turn, and each turn sent only the new message
+    assert len(aaliya.model.sessions) == 1
+    assert aaliya.model.prompts[-1] == "Question number 2 about vault keys"
+
+    for i in range(3, 9):
+        message = f"Question number {i} about vault keys"
+        aaliya.save_chat(message, ''.join(aaliya.stream_response(message, use_cache=False)))
+    ''.join(aaliya.stream_response("One more question about vault keys", use_cache=False))
+    assert len(aaliya.model.sessions) == 2
+    assert "Earlier in this conversation:" in aaliya.model.sessions[-1]
+
+    # A one-shot personality prompt closes the session first
+    ''.join(aaliya.stream_response("Summarize this", personality="You summarize.", use_cache=False))
+    assert aaliya.session is None
+
+def test_grounded_turns_keep_the_chat_session_bounded(aaliya, monkeypatch):
+    """Test code context piling up in a session reopens it before it outgrows the budget"""
+    aaliya.model = FakeSessionModel([" ok"] * 300)
+    snippet = "def rotate_vault_key(storage):\n    return storage.rekey()\n" * 40
+    monkeypatch.setattr(aaliya, 'code_context', lambda message: snippet)
+    for i in range(8):
+        message = f"How does rotate_vault_key work, take {i}?"
+        aaliya.save_chat(message, ''.join(aaliya.stream_response(message, use_cache=False)))
+        assert aaliya.session_tokens <= SESSION_TOKEN_BUDGET
+    assert len(aaliya.model.sessions) > 2
+    # A reopened session carries memory's prefix, never the old code context
+    assert "rotate_vault_key(storage)" not in aaliya.model.sessions[-1]
+
+def test_background_summaries_wait_for_a_stale_session(aaliya):
+    """Test summaries run when a fold makes the session stale, and never reopen a live one"""
+    aaliya.model = FakeSessionModel([" ok"])
+    worker = InferenceWorker(aaliya, ModelManager(aaliya))
+    try:
+        for i in range(10):
+            message = f"Question number {i} about vault keys"
+            aaliya.save_chat(message, worker.submit(message).result())
+            if i == 7:
+                # The fold after the eighth turn asks for a summary while the session is stale
+                deadline = time.time() + 5
+                while not aaliya.memory.refined and time.time() < deadline:
+                    time.sleep(0.01)
+                assert aaliya.memory.refined
+        assert len(aaliya.model.sessions) == 2
+
+        summary = worker.submit("Summarize this", priority=PRIORITY_BACKGROUND,
+                                personality="You summarize.", deferrable=True)
+        message = "Question number 10 about vault keys"
+        aaliya.save_chat(message, worker.submit(message).result())
+        assert aaliya.session_live() and summary.finished is None
+        assert len(aaliya.model.sessions) == 2
+
+        aaliya.clear_history()
+        assert summary.result() == " ok"
+    finally:
+        worker.stop()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
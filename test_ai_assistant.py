@@ -0,0 +1,204 @@
+"""Tests for the Smart-Encrypt AI code assistant"""
+import time
+import pytest
+from ai_assistant import CodeIndexer, extract_definitions, estimate_tokens
+from ai_model import LightweightCodeModel
+from suggestion_index import SuggestionIndex, HALF_LIFE
+
+SOURCE = '''
+def helper():
+    """Top level helper"""
+    def inner():
+        pass
+
+class StorageManager:
+    """Vault storage"""
+    def get_entries(self):
+        """Return decrypted entries"""
+        return []
+
+    class Meta:
+        def describe(self):
+            pass
+
+    async def sync_entries(self):
+        pass
+
+def after_class():
+    pass
+'''
+
+def test_definitions_track_enclosing_class():
+    """Test each definition gets its innermost enclosing class, not any class"""
+    classes = {name: class_name for name, class_name, *_ in extract_definitions(SOURCE)}
+
+    assert classes['helper'] is None
+    assert classes['inner'] is None
+    assert classes['get_entries'] == 'StorageManager'
+    assert classes['describe'] == 'Meta'
+    assert classes['sync_entries'] == 'StorageManager'
+    assert classes['after_class'] is None
+    assert classes['class_Meta'] == 'Meta'
+
+def test_search_ranks_and_reindexes(tmp_path):
+    """Test full-text search ranking and that re-indexing replaces old rows"""
+    source = tmp_path / 'storage.py'
+    source.write_text(SOURCE)
+    indexer = CodeIndexer(str(tmp_path / 'index.db'))
+    indexer.index_file(str(source))
+
+    results = indexer.search('get_entries')
+    assert results[0]['function'] == 'get_entries'
+    assert results[0]['class'] == 'StorageManager'
+    assert indexer.search('decrypted')[0]['function'] == 'get_entries'
+    assert indexer.search('') == []
+
+    source.write_text(SOURCE.replace('get_entries', 'list_entries'))
+    indexer.index_file(str(source))
+    assert indexer.search('get_entries') == []
+    assert indexer.search('list_entries')[0]['function'] == 'list_entries'
+
+def test_retrieved_context_fits_budget_and_is_cached(tmp_path):
+    """Test questions retrieve matching snippets within the token budget, cached until reindex"""
+    source = tmp_path / 'storage.py'
+    source.write_text(SOURCE)
+    indexer = CodeIndexer(str(tmp_path / 'index.db'))
+    indexer.index_file(str(source))
+
+    context = indexer.retrieve_context("How does the vault return decrypted entries?")
+    assert context['snippets'][0]['function'] == 'class_StorageManager'
+    assert context['text'].startswith("# storage.py:7 class StorageManager")
+    assert context['text'].count("def get_entries") == 1
+    assert indexer.retrieve_context("how does the vault return decrypted entries") is context
+
+    small = indexer.retrieve_context("entries vault helper", token_budget=30)
+    assert 0 < small['tokens'] <= 30 and estimate_tokens(small['text']) <= 30
+
+    source.write_text(SOURCE.replace('decrypted', 'decoded'))
+    indexer.index_file(str(source))
+    assert indexer.retrieve_context("How does the vault return decrypted entries?") is not context
+
+def test_incremental_project_index(tmp_path):
+    """Test unchanged files are skipped, edits re-parsed and deleted files dropped"""
+    project = tmp_path / 'project'
+    (project / 'pkg').mkdir(parents=True)
+    (project / '.git').mkdir()
+    (project / '.git' / 'hook.py').write_text('def ignored():\n    pass\n')
+    for i in range(6):
+        (project / 'pkg' / f'mod{i}.py').write_text(f'def func_{i}():\n    pass\n')
+    (project / 'broken.py').write_text('def broken(:\n')
+    indexer = CodeIndexer(str(tmp_path / 'index.db'))
+
+    stats = indexer.index_project(str(project), workers=2, batch_size=2)
+    assert stats['scanned'] == 7 and stats['indexed'] == 7
+    assert indexer.search('func_5')[0]['file'] == 'mod5.py'
+    assert indexer.search('ignored') == []
+
+    assert indexer.index_project(str(project))['changed'] == 0
+
+    (project / 'pkg' / 'mod1.py').write_text('def renamed():\n    pass\n')
+    (project / 'pkg' / 'mod2.py').unlink()
+    stats = indexer.index_project(str(project))
+    assert (stats['changed'], stats['indexed'], stats['removed']) == (1, 1, 1)
+    assert indexer.search('func_1') == [] and indexer.search('func_2') == []
+    assert indexer.search('renamed')[0]['file'] == 'mod1.py'
+
+def test_watching_restarts_with_new_project(tmp_path):
+    """Test stop_watching then start_watching picks up the new project instead of the old loop"""
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    for project, name in ((first, 'first_func'), (second, 'second_func')):
+        project.mkdir()
+        (project / 'mod.py').write_text(f'def {name}():\n    pass\n')
+    indexer = CodeIndexer(str(tmp_path / 'index.db'))
+    changes = []
+
+    indexer.start_watching(str(first), interval=60, on_change=changes.append)
+    deadline = time.time() + 5
+    while not changes and time.time() < deadline:
+        time.sleep(0.01)
+    indexer.stop_watching()
+    indexer.start_watching(str(second), interval=60, on_change=changes.append)
+    while len(changes) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    indexer.stop_watching()
+
+    assert indexer.search('second_func')[0]['file'] == 'mod.py'
+    assert not indexer.watching
+
+GRAPH_SOURCE = {
+    'storage.py': '''
+class StorageManager:
+    def get_entries(self):
+        return self.load()
+
+    def load(self):
+        return []
+''',
+    'gui.py': '''
+import tkinter as tk
+from storage import StorageManager
+
+class SmartEncryptGUI:
+    def refresh(self):
+        return self.storage.get_entries()
+
+    def __init__(self):
+        self.storage = StorageManager()
+        self.root = tk.Tk()
+
+def main():
+    app = SmartEncryptGUI()
+    app.refresh()
+'''
+}
+
+def test_reference_graph(tmp_path):
+    """Test calls resolve through self attributes and closures follow project code"""
+    for name, source in GRAPH_SOURCE.items():
+        (tmp_path / name).write_text(source)
+    indexer = CodeIndexer(str(tmp_path / 'index.db'))
+    indexer.index_project(str(tmp_path))
+
+    callers = indexer.find_callers('StorageManager.get_entries')
+    assert [(c['source'], c['file']) for c in callers] == [('SmartEncryptGUI.refresh', 'gui.py')]
+    assert indexer.transitive_callers('StorageManager.load') == {
+        'StorageManager.get_entries': 1, 'SmartEncryptGUI.refresh': 2, 'main': 3}
+
+    direct = {(d['target'], d['kind']) for d in indexer.find_dependencies('SmartEncryptGUI')}
+    assert {('StorageManager', 'call'), ('tkinter.Tk', 'call')} <= direct
+    closure = indexer.transitive_dependencies('SmartEncryptGUI')
+    assert closure['StorageManager.get_entries'] == 1 and closure['StorageManager.load'] == 2
+
+    (tmp_path / 'gui.py').write_text(GRAPH_SOURCE['gui.py'].replace('self.storage.get_entries()', '[]'))
+    indexer.index_project(str(tmp_path))
+    assert indexer.find_callers('StorageManager.get_entries') == []
+    assert 'main' not in indexer.transitive_callers('StorageManager.load')
+
+def test_model_suggestions_persist_and_decay(tmp_path):
+    """Test learned identifiers complete by decayed frequency and survive a reload"""
+    model = LightweightCodeModel(str(tmp_path / 'model.json'))
+    for _ in range(3):
+        model.learn_from_code('import sqlite3\nconn = sqlite3.connect(path)\nself.storage.get_entries()\n')
+    model.learn_from_code('class VaultView:\n    def show(self):\n        self.storage.get_categories()\n')
+
+    assert model.get_suggestions('x = self.storage.get_')[:2] == [
+        'self.storage.get_entries', 'self.storage.get_categories']
+    assert model.get_suggestions('sqlite3.co')[0] == 'sqlite3.connect'
+    assert model.context_memory[-1]['classes'] == ['VaultView']
+    assert model.context_memory[-1]['functions'] == ['show']
+    model.save_model()
+
+    reloaded = LightweightCodeModel(str(tmp_path / 'model.json'))
+    assert not reloaded.suggestions.loaded
+    assert reloaded.get_suggestions('self.storage.get_')[0] == 'self.storage.get_entries'
+
+    # A word seen once now outweighs one seen twice a half-life ago
+    index = SuggestionIndex()
+    index.learn(['old_name', 'old_name'])
+    for _ in range(HALF_LIFE + 1):
+        index.learn([])
+    index.learn(['old_new'])
+    assert index.complete('old_') == ['old_new', 'old_name']
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,208 @@
+"""Tests for the AI Engine text analysis"""
+import re
+import pytest
+import numpy as np
+from ai_engine import AIEngine
+from anomaly_detection import StreamingAnomalyDetector, EventRateMonitor
+from url_analysis import UrlAnalyzer
+
+SAMPLE = ("URGENT ACTION REQUIRED: verify your account at http://bit.ly/x9 now. "
+          "Malware and ransomware attack seen, payload base64 encoded. "
+          "Contact a.b@example.org from 10.0.0.1, card 4111 1111 1111 1111, ssn 123-45-6789, "
+          "hash d41d8cd98f00b204e9800998ecf8427e, calls VirtualAllocEx and CryptEncrypt.")
+
+def test_combined_analysis_matches_wrappers():
+    """Test one analyze_text call gives the same results as each method"""
+    engine = AIEngine()
+    combined = engine.analyze_text(SAMPLE)
+
+    assert combined['phishing'] == engine.detect_phishing(SAMPLE)
+    assert combined['patterns'] == engine.pattern_recognition(SAMPLE)
+    assert combined['malware'] == engine.classify_malware(SAMPLE)
+    assert combined['threat_intelligence']['confidence_score'] == 100
+
+def test_text_analysis_results():
+    """Test keywords are case-insensitive and token families are all found"""
+    engine = AIEngine()
+
+    threats = engine.analyze_threat_intelligence(SAMPLE)
+    assert sorted(threats['threats_detected']) == ['Malware', 'attack', 'ransomware']
+
+    phishing = engine.detect_phishing(SAMPLE)
+    assert phishing['indicators_found'] == ['urgent action required', 'verify your account']
+    assert phishing['suspicious_urls'] == ['http://bit.ly/x9']
+
+    patterns = engine.pattern_recognition(SAMPLE)['patterns']
+    assert patterns['email_addresses'] == ['a.b@example.org']
+    assert patterns['ip_addresses'] == ['10.0.0.1']
+    assert patterns['credit_cards'] == ['4111 1111 1111 1111']
+    assert patterns['social_security'] == ['123-45-6789']
+    assert patterns['file_hashes'] == ['d41d8cd98f00b204e9800998ecf8427e']
+
+    assert engine.classify_malware(SAMPLE)['classifications'] == ['trojan', 'ransomware']
+
+def test_analyze_file_chunks_match_whole_text(tmp_path):
+    """Test chunked parallel file analysis agrees with analyzing the whole text"""
+    engine = AIEngine()
+    text = (SAMPLE + '\n') * 300
+    sample = tmp_path / 'dump.log'
+    sample.write_text(text)
+
+    whole = engine.analyze_text(text)
+    chunked = engine.analyze_file(str(sample), workers=2, chunk_size=1000)
+
+    assert chunked['chunks'] > 1
+    assert chunked['patterns']['total_patterns'] == whole['patterns']['total_patterns']
+    assert chunked['patterns']['patterns'] == whole['patterns']['patterns']
+    assert chunked['phishing'] == whole['phishing']
+    assert chunked['malware'] == whole['malware']
+
+def test_analyze_many_ordering():
+    """Test unordered streaming returns every document exactly once"""
+    engine = AIEngine()
+    documents = ['clean text'] * 5 + [SAMPLE] + ['hello world'] * 5
+
+    ordered = [index for index, _ in engine.analyze_many(documents, workers=2)]
+    unordered = dict(engine.analyze_many(documents, workers=2, ordered=False))
+
+    assert ordered == list(range(len(documents)))
+    assert sorted(unordered) == ordered
+    assert unordered[5]['phishing']['is_phishing']
+    assert not unordered[0]['phishing']['is_phishing']
+
+def test_anomaly_detection_batch():
+    """Test the vectorized batch detector flags points above two sigma"""
+    result = AIEngine().anomaly_detection([10, 11, 9, 10, 12, 10, 50, 11])
+
+    assert result['anomalies'] == [6]
+    assert abs(result['mean'] - np.mean([10, 11, 9, 10, 12, 10, 50, 11])) < 1e-9
+
+def test_streaming_anomaly_detector():
+    """Test online statistics match batch values and spikes are flagged"""
+    rng = np.random.default_rng(7)
+    values = rng.normal(100, 5, 500)
+    detector = StreamingAnomalyDetector(window=50)
+    for value in values:
+        detector.update(value)
+
+    assert abs(detector.mean - values.mean()) < 1e-9
+    assert abs(detector.m2 / detector.count - values.var()) < 1e-6
+    assert abs(detector.ring_sum / 50 - values[-50:].mean()) < 1e-9
+    assert detector.update(200)['is_anomaly']
+    assert not detector.update(101)['is_anomaly']
+
+def test_event_rate_monitor_alerts_mid_interval():
+    """Test an access burst alerts before its interval closes"""
+    alerts = []
+    monitor = EventRateMonitor(StreamingAnomalyDetector(window=20, warmup=5), interval=60,
+                               alert_callback=alerts.append)
+    for minute in range(20):
+        for i in range(5 + minute % 2):
+            monitor.record(minute * 60 + i)
+
+    for i in range(100):
+        monitor.record(20 * 60 + i * 0.1)
+
+    assert len(alerts) == 1
+    assert alerts[0]['partial']
+    assert alerts[0]['interval_start'] == 20 * 60
+
+def test_event_rate_monitor_ignores_resuming_after_idle():
+    """Test single accesses after idle stretches never alert, while a real burst still does"""
+    alerts = []
+    monitor = EventRateMonitor(alert_callback=alerts.append)
+    monitor.record(0)
+    monitor.record(15 * 60 + 5)
+    assert alerts == []
+
+    for minute in range(20, 40):
+        for i in range(3):
+            monitor.record(minute * 60 + i)
+    for minute in (55, 90, 200):
+        monitor.record(minute * 60)
+        monitor.record(minute * 60 + 1)
+    assert alerts == []
+
+    for i in range(60):
+        monitor.record(300 * 60 + i)
+    assert len(alerts) == 1 and alerts[0]['value'] >= monitor.min_count
+
+def _per_keyword_results(text):
+    """The engine before the combined scan: each keyword group searched on its own"""
+    threats, confidence = [], 0
+    for group in ('malware|virus|trojan|ransomware', 'phishing|scam|fraud', 'exploit|vulnerability|0day',
+                  'botnet|ddos|attack', 'keylogger|spyware|backdoor'):
+        matches = re.findall(f'(?i)({group})', text)
+        threats.extend(matches)
+        confidence += len(matches) * 20
+    for pattern in (r'(?i)\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', r'(?i)[a-z0-9]{32,}',
+                    r'(?i)(base64|encoded|encrypted)', r'(?i)(payload|shellcode|exploit)'):
+        if re.search(pattern, text):
+            confidence += 10
+    indicators = [phrase for phrase in AIEngine().phishing_indicators if phrase in text.lower()]
+    classifications = [kind for kind, signatures in AIEngine().malware_signatures.items()
+                       if any(sig.lower() in text.lower() for sig in signatures)]
+    return sorted(set(threats)), min(confidence, 100), indicators, classifications
+
+def test_keywords_that_run_together_are_all_found():
+    """Test overlapping and adjacent keywords give the same results as per-keyword searches"""
+    engine = AIEngine()
+    for text in ('spywarexploit', 'verify your accountrojan', 'virususpended account',
+                 'virusetwindowshookex', 'Malwarensomware and BACKDOORansomware', SAMPLE):
+        expected = _per_keyword_results(text)
+        threats = engine.analyze_threat_intelligence(text)
+        actual = (sorted(threats['threats_detected']), threats['confidence_score'],
+                  engine.detect_phishing(text)['indicators_found'],
+                  engine.classify_malware(text)['classifications'])
+        assert actual == expected, text
+
+def test_url_analyzer_features():
+    """Test registrable domains and brand abuse features for phishing URLs"""
+    analyzer = UrlAnalyzer()
+
+    assert analyzer.analyze_url('https://login.example.co.uk/a')['registrable_domain'] == 'example.co.uk'
+    assert analyzer.analyze_url('https://www.paypal.com/signin')['score'] == 0
+
+    typo = analyzer.analyze_url('http://paypall.com/signin')
+    assert typo['suspicious'] and 'typosquat_brand' in typo['features']
+
+    homoglyph = analyzer.analyze_url('https://xn--pypal-4ve.com/')
+    assert homoglyph['suspicious'] and 'homoglyph_brand' in homoglyph['features']
+
+    elsewhere = analyzer.analyze_url('http://paypal.secure-login.example.net/verify')
+    assert elsewhere['suspicious'] and 'brand_elsewhere' in elsewhere['features']
+
+    assert analyzer.analyze_url('http://bit.ly/x9')['features']['shortener']
+
+def test_url_analyzer_brand_words_on_honest_sites():
+    """Test brand names inside other words, or only in the path, do not flag a URL"""
+    analyzer = UrlAnalyzer()
+    for url in ('https://www.purchase.com/', 'https://shop.example.com/purchase',
+                'https://en.wikipedia.org/wiki/Apple_Inc.', 'https://pineapple.com/',
+                'https://stackoverflow.com/questions/tagged/github'):
+        result = analyzer.analyze_url(url)
+        assert not result['suspicious'] and 'brand_elsewhere' not in result['features'], url
+
+    assert analyzer.analyze_url('https://en.wikipedia.org/wiki/Apple_Inc.')['features']['brand_in_path'] == 'apple'
+    assert not analyzer.analyze_url('https://paypal-help.com/')['suspicious']
+    assert analyzer.analyze_url('https://paypal-secure-login.xyz/')['suspicious']
+
+def test_url_analyzer_ordinary_domains():
+    """Test near-miss words and a brand's regional domains are not flagged"""
+    analyzer = UrlAnalyzer()
+    for url in ('https://stream.com/', 'https://apply.com/', 'https://chaser.com/',
+                'https://amazon.fr/', 'https://www.amazon.co.jp/', 'https://paypall.com/'):
+        result = analyzer.analyze_url(url)
+        assert not result['suspicious'], url
+    assert analyzer.analyze_url('https://amazon.fr/')['score'] == 0
+    assert analyzer.analyze_url('https://amazon.fr/')['features']['brand'] == 'amazon'
+    assert 'brand' not in analyzer.analyze_url('https://paypal.tk/')['features']
+
+    # Only listed regional domains count as the brand; other TLDs can still impersonate it
+    for url in ('https://coinbase.io/login/verify', 'https://paypal.co/signin'):
+        result = analyzer.analyze_url(url)
+        assert result['suspicious'] and 'brand' not in result['features'], url
+        assert result['features']['credential_path'], url
+
+if __name__ == "__main__":
+    pytest.main([__file__])
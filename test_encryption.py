@@ -2,8 +2,11 @@
 import pytest
 import tempfile
 import os
+import time
+import threading
 from encryption import EncryptionManager
 from storage import StorageManager
+from vault_scanner import VaultSensitivityScanner
 
 def test_encryption_basic():
     """Test basic encryption/decryption"""
@@ -72,5 +75,92 @@ def test_search():
         assert len(results) == 1
         assert results[0]['title'] == "Shopping List"
 
+def test_vault_sensitivity_scan_is_incremental():
+    """Test only new or edited entries are rescanned and risky notes are listed"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage = StorageManager(temp_dir)
+        storage.set_master_password("test_password")
+        cat_id = storage.add_category("Test")
+        card_id = storage.add_entry(cat_id, "Card", "Visa 4111 1111 1111 1111 exp 09/27")
+        
+        scanner = VaultSensitivityScanner(storage)
+        storage.add_entry(cat_id, "Groceries", "Buy milk and bread")
+        
+        assert scanner.scan_pending()['scanned'] == 2
+        assert scanner.scan_pending()['scanned'] == 0
+        
+        risky = scanner.get_risky_entries()
+        assert [entry['title'] for entry in risky] == ["Card"]
+        assert risky[0]['findings'] == {'credit_cards': 1}
+        
+        storage.update_entry(card_id, cat_id, "Card", "Card was cancelled")
+        assert scanner.scan_pending()['scanned'] == 1
+        assert scanner.get_risky_entries() == []
+        
+        storage.delete_entry(card_id)
+        assert scanner.get_entry_sensitivity(card_id) is None
+
+def test_vault_scan_retries_entries_that_fail_to_decrypt():
+    """Test an entry that cannot be decrypted stays queued and is scanned on a later run"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage = StorageManager(temp_dir)
+        storage.set_master_password("test_password")
+        cat_id = storage.add_category("Test")
+        for i in range(3):
+            storage.add_entry(cat_id, f"Note {i}", "Visa 4111 1111 1111 1111" if i == 1 else "plain")
+        scanner = VaultSensitivityScanner(storage)
+        
+        decrypt = storage.encryption.decrypt
+        def flaky_decrypt(data):
+            plain = decrypt(data)
+            if plain == "Note 1":
+                raise ValueError("cannot decrypt")
+            return plain
+        storage.encryption.decrypt = flaky_decrypt
+        stats = scanner.scan_pending(batch_size=1)
+        assert stats['scanned'] == 2 and stats['errors'] == 1
+        assert scanner.pending_count() == 1
+        
+        storage.encryption.decrypt = decrypt
+        assert scanner.scan_pending()['scanned'] == 1
+        assert scanner.pending_count() == 0
+        assert [entry['title'] for entry in scanner.get_risky_entries()] == ["Note 1"]
+
+def test_vault_scan_stops_between_batches_and_restarts_without_blocking():
+    """Test a stop ends a scan after its batch, and start() after stop() returns at once"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage = StorageManager(temp_dir)
+        storage.set_master_password("test_password")
+        cat_id = storage.add_category("Test")
+        for i in range(4):
+            storage.add_entry(cat_id, f"Note {i}", "plain")
+        scanner = VaultSensitivityScanner(storage)
+        
+        stop = threading.Event()
+        decrypt = storage.encryption.decrypt
+        def stopping_decrypt(data):
+            stop.set()
+            return decrypt(data)
+        storage.encryption.decrypt = stopping_decrypt
+        assert scanner.scan_pending(batch_size=1, stop_event=stop)['scanned'] == 1
+        assert scanner.pending_count() == 3
+        
+        release = threading.Event()
+        def slow_decrypt(data):
+            release.wait(5)
+            return decrypt(data)
+        storage.encryption.decrypt = slow_decrypt
+        scanner.start(interval=60)
+        scanner.stop()
+        started = time.monotonic()
+        scanner.start(interval=60)
+        assert time.monotonic() - started < 1 and scanner.running
+        release.set()
+        deadline = time.monotonic() + 5
+        while scanner.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scanner.stop()
+        assert scanner.pending_count() == 0
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
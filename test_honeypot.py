@@ -0,0 +1,308 @@
+"""Tests for the Honeypot Defense System"""
+import pytest
+import os
+import time
+from storage import StorageManager
+from honeypot import HoneypotDefenseSystem
+from scan_cache import ScanCache
+from entropy_analysis import EntropyAnalyzer
+import bulk_scan
+from bulk_scan import BulkScanner, walk_files
+from intrusion_detector import StreamingIntrusionDetector, SlidingWindowCounter
+from hex_viewer import format_hex_rows, HexDocument, SEARCH_CHUNK
+
+@pytest.fixture
+def honeypot(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    storage = StorageManager(str(tmp_path / 'vault'))
+    storage.set_master_password('test_password')
+    return HoneypotDefenseSystem(storage)
+
+def test_scan_cache_hit(honeypot, tmp_path):
+    """Test unchanged files are served from the scan cache"""
+    sample = tmp_path / 'invoice.pdf.exe'
+    sample.write_bytes(b'MZ' + b'\x00' * 10000)
+
+    first = honeypot.analyze_file_threat(str(sample))
+    second = honeypot.analyze_file_threat(str(sample))
+
+    assert not first['cached']
+    assert second['cached']
+    assert second['file_hash'] == first['file_hash']
+    assert second['threat_level'] == 'HIGH'
+
+def test_scan_cache_detects_changes(honeypot, tmp_path):
+    """Test modified files are rescanned"""
+    sample = tmp_path / 'notes.txt'
+    sample.write_bytes(b'hello')
+    first = honeypot.analyze_file_threat(str(sample))
+
+    sample.write_bytes(b'hello world')
+    second = honeypot.analyze_file_threat(str(sample))
+
+    assert not second['cached']
+    assert second['file_hash'] != first['file_hash']
+
+def test_scan_cache_rules_invalidation(honeypot, tmp_path):
+    """Test a rule set change discards cached results"""
+    sample = tmp_path / 'run.bat'
+    sample.write_bytes(b'echo hi')
+    honeypot.analyze_file_threat(str(sample))
+
+    honeypot.scan_cache.set_rules_version('changed')
+    assert not honeypot.analyze_file_threat(str(sample))['cached']
+
+def test_scan_cache_lru_eviction(tmp_path):
+    """Test least recently used entries are evicted"""
+    cache = ScanCache(str(tmp_path / 'cache.db'), 'v1', max_entries=2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'file{i}.bin'
+        path.write_bytes(bytes([i]) * 100)
+        paths.append(str(path))
+        cache.put(str(path), {'index': i})
+
+    assert cache.get_stats()['entries'] == 2
+    assert cache.get(paths[0]) is None
+    assert cache.get(paths[2]) == {'index': 2}
+
+def test_entropy_profile(tmp_path):
+    """Test block entropy separates random and constant data"""
+    sample = tmp_path / 'mixed.bin'
+    sample.write_bytes(b'\x00' * 8192 + os.urandom(8192) + b'abc')
+
+    entropies = EntropyAnalyzer(block_size=4096).entropy_profile(str(sample))
+
+    assert len(entropies) == 5
+    assert entropies[0] == 0.0
+    assert entropies[2] > 7.9
+    assert abs(entropies[4] - 1.585) < 0.01
+
+def test_packed_payload_flagged(honeypot, tmp_path):
+    """Test encrypted payloads and embedded archives are reported"""
+    sample = tmp_path / 'update.bin'
+    sample.write_bytes(b'UPX!' + b'\x00' * 8192 + b'PK\x03\x04' + os.urandom(131072))
+
+    analysis = honeypot.analyze_file_threat(str(sample))
+
+    assert analysis['threat_level'] == 'MEDIUM'
+    assert 'Packer signature detected: UPX' in analysis['threats']
+    assert 'High-entropy content (possible encrypted or packed payload)' in analysis['threats']
+    assert analysis['entropy']['embedded_archives'][0]['type'] == 'ZIP archive'
+
+def test_hex_row_formatting():
+    """Test vectorized hexdump rows match the classic layout"""
+    rows = format_hex_rows(b'Hello, hex viewer! \x00\xff', 0x100)
+
+    assert rows[0] == '00000100  48 65 6c 6c 6f 2c 20 68 65 78 20 76 69 65 77 65 |Hello, hex viewe|'
+    assert rows[1].startswith('00000110  72 21 20 00 ff ')
+    assert rows[1].endswith('|r! ..|')
+
+def test_hex_document_search_across_chunks(tmp_path):
+    """Test pattern search finds matches spanning a chunk boundary"""
+    sample = tmp_path / 'large.bin'
+    sample.write_bytes(b'\x00' * (SEARCH_CHUNK - 3) + b'NEEDLE' + b'\x00' * 10)
+
+    document = HexDocument(str(sample))
+    try:
+        assert document.find(b'NEEDLE') == SEARCH_CHUNK - 3
+        assert document.find(b'NEEDLE', SEARCH_CHUNK) == -1
+        assert document.read_rows(0, 1)[0].startswith('00000000  00 00')
+    finally:
+        document.close()
+
+def test_quarantine_dedup_and_restore(honeypot, tmp_path):
+    """Test identical samples are stored once, encrypted, and restore intact"""
+    payload = b'MZ' + b'dropper payload ' * 5000
+    for name in ('a.pdf.exe', 'b.pdf.exe'):
+        (tmp_path / name).write_bytes(payload)
+        result = honeypot.trap_suspicious_file(str(tmp_path / name))
+        assert result['trapped']
+        assert not (tmp_path / name).exists()
+
+    stats = honeypot.quarantine.get_stats()
+    assert stats['unique_samples'] == 1
+    assert stats['references'] == 2
+    assert stats['stored_bytes'] < len(payload)
+
+    stored = open(result['trap_path'], 'rb').read()
+    assert b'dropper payload' not in stored
+
+    restored = tmp_path / 'restored.bin'
+    honeypot.restore_trapped_file(result['file_hash'], str(restored))
+    assert restored.read_bytes() == payload
+
+def test_quarantine_key_is_never_replaced(honeypot, tmp_path):
+    """Test an undecryptable quarantine key raises instead of being overwritten"""
+    payload = b'MZ' + os.urandom(1000)
+    sample = tmp_path / 'y.doc.exe'
+    sample.write_bytes(payload)
+    result = honeypot.trap_suspicious_file(str(sample))
+    key = honeypot.quarantine._get_key()
+
+    honeypot.quarantine._key = None
+    honeypot.storage.get_setting = lambda name, default=None: default
+    with pytest.raises(ValueError):
+        honeypot.quarantine._get_key()
+    del honeypot.storage.get_setting
+
+    assert honeypot.quarantine._get_key() == key
+    restored = tmp_path / 'restored.bin'
+    honeypot.restore_trapped_file(result['file_hash'], str(restored))
+    assert restored.read_bytes() == payload
+
+def test_quarantine_garbage_collection(honeypot, tmp_path):
+    """Test expired rows release their samples"""
+    sample = tmp_path / 'x.jpg.exe'
+    sample.write_bytes(b'MZ' + os.urandom(1000))
+    result = honeypot.trap_suspicious_file(str(sample))
+
+    assert honeypot.cleanup_old_traps(30) == 0
+    assert os.path.exists(result['trap_path'])
+
+    assert honeypot.cleanup_old_traps(-1) == 1
+    assert not os.path.exists(result['trap_path'])
+    assert honeypot.quarantine.get_stats()['unique_samples'] == 0
+
+def _make_tree(root):
+    for sub in ('a', 'b/c', 'd'):
+        (root / sub).mkdir(parents=True)
+    for i, sub in enumerate(('a', 'b', 'b/c', 'd')):
+        (root / sub / f'note{i}.txt').write_text('plain text ' * i)
+        (root / sub / f'invoice{i}.pdf.exe').write_bytes(b'MZ' + bytes([i]) * 100)
+
+def test_walk_files_resume_order(tmp_path):
+    """Test the walk is sorted and resumes strictly after the checkpoint key"""
+    _make_tree(tmp_path)
+    keys = [key for _, key, _ in walk_files(str(tmp_path))]
+
+    assert keys == sorted(keys)
+    assert len(keys) == 8
+    assert [key for _, key, _ in walk_files(str(tmp_path), keys[2])] == keys[3:]
+
+def test_bulk_scan(honeypot, tmp_path):
+    """Test bulk scan logs threats, fills the cache and resumes from a checkpoint"""
+    tree = tmp_path / 'share'
+    _make_tree(tree)
+    scanner = BulkScanner(honeypot, workers=2, checkpoint_path=str(tmp_path / 'checkpoint.json'))
+    updates = []
+
+    summary = scanner.scan(str(tree), updates.append)
+
+    assert summary['files_scanned'] == 8
+    assert summary['threats_found'] == 4
+    assert not summary['cancelled']
+    assert updates[-1]['walk_complete']
+    assert len([log for log in honeypot.get_honeypot_logs() if log['event_type'] == 'BULK_SCAN_THREAT']) == 4
+
+    assert scanner.scan(str(tree))['cached'] == 8
+
+    keys = [key for _, key, _ in walk_files(str(tree))]
+    scanner._save_checkpoint(str(tree), keys[5], {'files_scanned': 6, 'threats_found': 3})
+    resumed = scanner.scan(str(tree), resume=True)
+    assert resumed['files_discovered'] == 2
+    assert resumed['files_scanned'] == 8
+    assert scanner.load_checkpoint(str(tree)) is None
+
+_analyze_batch = bulk_scan._analyze_batch
+
+def _slow_second_file(paths):
+    if any(os.path.basename(path) == 'note0.txt' for path in paths):
+        time.sleep(0.5)
+    return _analyze_batch(paths)
+
+def test_bulk_scan_resume_counts_each_file_once(honeypot, tmp_path, monkeypatch):
+    """Test an interrupted scan checkpoints only committed files, so a resume counts each once"""
+    monkeypatch.setattr(bulk_scan, '_analyze_batch', _slow_second_file)
+    monkeypatch.setattr(bulk_scan, 'TASK_SIZE', 1)
+    monkeypatch.setattr(bulk_scan, 'LOG_BATCH_SIZE', 1)
+    monkeypatch.setattr(bulk_scan, 'PROGRESS_INTERVAL', 0)
+    tree = tmp_path / 'share'
+    _make_tree(tree)
+    scanner = BulkScanner(honeypot, workers=2, checkpoint_path=str(tmp_path / 'checkpoint.json'))
+
+    def interrupt(progress):
+        if progress['files_scanned'] >= 4:
+            raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        scanner.scan(str(tree), interrupt)
+
+    checkpoint = scanner.load_checkpoint(str(tree))
+    keys = [key for _, key, _ in walk_files(str(tree))]
+    assert checkpoint['files_scanned'] == sum(1 for key in keys if key <= tuple(checkpoint['last_key']))
+    resumed = scanner.scan(str(tree), resume=True)
+    assert resumed['files_scanned'] == 8
+
+def _failing_second_file(paths):
+    if any(os.path.basename(path) == 'note1.txt' for path in paths):
+        raise RuntimeError("worker died")
+    return _analyze_batch(paths)
+
+def test_bulk_scan_failed_batch_is_retried_on_resume(honeypot, tmp_path, monkeypatch):
+    """Test a batch whose worker fails is never checkpointed, so a resume scans it again"""
+    monkeypatch.setattr(bulk_scan, '_analyze_batch', _failing_second_file)
+    monkeypatch.setattr(bulk_scan, 'TASK_SIZE', 1)
+    tree = tmp_path / 'share'
+    _make_tree(tree)
+    scanner = BulkScanner(honeypot, workers=2, checkpoint_path=str(tmp_path / 'checkpoint.json'))
+
+    summary = scanner.scan(str(tree))
+    assert summary['failed_tasks'] == 1 and summary['files_scanned'] == 7
+    checkpoint = scanner.load_checkpoint(str(tree))
+    failed_key = next(key for path, key, _ in walk_files(str(tree)) if path.endswith('note1.txt'))
+    assert tuple(checkpoint['last_key']) < failed_key
+
+    monkeypatch.setattr(bulk_scan, '_analyze_batch', _analyze_batch)
+    resumed = scanner.scan(str(tree), resume=True)
+    assert resumed['failed_tasks'] == 0 and resumed['files_scanned'] == 8
+    assert scanner.load_checkpoint(str(tree)) is None
+
+def test_sliding_window_counter():
+    """Test counts expire once they leave the window"""
+    counter = SlidingWindowCounter(window_seconds=10)
+    for second in range(100, 105):
+        counter.add(second, 2)
+
+    assert counter.count(105) == 10
+    assert counter.count(112) == 4
+    assert counter.count(200) == 0
+
+def test_streaming_intrusion_detection(honeypot):
+    """Test access streams raise one logged alert per window and memory stays bounded"""
+    for i in range(12):
+        honeypot.record_access(f'/home/user/docs/file{i}.txt', 'scraper', 1000 + i)
+    alert = honeypot.record_access('/etc/shadow', 'scraper', 1013)
+
+    assert alert['risk_score'] == 70
+    assert 'System file access attempt: /etc/shadow' in alert['indicators']
+    assert honeypot.record_access('/etc/shadow', 'scraper', 1014) is None
+    assert honeypot.record_access('/etc/shadow', 'editor', 1014) is None
+    assert [log['event_type'] for log in honeypot.get_honeypot_logs()].count('INTRUSION_DETECTED') == 1
+
+    detector = StreamingIntrusionDetector(max_processes=3)
+    for pid in range(10):
+        detector.process_event(f'proc{pid}', '/tmp/x', 0)
+    assert list(detector.processes) == ['proc7', 'proc8', 'proc9']
+
+def test_logged_access_reaches_intrusion_detector(honeypot, tmp_path):
+    """Test accesses logged through the security manager and honeypot paths are streamed to the detector"""
+    before = honeypot.intrusion_detector.events_processed
+    honeypot.security_db.log_access_attempt('FILE_READ', '/etc/shadow', 'scraper')
+    assert honeypot.intrusion_detector.events_processed == before + 1
+
+    sample = tmp_path / 'z.pdf.exe'
+    sample.write_bytes(b'MZ' + os.urandom(500))
+    honeypot.trap_suspicious_file(str(sample), 'manual_scan')
+    assert honeypot.intrusion_detector.events_processed == before + 2
+    assert honeypot.security_db.get_access_logs('HONEYPOT_TRAP')[0]['resource_path'] == str(sample)
+
+def test_intrusion_paths_match_expanded_home(honeypot):
+    """Test ~ paths match whether written with ~ or expanded"""
+    home = os.path.expanduser('~')
+    for path in ('~/.ssh/id_rsa', f'{home}/.ssh/id_rsa'):
+        result = honeypot.detect_intrusion_attempt({'paths_accessed': [path]})
+        assert result['indicators'] == ['System file access attempt: ~/.ssh']
+    assert honeypot.detect_intrusion_attempt({'paths_accessed': ['/tmp/~/.ssh/x']})['indicators'] == []
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,118 @@
+"""Tests for resumable model downloads against a local HTTP server"""
+import os
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from model_download import ModelDownloader
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+PAYLOAD_SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support; cut_after ends the next response early
+
+    /resolve/ paths redirect to the file the way Hugging Face does, with the
+    checksum only on the redirect and none on the file itself.
+    """
+    cut_after = None
+    requests = []
+
+    def _send(self, body_wanted: bool):
+        if self.path.startswith('/resolve/'):
+            self.send_response(302)
+            self.send_header('Location', self.path[len('/resolve'):])
+            self.send_header('X-Linked-Etag', f'"{PAYLOAD_SHA256}"')
+            self.send_header('X-Linked-Size', str(len(PAYLOAD)))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        start, end = 0, len(PAYLOAD) - 1
+        header = self.headers.get('Range')
+        if header:
+            first, _, last = header[len('bytes='):].partition('-')
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if not self.path.startswith('/cdn/'):
+            self.send_header('ETag', f'"{PAYLOAD_SHA256}"')
+        self.end_headers()
+        RangeHandler.requests.append(header)
+
+        if body_wanted:
+            body = PAYLOAD[start:end + 1]
+            if RangeHandler.cut_after is not None:
+                body, RangeHandler.cut_after = body[:RangeHandler.cut_after], None
+                self.close_connection = True
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._send(False)
+
+    def do_GET(self):
+        self._send(True)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    RangeHandler.cut_after = None
+    RangeHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/model.bin"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_interrupted_download_resumes_and_verifies(server, tmp_path):
+    """Test a cut connection leaves only a .part file, and the retry resumes with a Range request"""
+    dest = str(tmp_path / "model.bin")
+    RangeHandler.cut_after = 1024 * 1024
+    with pytest.raises(Exception):
+        ModelDownloader(server, dest, segments=1, chunk_size=64 * 1024).download()
+    assert not os.path.exists(dest) and os.path.getsize(dest + ".part") == 1024 * 1024
+
+    stats = ModelDownloader(server, dest, segments=1, chunk_size=64 * 1024).download()
+    assert RangeHandler.requests[-1] == f"bytes={1024 * 1024}-"
+    assert stats['resumed_from'] == 1024 * 1024 and stats['verified']
+    assert stats['transferred'] == len(PAYLOAD) - 1024 * 1024
+    with open(dest, 'rb') as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(dest + ".part")
+
+def test_segmented_download_and_checksum_mismatch(server, tmp_path):
+    """Test parallel segments reassemble the file, and a wrong checksum never reaches dest"""
+    dest = str(tmp_path / "model.bin")
+    progress = []
+    stats = ModelDownloader(server, dest, segments=4, min_segment_size=512 * 1024,
+                            chunk_size=64 * 1024, progress=lambda *args: progress.append(args)).download()
+    assert stats['segments'] == 4 and stats['sha256'] == PAYLOAD_SHA256 and stats['mb_per_s'] > 0
+    assert sum(1 for header in RangeHandler.requests if header) == 4
+    with open(dest, 'rb') as f:
+        assert f.read() == PAYLOAD
+
+    other = str(tmp_path / "other.bin")
+    with pytest.raises(ValueError):
+        ModelDownloader(server, other, sha256="0" * 64, segments=1).download()
+    assert not os.path.exists(other) and not os.path.exists(other + ".part")
+
+def test_checksum_read_from_redirect(server, tmp_path):
+    """Test X-Linked-Etag on a redirect verifies a file whose final response has no checksum"""
+    base = server.rsplit('/', 1)[0]
+    downloader = ModelDownloader(f"{base}/resolve/cdn/model.bin", str(tmp_path / "model.bin"), segments=1)
+    assert downloader._probe() == (len(PAYLOAD), True, PAYLOAD_SHA256)
+
+    stats = downloader.download()
+    assert stats['verified'] and stats['sha256'] == PAYLOAD_SHA256
+
+    with pytest.raises(ValueError):
+        ModelDownloader(f"{base}/resolve/cdn/model.bin", str(tmp_path / "other.bin"),
+                        sha256="0" * 64, segments=1).download()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
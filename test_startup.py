@@ -0,0 +1,57 @@
+"""Tests for Smart-Encrypt startup cost"""
+import sys
+import subprocess
+import pytest
+
+HEAVY_MODULES = ['numpy', 'requests', 'PIL', 'ai_engine', 'ai_assistant', 'aaliya_ai',
+                 'honeypot', 'audio_visual', 'darkweb_tools', 'text_analysis']
+
+def test_gui_import_defers_tools():
+    """Test importing the GUI loads none of the tool subsystems"""
+    code = ("import sys, gui; "
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+def test_profiler_times_imports_and_steps():
+    """Test the startup profiler records module imports and named steps"""
+    code = ("from startup_profile import profiler, enable_from_argv; "
+            "enable_from_argv(['app.py', '--profile-startup']); "
+            "import storage\n"
+            "with profiler.timed('step'): pass\n"
+            "stats = profiler.get_stats(); "
+            "print('storage' in profiler.imports, 'step' in stats['steps'])")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ['True', 'True']
+
+def test_splash_work_reports_real_progress(tmp_path, monkeypatch):
+    """Test startup tasks run in order, report rising progress and create the vault"""
+    import smart_encrypt
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(smart_encrypt, 'REQUIRED_MODULES', ['sqlite3'])
+    updates = []
+
+    result = smart_encrypt.run_startup(lambda fraction, label: updates.append((fraction, label)))
+
+    assert result['ok'], result['error']
+    assert list(result['timings']) == ['check_dependencies', 'setup_directories', 'open_vault', 'load_interface']
+    fractions = [fraction for fraction, _ in updates]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert (tmp_path / '.smart_encrypt' / 'notes.db').exists()
+
+def test_failed_dependency_check_stops_startup(monkeypatch):
+    """Test a missing module ends startup before the vault is touched"""
+    import smart_encrypt
+    monkeypatch.setattr(smart_encrypt, 'REQUIRED_MODULES', ['no_such_module_here'])
+
+    result = smart_encrypt.run_startup()
+
+    assert not result['ok']
+    assert list(result['timings']) == ['check_dependencies']
+
+if __name__ == "__main__":
+    pytest.main([__file__])
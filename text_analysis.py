@@ -0,0 +1,305 @@
+"""Single-pass text analysis for the AI Engine"""
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from utils import parallel_map
+
+THREAT_KEYWORDS = [
+    'malware', 'virus', 'trojan', 'ransomware',
+    'phishing', 'scam', 'fraud',
+    'exploit', 'vulnerability', '0day',
+    'botnet', 'ddos', 'attack',
+    'keylogger', 'spyware', 'backdoor'
+]
+
+# Keywords that only raise the confidence once, grouped by what they suggest
+SUSPICIOUS_KEYWORDS = {
+    'base64': 'encoding', 'encoded': 'encoding', 'encrypted': 'encoding',
+    'payload': 'payload', 'shellcode': 'payload', 'exploit': 'payload'
+}
+
+PHISHING_INDICATORS = [
+    'urgent action required',
+    'verify your account',
+    'suspended account',
+    'click here immediately',
+    'limited time offer'
+]
+
+MALWARE_SIGNATURES = {
+    'trojan': ['CreateRemoteThread', 'WriteProcessMemory', 'VirtualAllocEx'],
+    'ransomware': ['CryptEncrypt', 'FindFirstFile', 'MoveFile'],
+    'keylogger': ['GetAsyncKeyState', 'SetWindowsHookEx', 'CallNextHookEx']
+}
+
+PATTERN_NAMES = ['email_addresses', 'ip_addresses', 'phone_numbers', 'credit_cards',
+                 'social_security', 'urls', 'bitcoin_addresses', 'file_hashes']
+SENSITIVE_PATTERNS = ['credit_cards', 'social_security', 'bitcoin_addresses']
+
+CHUNK_SIZE = 4 * 1024 * 1024  # characters per file chunk
+TASK_CHARACTERS = 1024 * 1024  # documents are batched up to this size per worker task
+MAX_PATTERN_MATCHES = 10000  # per family, once chunk results are merged
+
+def _trie_regex(words: List[str]) -> str:
+    """Build a regex from a word list with shared prefixes factored out,
+    so the engine tests each character once instead of once per word"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+ALL_KEYWORDS = sorted(set(THREAT_KEYWORDS) | set(SUSPICIOUS_KEYWORDS) | set(PHISHING_INDICATORS) |
+                      {sig.lower() for sigs in MALWARE_SIGNATURES.values() for sig in sigs})
+
+URL_REGEX = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+EMAIL_REGEX = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+IP_REGEX = r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'
+CARD_REGEX = r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'
+SSN_REGEX = r'\b\d{3}-\d{2}-\d{4}\b'
+PHONE_REGEX = r'\b\d{3}-\d{3}-\d{4}\b|\b\(\d{3}\)\s*\d{3}-\d{4}\b'
+BITCOIN_REGEX = r'[13][a-km-zA-HJ-NP-Z1-9]{25,34}'
+HASH_REGEX = r'\b[a-fA-F0-9]{32}\b|\b[a-fA-F0-9]{40}\b|\b[a-fA-F0-9]{64}\b'
+LONG_STRING_REGEX = r'[a-z0-9]{32,}'
+
+# Every keyword family in one scan of the lowercased text. The lookahead
+# matches at every position, so keywords that run together or overlap are
+# all found, as when each keyword was searched for separately
+KEYWORD_PATTERN = re.compile(f'(?=({_trie_regex(ALL_KEYWORDS)}))')
+# The trie match is the longest keyword at a position; shorter keywords it starts with count too
+KEYWORD_PREFIXES = {word: [other for other in ALL_KEYWORDS if word.startswith(other)] for word in ALL_KEYWORDS}
+KEYWORD_PATTERN_ANYCASE = re.compile(KEYWORD_PATTERN.pattern, re.IGNORECASE)
+
+TOKEN_PATTERNS = {
+    'urls': re.compile(URL_REGEX),
+    'email_addresses': re.compile(EMAIL_REGEX),
+    'ip_addresses': re.compile(IP_REGEX),
+    'phone_numbers': re.compile(PHONE_REGEX),
+    'credit_cards': re.compile(CARD_REGEX),
+    'social_security': re.compile(SSN_REGEX),
+    'bitcoin_addresses': re.compile(rf'\b{BITCOIN_REGEX}\b'),
+    'file_hashes': re.compile(HASH_REGEX)
+}
+LONG_STRING_PATTERN = re.compile(LONG_STRING_REGEX)
+LONG_STRING_PATTERN_ANYCASE = re.compile(LONG_STRING_REGEX, re.IGNORECASE)
+
+class TextAnalysis:
+    """Everything one analysis of a document found"""
+
+    def __init__(self):
+        self.keyword_counts = Counter()  # lowercased keyword -> occurrences
+        self.threat_terms = set()  # threat keywords as written in the text
+        self.patterns = {name: [] for name in PATTERN_NAMES}
+        self.pattern_counts = Counter()
+        self.long_strings = False
+        self.characters = 0
+
+    def merge(self, other: 'TextAnalysis'):
+        """Fold another chunk's results into this one, keeping match lists bounded"""
+        self.keyword_counts.update(other.keyword_counts)
+        self.threat_terms |= other.threat_terms
+        for name, matches in other.patterns.items():
+            room = MAX_PATTERN_MATCHES - len(self.patterns[name])
+            if room > 0:
+                self.patterns[name].extend(matches[:room])
+        self.pattern_counts.update(other.pattern_counts)
+        self.long_strings = self.long_strings or other.long_strings
+        self.characters += other.characters
+        return self
+
+    @property
+    def threat_count(self) -> int:
+        return sum(self.keyword_counts[word] for word in THREAT_KEYWORDS)
+
+    @property
+    def suspicious_categories(self) -> set:
+        """Suspicious pattern families present, each worth confidence once"""
+        categories = {SUSPICIOUS_KEYWORDS[word] for word in SUSPICIOUS_KEYWORDS if self.keyword_counts[word]}
+        if self.patterns['ip_addresses']:
+            categories.add('ip_address')
+        if self.long_strings:
+            categories.add('long_string')
+        return categories
+
+    @property
+    def phishing_indicators(self) -> List[str]:
+        return [phrase for phrase in PHISHING_INDICATORS if self.keyword_counts[phrase]]
+
+    def malware_matches(self) -> Dict[str, int]:
+        """Number of distinct signatures seen per malware family"""
+        matches = {}
+        for malware_type, signatures in MALWARE_SIGNATURES.items():
+            count = sum(1 for sig in signatures if self.keyword_counts[sig.lower()])
+            if count:
+                matches[malware_type] = count
+        return matches
+
+class TextAnalyzer:
+    """Runs every pattern family over a document, each family compiled and scanned once"""
+
+    def analyze(self, text: str) -> TextAnalysis:
+        analysis = TextAnalysis()
+        analysis.characters = len(text)
+
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            for match in KEYWORD_PATTERN.finditer(lowered):
+                start = match.start()
+                for word in KEYWORD_PREFIXES[match.group(1)]:
+                    self._record_keyword(text[start:start + len(word)], analysis)
+            analysis.long_strings = LONG_STRING_PATTERN.search(lowered) is not None
+        else:
+            # Some characters change length when lowercased, so offsets
+            # into the lowered copy would not line up with the original
+            for match in KEYWORD_PATTERN_ANYCASE.finditer(text):
+                found = match.group(1)
+                for word in KEYWORD_PREFIXES.get(found.lower(), [found.lower()]):
+                    self._record_keyword(found[:len(word)], analysis)
+            analysis.long_strings = LONG_STRING_PATTERN_ANYCASE.search(text) is not None
+
+        for name, pattern in TOKEN_PATTERNS.items():
+            matches = pattern.findall(text)
+            analysis.patterns[name] = matches
+            analysis.pattern_counts[name] = len(matches)
+        return analysis
+
+    def _record_keyword(self, word: str, analysis: TextAnalysis):
+        lowered = word.lower()
+        analysis.keyword_counts[lowered] += 1
+        if lowered in THREAT_KEYWORDS:
+            analysis.threat_terms.add(word)
+
+_worker_analyzer = None
+
+def _init_worker():
+    """Create one analyzer per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = TextAnalyzer()
+
+def _analyze_batch(documents: List[str]) -> List[TextAnalysis]:
+    analyzer = _worker_analyzer or TextAnalyzer()
+    return [analyzer.analyze(document) for document in documents]
+
+def _batch_documents(documents: Iterable[str], task_characters: int) -> Iterator[List[str]]:
+    batch, size = [], 0
+    for document in documents:
+        batch.append(document)
+        size += len(document)
+        if size >= task_characters:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+def analyze_documents(documents: Iterable[str], workers: int = None, ordered: bool = True,
+                      task_characters: int = TASK_CHARACTERS) -> Iterator[Tuple[int, TextAnalysis]]:
+    """Yield (index, TextAnalysis) for every document, analyzed across a process pool"""
+    def numbered_batches():
+        index = 0
+        for batch in _batch_documents(documents, task_characters):
+            yield index, batch
+            index += len(batch)
+
+    for first, analyses in parallel_map(_analyze_numbered_batch, numbered_batches(), workers, ordered,
+                                         initializer=_init_worker):
+        for offset, analysis in enumerate(analyses):
+            yield first + offset, analysis
+
+def _analyze_numbered_batch(task: Tuple[int, List[str]]) -> Tuple[int, List[TextAnalysis]]:
+    first, documents = task
+    return first, _analyze_batch(documents)
+
+def _split_point(text: str) -> int:
+    """Last safe place to cut a chunk so no token spans two chunks"""
+    cut = text.rfind('\n')
+    if cut == -1:
+        # One very long line: fall back to the last whitespace, then a hard cut
+        cut = max(text.rfind(' '), text.rfind('\t'))
+    return cut + 1 if cut != -1 else len(text)
+
+def iter_text_chunks(file_path: str, chunk_size: int = CHUNK_SIZE,
+                     encoding: str = 'utf-8', errors: str = 'replace') -> Iterator[str]:
+    """Read a text file in chunks that end on line boundaries
+
+    The partial line at the end of each read is carried over into the next
+    chunk, so patterns that would straddle a boundary are matched exactly once.
+    """
+    carry = ''
+    with open(file_path, 'r', encoding=encoding, errors=errors, newline='') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            text = carry + data
+            cut = _split_point(text)
+            carry = text[cut:]
+            if cut:
+                yield text[:cut]
+    if carry:
+        yield carry
+
+def iter_mbox_messages(file_path: str, encoding: str = 'utf-8', errors: str = 'replace') -> Iterator[str]:
+    """Stream the messages of an mbox mailbox export one at a time"""
+    message = []
+    with open(file_path, 'r', encoding=encoding, errors=errors) as f:
+        for line in f:
+            if line.startswith('From ') and message:
+                yield ''.join(message)
+                message = []
+            message.append(line)
+    if message:
+        yield ''.join(message)
+
+def _sample_document(size_bytes: int) -> str:
+    """Synthetic log/mail dump with a realistic mix of tokens"""
+    lines = [
+        "2024-01-15 10:22:31 INFO user login from 192.168.1.24 session ok",
+        "From: billing@example-payments.com Subject: verify your account today",
+        "GET http://bit.ly/3xYzAbC?ref=mail 302 redirect to https://example.org/login",
+        "sha256 e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855 quarantined",
+        "Worker thread finished processing batch 4411 in 12ms without errors",
+        "Call support at 555-123-4567 or (555) 987-6543 for help with your order",
+        "Detected trojan dropper calling VirtualAllocEx and WriteProcessMemory",
+        "The quick brown fox jumps over the lazy dog while the build runs again",
+    ]
+    block = '\n'.join(lines) + '\n'
+    return block * (size_bytes // len(block) + 1)
+
+def benchmark(size_mb: int = 8):
+    """Compare the combined analyzer with scanning every pattern and keyword separately"""
+    text = _sample_document(size_mb * 1024 * 1024)
+    # The old engine: every family and keyword group scanned on its own, case-insensitively
+    families = [re.compile(p) for p in (URL_REGEX, EMAIL_REGEX, IP_REGEX, PHONE_REGEX, CARD_REGEX,
+                                        SSN_REGEX, rf'\b{BITCOIN_REGEX}\b', HASH_REGEX)]
+    families.append(re.compile(LONG_STRING_REGEX, re.IGNORECASE))
+    families += [re.compile(re.escape(word), re.IGNORECASE) for word in THREAT_KEYWORDS + PHISHING_INDICATORS]
+
+    started = time.perf_counter()
+    for pattern in families:
+        pattern.findall(text)
+    per_family = time.perf_counter() - started
+
+    started = time.perf_counter()
+    TextAnalyzer().analyze(text)
+    single_pass = time.perf_counter() - started
+
+    size = len(text) / (1024 * 1024)
+    print(f"{size:.1f} MB document, {len(families)} patterns")
+    print(f"  separate scans:    {per_family:.2f}s ({size / per_family:.1f} MB/s)")
+    print(f"  combined analyzer: {single_pass:.2f}s ({size / single_pass:.1f} MB/s)")
+
+if __name__ == "__main__":
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -2,12 +2,16 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import os
-from isolated_browser import IsolatedBrowserLauncher
+from functools import cached_property
 
 class BrowserUI:
     def __init__(self, parent_gui):
         self.parent = parent_gui
-        self.browser_launcher = IsolatedBrowserLauncher(parent_gui.storage)
+    
+    @cached_property
+    def browser_launcher(self):
+        from isolated_browser import IsolatedBrowserLauncher
+        return IsolatedBrowserLauncher(self.parent.storage)
     
     def add_browser_button(self, parent_frame):
         """Add isolated browser button to main interface"""
@@ -1,13 +1,19 @@
 """UI Integration for Honeypot Defense System"""
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-from honeypot import HoneypotDefenseSystem
+from functools import cached_property
+import threading
 import os
 
 class HoneypotUI:
     def __init__(self, parent_gui):
         self.parent = parent_gui
-        self.honeypot = HoneypotDefenseSystem(parent_gui.storage)
+    
+    @cached_property
+    def honeypot(self):
+        """Trap directories, decoy vault and scan cache, set up on first use"""
+        from honeypot import HoneypotDefenseSystem
+        return HoneypotDefenseSystem(self.parent.storage, self.parent.security_db)
     
     def add_honeypot_button(self, parent_frame):
         """Add honeypot security button to main interface"""
@@ -59,6 +65,109 @@ class HoneypotUI:
         
         return scanner_btn
     
+    def add_bulk_scan_button(self, parent_frame):
+        """Add bulk directory scan button"""
+        bulk_btn = tk.Button(
+            parent_frame, 
+            text="📂 Bulk Scan",
+            bg='#003300', 
+            fg='#00ff41',
+            font=('Courier', 9), 
+            command=self.bulk_scan_dialog,
+            width=20
+        )
+        bulk_btn.pack(pady=2, padx=5)
+        
+        # Add hover effects
+        def on_enter(e):
+            bulk_btn.configure(bg='#006600')
+        
+        def on_leave(e):
+            bulk_btn.configure(bg='#003300')
+        
+        bulk_btn.bind('<Enter>', on_enter)
+        bulk_btn.bind('<Leave>', on_leave)
+        
+        return bulk_btn
+    
+    def bulk_scan_dialog(self):
+        """Scan a whole directory tree with the worker pool"""
+        root_dir = filedialog.askdirectory(title="Select Directory to Scan")
+        if not root_dir:
+            return
+        
+        from bulk_scan import BulkScanner, format_eta
+        scanner = BulkScanner(self.honeypot)
+        checkpoint = scanner.load_checkpoint(root_dir)
+        resume = bool(checkpoint) and messagebox.askyesno(
+            "Resume Scan", f"A previous scan of this directory stopped after "
+                           f"{checkpoint['files_scanned']:,} files. Resume it?")
+        
+        scan_window = tk.Toplevel(self.parent.root)
+        scan_window.title("Bulk Security Scan")
+        scan_window.geometry("600x300")
+        scan_window.configure(bg='#000000')
+        scan_window.transient(self.parent.root)
+        
+        tk.Label(scan_window, text="◢ BULK SECURITY SCAN ◣", 
+                bg='#000000', fg='#ff0040', font=('Courier', 16, 'bold')).pack(pady=10)
+        tk.Label(scan_window, text=root_dir, bg='#000000', fg='#00ff41',
+                font=('Courier', 9)).pack()
+        
+        progress = ttk.Progressbar(scan_window, mode='determinate', maximum=100)
+        progress.pack(pady=10, padx=40, fill=tk.X)
+        
+        status_var = tk.StringVar(value="Walking directory tree...")
+        tk.Label(scan_window, textvariable=status_var, bg='#000000', fg='#00ff41',
+                font=('Courier', 10), justify='left').pack(pady=10)
+        
+        btn_frame = tk.Frame(scan_window, bg='#000000')
+        btn_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        def update_progress(p):
+            if not scan_window.winfo_exists():
+                return
+            if p['walk_complete'] and p['bytes_discovered']:
+                progress['value'] = p['bytes_scanned'] / p['bytes_discovered'] * 100
+            status_var.set(
+                f"Files: {p['files_scanned']:,} / {p['files_discovered']:,}"
+                f"{'' if p['walk_complete'] else '+'}\n"
+                f"Throughput: {p['files_per_sec']:,.0f} files/s, {p['mb_per_sec']:.1f} MB/s\n"
+                f"Threats: {p['threats_found']}   Cached: {p['cached']:,}\n"
+                f"ETA: {format_eta(p['eta_seconds'])}")
+        
+        def on_finished(summary):
+            if not scan_window.winfo_exists():
+                return
+            cancel_btn.configure(text="◉ CLOSE", command=scan_window.destroy)
+            if summary['cancelled']:
+                state = "cancelled - resume later"
+            elif summary['failed_tasks']:
+                state = f"incomplete - {summary['failed_tasks']} batches failed, resume to retry"
+            else:
+                state = "complete"
+            status_var.set(f"Scan {state}\n"
+                           f"Files: {summary['files_scanned']:,}   Threats: {summary['threats_found']}\n"
+                           f"Errors: {summary['errors']}   Time: {summary['elapsed']:.1f}s")
+        
+        def run_scan():
+            try:
+                summary = scanner.scan(root_dir, lambda p: scan_window.after(0, update_progress, p), resume)
+                scan_window.after(0, on_finished, summary)
+            except Exception as e:
+                scan_window.after(0, lambda msg=str(e): status_var.set(f"Scan failed: {msg}"))
+        
+        def cancel_scan():
+            scanner.cancel()
+            status_var.set("Cancelling...")
+        
+        cancel_btn = tk.Button(btn_frame, text="■ CANCEL", bg='#330000', fg='#ff0040',
+                              font=('Courier', 10, 'bold'), command=cancel_scan)
+        cancel_btn.pack(side=tk.RIGHT, padx=5)
+        
+        scan_window.protocol("WM_DELETE_WINDOW", lambda: (scanner.cancel(), scan_window.destroy()))
+        threading.Thread(target=run_scan, daemon=True).start()
+    
     def scan_file_dialog(self):
         """Open file dialog to scan a file"""
         file_path = filedialog.askopenfilename(
@@ -119,7 +228,8 @@ class HoneypotUI:
             results_text.insert(tk.END, f"Path: {analysis['file_path']}\\n")
             results_text.insert(tk.END, f"Size: {analysis['file_size']:,} bytes\\n")
             results_text.insert(tk.END, f"Type: {analysis['mime_type'] or 'Unknown'}\\n")
-            results_text.insert(tk.END, f"Hash: {analysis['file_hash'] or 'N/A'}\\n\\n")
+            results_text.insert(tk.END, f"Hash: {analysis['file_hash'] or 'N/A'}\\n")
+            results_text.insert(tk.END, f"Source: {'scan cache' if analysis.get('cached') else 'full scan'}\\n\\n")
             
             # Threat level with color coding
             threat_level = analysis['threat_level']
@@ -130,6 +240,14 @@ class HoneypotUI:
             else:
                 results_text.insert(tk.END, "✓ THREAT LEVEL: LOW\\n", 'low_threat')
             
+            entropy = analysis.get('entropy') or {}
+            if entropy.get('analyzed'):
+                results_text.insert(tk.END, "\\n=== ENTROPY PROFILE ===\\n")
+                results_text.insert(tk.END, f"Overall: {entropy['overall_entropy']:.2f} bits/byte (max {entropy['max_entropy']:.2f})\\n")
+                results_text.insert(tk.END, f"High-entropy coverage: {entropy['high_entropy_ratio'] * 100:.0f}%\\n")
+                for section in entropy['high_entropy_sections'][:5]:
+                    results_text.insert(tk.END, f"  0x{section['start']:08x}-0x{section['end']:08x}  {section['mean_entropy']:.2f}\\n")
+            
             results_text.insert(tk.END, "\\n=== THREAT INDICATORS ===\\n")
             if analysis['threats']:
                 for threat in analysis['threats']:
@@ -152,8 +270,8 @@ class HoneypotUI:
                 result = self.honeypot.trap_suspicious_file(file_path, 'manual_scan')
                 if result['trapped']:
                     messagebox.showinfo("File Quarantined", 
-                        f"✓ File moved to secure quarantine\\n\\n"
-                        f"Trap Path: {result['trap_path']}\\n"
+                        f"✓ File moved to encrypted quarantine\\n\\n"
+                        f"Sample: {result['file_hash'] or 'N/A'}\\n"
                         f"Threat Level: {result['threat_level']}\\n"
                         f"Threats: {', '.join(result['threats'])}")
                     scan_dialog.destroy()
@@ -183,48 +301,11 @@ class HoneypotUI:
     
     def show_hex_viewer(self, file_path: str):
         """Show hex viewer for file analysis"""
-        hex_window = tk.Toplevel(self.parent.root)
-        hex_window.title(f"Hex Viewer - {os.path.basename(file_path)}")
-        hex_window.geometry("900x600")
-        hex_window.configure(bg='#000000')
-        
-        tk.Label(hex_window, text="◢ HEX VIEWER ◣", 
-                bg='#000000', fg='#00ff41', font=('Courier', 16, 'bold')).pack(pady=10)
-        
-        # Hex display
-        hex_text = tk.Text(hex_window, bg='#001100', fg='#00ff41', 
-                          font=('Courier', 8), wrap=tk.NONE)
-        
-        # Scrollbars
-        v_scroll = tk.Scrollbar(hex_window, orient=tk.VERTICAL, command=hex_text.yview)
-        h_scroll = tk.Scrollbar(hex_window, orient=tk.HORIZONTAL, command=hex_text.xview)
-        hex_text.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-        
-        # Pack with scrollbars
-        hex_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0), pady=10)
-        v_scroll.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
-        h_scroll.pack(side=tk.BOTTOM, fill=tk.X, padx=20)
-        
         try:
-            with open(file_path, 'rb') as f:
-                data = f.read(8192)  # Read first 8KB
-                
-                hex_lines = []
-                for i in range(0, len(data), 16):
-                    chunk = data[i:i+16]
-                    hex_part = ' '.join(f'{b:02x}' for b in chunk)
-                    ascii_part = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
-                    hex_lines.append(f'{i:08x}  {hex_part:<48} |{ascii_part}|')
-                
-                hex_text.insert(tk.END, '\\n'.join(hex_lines))
-                
-                if len(data) == 8192:
-                    hex_text.insert(tk.END, '\\n\\n[Showing first 8KB only]')
-        
+            from hex_viewer import HexViewer
+            HexViewer(self.parent.root, file_path, self.honeypot.entropy_analyzer)
         except Exception as e:
-            hex_text.insert(tk.END, f"Error reading file: {str(e)}")
-        
-        hex_text.configure(state='disabled')
+            messagebox.showerror("Hex Viewer Error", f"Failed to open file: {str(e)}")
     
     def show_security_dashboard(self):
         """Show comprehensive security dashboard"""
@@ -329,14 +410,15 @@ class HoneypotUI:
         files_tree.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
         # Load trapped files
+        item_hashes = {}
         trapped_files = self.honeypot.get_trapped_files()
         for file_info in trapped_files:
-            files_tree.insert('', tk.END, values=(
+            item_hashes[files_tree.insert('', tk.END, values=(
                 file_info['filename'],
                 f"{file_info['file_size']:,} bytes" if file_info['file_size'] else 'Unknown',
                 ', '.join(file_info['threats']) if file_info['threats'] else 'None',
                 file_info['quarantine_date'][:19] if file_info['quarantine_date'] else ''
-            ))
+            ))] = file_info['file_hash']
         
         # Action buttons
         btn_frame = tk.Frame(parent, bg='#000000')
@@ -348,17 +430,43 @@ class HoneypotUI:
             # Refresh the view
             for item in files_tree.get_children():
                 files_tree.delete(item)
+            item_hashes.clear()
             trapped_files = self.honeypot.get_trapped_files()
             for file_info in trapped_files:
-                files_tree.insert('', tk.END, values=(
+                item_hashes[files_tree.insert('', tk.END, values=(
                     file_info['filename'],
                     f"{file_info['file_size']:,} bytes" if file_info['file_size'] else 'Unknown',
                     ', '.join(file_info['threats']) if file_info['threats'] else 'None',
                     file_info['quarantine_date'][:19] if file_info['quarantine_date'] else ''
-                ))
+                ))] = file_info['file_hash']
+        
+        def export_selected():
+            selection = files_tree.selection()
+            if not selection:
+                messagebox.showwarning("No Selection", "Select a quarantined file to export")
+                return
+            
+            file_hash = item_hashes.get(selection[0])
+            if not file_hash or not self.honeypot.quarantine.has_object(file_hash):
+                messagebox.showerror("Export Failed", "Sample is not in the quarantine store")
+                return
+            
+            dest_path = filedialog.asksaveasfilename(title="Export Quarantined Sample",
+                                                     initialfile=f"{file_hash}.sample")
+            if not dest_path:
+                return
+            
+            try:
+                self.honeypot.restore_trapped_file(file_hash, dest_path)
+                messagebox.showinfo("Export Complete", f"⚠️ Live sample written to:\\n{dest_path}")
+            except Exception as e:
+                messagebox.showerror("Export Failed", str(e))
         
         tk.Button(btn_frame, text="🧹 CLEANUP OLD", bg='#330000', fg='#ff0040',
                  font=('Courier', 10, 'bold'), command=cleanup_old).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(btn_frame, text="📤 EXPORT SAMPLE", bg='#003300', fg='#00ff41',
+                 font=('Courier', 10, 'bold'), command=export_selected).pack(side=tk.LEFT, padx=5)
     
     def _create_statistics_tab(self, parent):
         """Create statistics tab"""
@@ -389,6 +497,11 @@ class HoneypotUI:
         if trapped_files:
             total_size = sum(f['file_size'] for f in trapped_files if f['file_size'])
             stats_text.insert(tk.END, f"Total Quarantined Size: {total_size:,} bytes\\n")
+            
+            store_stats = self.honeypot.quarantine.get_stats()
+            stats_text.insert(tk.END, f"Unique Samples Stored: {store_stats['unique_samples']}\\n")
+            stats_text.insert(tk.END, f"Stored On Disk: {store_stats['stored_bytes']:,} bytes\\n")
+            stats_text.insert(tk.END, f"Saved By Dedup/Compression: {store_stats['saved_bytes']:,} bytes\\n")
         
         stats_text.insert(tk.END, "\\n=== THREAT BREAKDOWN ===\\n")
         
@@ -0,0 +1,300 @@
+"""Phishing URL feature engine for the AI Engine"""
+import os
+import re
+import math
+import time
+from collections import Counter
+from functools import lru_cache
+from urllib.parse import urlsplit
+from typing import Dict, Iterable, List
+
+DEFAULT_SUFFIX_LIST = os.path.expanduser('~/.smart_encrypt/public_suffix_list.dat')
+DOMAIN_CACHE_SIZE = 50000
+SUSPICIOUS_SCORE = 30
+# Brands are matched as whole tokens, so purchase.com or pineapple.com never match
+TOKEN_SPLIT = re.compile(r'[^a-z0-9]+')
+# One edit from a short brand is usually just another word (stream/steam, apply/apple)
+TYPOSQUAT_MIN_BRAND = 6
+CREDENTIAL_WORDS = {'login', 'signin', 'logon', 'verify', 'verification', 'account', 'password',
+                    'passwd', 'credential', 'credentials', 'unlock', 'recover', 'billing'}
+
+# Used when no public suffix list has been downloaded
+BUILTIN_SUFFIXES = '''
+com net org edu gov mil int info biz io co me tv cc app dev xyz top online site shop club
+uk co.uk org.uk ac.uk gov.uk au com.au net.au org.au ca de fr it es nl be ch at se no dk fi
+pl cz ru su ua in co.in jp co.jp cn com.cn hk com.hk br com.br mx com.mx ar com.ar za co.za
+nz co.nz kr co.kr tw com.tw sg com.sg my com.my id co.id tr com.tr ir ng com.ng eu us
+tk ml ga cf gq ws ly gl gd to is pw zip mov work click link loan men kim country
+github.io herokuapp.com appspot.com blogspot.com web.app firebaseapp.com netlify.app
+pages.dev vercel.app azurewebsites.net cloudfront.net s3.amazonaws.com
+'''
+
+URL_SHORTENERS = {
+    'bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'is.gd', 'buff.ly', 'adf.ly', 'bit.do',
+    'cutt.ly', 'rebrand.ly', 'shorturl.at', 'tiny.cc', 'rb.gy', 'lnkd.in', 'short.io', 't.ly',
+    'v.gd', 'qr.ae', 'soo.gd', 's.id', 'x.co', 'shorte.st', 'bl.ink', 'u.to'
+}
+
+# Brand name -> registrable domains the brand really uses, regional sites included
+BRAND_DOMAINS = {
+    'paypal': {'paypal.com', 'paypal.me', 'paypal.co.uk', 'paypal.de', 'paypal.fr', 'paypal.it',
+               'paypal.es', 'paypal.ca', 'paypal.com.au'},
+    'apple': {'apple.com', 'icloud.com'},
+    'icloud': {'icloud.com', 'apple.com'},
+    'google': {'google.com', 'gmail.com', 'youtube.com', 'goo.gl', 'google.co.uk', 'google.de',
+               'google.fr', 'google.it', 'google.es', 'google.ca', 'google.com.au', 'google.co.in',
+               'google.co.jp', 'google.com.br', 'google.com.mx', 'google.nl', 'google.pl'},
+    'gmail': {'gmail.com', 'google.com'},
+    'microsoft': {'microsoft.com', 'live.com', 'outlook.com', 'office.com', 'microsoftonline.com'},
+    'outlook': {'outlook.com', 'live.com', 'microsoft.com', 'office.com'},
+    'office365': {'office.com', 'microsoft.com'},
+    'amazon': {'amazon.com', 'amazon.co.uk', 'amazon.de', 'amazon.in', 'amazonaws.com', 'amazon.fr',
+               'amazon.it', 'amazon.es', 'amazon.ca', 'amazon.co.jp', 'amazon.com.au', 'amazon.com.br',
+               'amazon.com.mx', 'amazon.nl', 'amazon.se', 'amazon.pl', 'amazon.sg', 'amazon.com.tr'},
+    'facebook': {'facebook.com', 'fb.com', 'facebook.de', 'facebook.fr'},
+    'instagram': {'instagram.com'},
+    'netflix': {'netflix.com'},
+    'linkedin': {'linkedin.com', 'lnkd.in'},
+    'dropbox': {'dropbox.com'},
+    'github': {'github.com', 'github.io'},
+    'coinbase': {'coinbase.com'},
+    'binance': {'binance.com'},
+    'chase': {'chase.com'},
+    'wellsfargo': {'wellsfargo.com'},
+    'bankofamerica': {'bankofamerica.com'},
+    'docusign': {'docusign.com', 'docusign.net'},
+    'steam': {'steampowered.com', 'steamcommunity.com'}
+}
+
+SUSPICIOUS_TLDS = {'zip', 'mov', 'xyz', 'top', 'tk', 'ml', 'ga', 'cf', 'gq', 'work', 'click',
+                   'country', 'kim', 'loan', 'men', 'pw', 'link'}
+
+# Characters that render like ASCII letters, folded to build a lookalike skeleton
+HOMOGLYPHS = {
+    'а': 'a', 'е': 'e', 'о': 'o', 'р': 'p', 'с': 'c', 'х': 'x', 'у': 'y', 'і': 'i', 'ј': 'j',
+    'ԁ': 'd', 'ѕ': 's', 'һ': 'h', 'ӏ': 'l', 'ο': 'o', 'α': 'a', 'ρ': 'p', 'ν': 'v', 'τ': 't',
+    'ι': 'i', 'κ': 'k', 'ε': 'e', 'ɡ': 'g', 'ı': 'i', 'ɩ': 'l', 'ℓ': 'l', 'ⅰ': 'i',
+    '0': 'o', '1': 'l', '3': 'e', '5': 's', '7': 't', '@': 'a', '$': 's'
+}
+HOMOGLYPH_TABLE = str.maketrans(HOMOGLYPHS)
+
+FEATURE_WEIGHTS = {
+    'shortener': 30,
+    'ip_host': 30,
+    'userinfo': 30,
+    'homoglyph_brand': 50,
+    # Below SUSPICIOUS_SCORE: a near-miss name needs a second signal to flag a URL
+    'typosquat_brand': 20,
+    # Below SUSPICIOUS_SCORE: a brand word alone is common on honest sites
+    'brand_elsewhere': 25,
+    'brand_in_path': 10,
+    'punycode': 20,
+    'credential_path': 10,
+    'suspicious_tld': 15,
+    'high_entropy': 15,
+    'deep_subdomains': 10,
+    'many_hyphens': 10,
+    'long_url': 5,
+    'no_tls': 5
+}
+
+class PublicSuffixList:
+    """Public suffix rules (plain, wildcard and exception) for finding registrable domains"""
+
+    def __init__(self, path: str = None):
+        self.rules = set()
+        self.wildcards = set()
+        self.exceptions = set()
+
+        path = path or DEFAULT_SUFFIX_LIST
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._load(f)
+        else:
+            self._load(BUILTIN_SUFFIXES.split())
+
+    def _load(self, lines: Iterable[str]):
+        for line in lines:
+            rule = line.strip().split(' ')[0].lower()
+            if not rule or rule.startswith('//'):
+                continue
+            if rule.startswith('!'):
+                self.exceptions.add(rule[1:])
+            elif rule.startswith('*.'):
+                self.wildcards.add(rule[2:])
+            else:
+                self.rules.add(rule)
+
+    def public_suffix(self, host: str) -> str:
+        """Longest matching public suffix; unknown TLDs count as suffixes themselves"""
+        labels = host.split('.')
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self.exceptions:
+                return '.'.join(labels[i + 1:])
+            if candidate in self.rules:
+                return candidate
+            if i + 1 < len(labels) and '.'.join(labels[i + 1:]) in self.wildcards:
+                return candidate
+        return labels[-1]
+
+    def registrable_domain(self, host: str) -> str:
+        """The suffix plus one label, e.g. login.example.co.uk -> example.co.uk"""
+        suffix = self.public_suffix(host)
+        if host == suffix:
+            return host
+        rest = host[:-len(suffix) - 1]
+        return rest.rsplit('.', 1)[-1] + '.' + suffix
+
+def shannon_entropy(text: str) -> float:
+    if not text:
+        return 0.0
+    length = len(text)
+    return -sum(count / length * math.log2(count / length) for count in Counter(text).values())
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion or substitution"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+def _is_ip(host: str) -> bool:
+    if host.startswith('[') or ':' in host:
+        return True
+    parts = host.split('.')
+    return len(parts) == 4 and all(part.isdigit() and int(part) < 256 for part in parts)
+
+class UrlAnalyzer:
+    """Scores URLs for phishing traits, caching per-domain work in an LRU"""
+
+    def __init__(self, suffix_list_path: str = None, cache_size: int = DOMAIN_CACHE_SIZE):
+        self.suffixes = PublicSuffixList(suffix_list_path)
+        self.domain_features = lru_cache(maxsize=cache_size)(self._domain_features)
+
+    def _domain_features(self, host: str) -> Dict[str, any]:
+        """Everything about a host that does not depend on the rest of the URL"""
+        features = {}
+        if _is_ip(host):
+            return {'registrable_domain': host, 'ip_host': True}
+
+        # Decode punycode labels so lookalike characters become visible
+        unicode_host = host
+        if 'xn--' in host:
+            features['punycode'] = True
+            try:
+                unicode_host = host.encode('ascii').decode('idna')
+            except UnicodeError:
+                pass
+
+        registrable = self.suffixes.registrable_domain(host)
+        suffix = self.suffixes.public_suffix(host)
+        features['registrable_domain'] = registrable
+        if registrable in URL_SHORTENERS or host in URL_SHORTENERS:
+            features['shortener'] = True
+        if suffix.rsplit('.', 1)[-1] in SUSPICIOUS_TLDS:
+            features['suspicious_tld'] = True
+
+        name = registrable[:-len(suffix) - 1] if registrable != suffix else registrable
+        unicode_name = self.suffixes.registrable_domain(unicode_host).split('.')[0] if unicode_host != host else name
+        subdomains = host[:-len(registrable)].rstrip('.').split('.') if host != registrable else []
+
+        # Algorithmically generated names are long, high entropy and nearly vowel-free
+        features['entropy'] = round(shannon_entropy(unicode_name), 3)
+        letters = [c for c in unicode_name if c.isalnum()]
+        vowels = sum(1 for c in letters if c in 'aeiou')
+        if len(letters) >= 10 and features['entropy'] > 3.0 and vowels / len(letters) < 0.25:
+            features['high_entropy'] = True
+        if len(subdomains) > 3:
+            features['deep_subdomains'] = True
+        if unicode_name.count('-') >= 3:
+            features['many_hyphens'] = True
+
+        skeleton = unicode_name.translate(HOMOGLYPH_TABLE)
+        host_tokens = set(TOKEN_SPLIT.split(name))
+        for label in subdomains:
+            host_tokens.update(TOKEN_SPLIT.split(label))
+        for brand, domains in BRAND_DOMAINS.items():
+            if registrable in domains:
+                features['brand'] = brand
+                break
+            if skeleton == brand and unicode_name != brand:
+                features['homoglyph_brand'] = brand
+            elif len(brand) >= TYPOSQUAT_MIN_BRAND and name != brand and _within_one_edit(name, brand):
+                features['typosquat_brand'] = brand
+            elif brand in host_tokens:
+                features['brand_elsewhere'] = brand
+        return features
+
+    def analyze_url(self, url: str) -> Dict[str, any]:
+        """Phishing score (0-100) and the features behind it"""
+        try:
+            parts = urlsplit(url if '://' in url else 'http://' + url)
+            host = (parts.hostname or '').rstrip('.')
+        except ValueError:
+            return {'url': url, 'score': 0, 'suspicious': False, 'features': {'unparseable': True}}
+
+        features = dict(self.domain_features(host)) if host else {}
+        if '@' in parts.netloc:
+            features['userinfo'] = True
+        if parts.scheme == 'http':
+            features['no_tls'] = True
+        if len(url) > 100:
+            features['long_url'] = True
+        path_tokens = set(TOKEN_SPLIT.split(parts.path.lower()))
+        if path_tokens & CREDENTIAL_WORDS:
+            features['credential_path'] = True
+        if 'brand' not in features and 'brand_elsewhere' not in features:
+            brand = next((b for b in BRAND_DOMAINS if b in path_tokens), None)
+            if brand:
+                features['brand_in_path'] = brand
+
+        # A brand's own domain cannot impersonate it
+        if features.get('brand'):
+            for key in ('homoglyph_brand', 'typosquat_brand', 'brand_elsewhere', 'brand_in_path',
+                        'credential_path'):
+                features.pop(key, None)
+
+        score = min(sum(weight for name, weight in FEATURE_WEIGHTS.items() if features.get(name)), 100)
+        return {
+            'url': url,
+            'host': host,
+            'registrable_domain': features.get('registrable_domain', host),
+            'score': score,
+            'suspicious': score >= SUSPICIOUS_SCORE,
+            'features': features
+        }
+
+    def analyze_urls(self, urls: Iterable[str]) -> List[Dict[str, any]]:
+        return [self.analyze_url(url) for url in urls]
+
+    def cache_info(self) -> Dict[str, int]:
+        info = self.domain_features.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+def benchmark(count: int = 50000):
+    """Score a synthetic mix of benign and phishing-style URLs"""
+    hosts = ['www.google.com', 'accounts.google.com', 'paypal.com', 'paypal-secure-login.xyz',
+             'xn--pypal-4ve.com', 'bit.ly', 'login.micros0ft.com', 'github.com', 'news.bbc.co.uk',
+             'a8f3kq9zx2w7.top', '192.168.4.20', 'secure.chase.com.verify-account.ml']
+    urls = [f"http{'s' if i % 3 else ''}://{hosts[i % len(hosts)]}/path/{i % 500}?id={i}"
+            for i in range(count)]
+
+    analyzer = UrlAnalyzer()
+    started = time.perf_counter()
+    results = analyzer.analyze_urls(urls)
+    elapsed = time.perf_counter() - started
+
+    flagged = sum(1 for r in results if r['suspicious'])
+    print(f"{count} URLs in {elapsed:.2f}s ({count / elapsed:,.0f} URLs/s), {flagged} suspicious")
+    print(f"domain cache: {analyzer.cache_info()}")
+
+if __name__ == "__main__":
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
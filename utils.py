@@ -1,7 +1,19 @@
 """Utility functions for Smart-Encrypt"""
+import os
+import re
 import time
 import threading
-from typing import Callable
+from typing import Callable, Iterable, Iterator
+
+TASKS_IN_FLIGHT_PER_WORKER = 2
+# Words too common in questions to narrow a full-text search
+RETRIEVAL_STOPWORDS = frozenset('''
+    a an and are as at be by can could do does did for from has have how i if in into is it its
+    me my of on or our should so that the their then there these this to under use uses used was
+    we what when where which who why will with would you your code function method class file
+    project please show tell explain work works find
+'''.split())
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
 
 class AutoLockManager:
     def __init__(self, timeout_minutes: int = 5, lock_callback: Callable = None):
@@ -36,10 +48,116 @@ class AutoLockManager:
                 break
             time.sleep(10)
 
+class PeriodicTask:
+    """Runs task(stop_event) in a background thread every interval seconds until stopped
+
+    The loop waits on an event rather than sleeping, so stop() takes effect
+    between runs, and a long task can poll stop_event to end early. After
+    stop(), start() returns at once: the new thread waits for the old one to
+    finish before its first run, so runs never overlap and a restart always
+    uses its new task and interval.
+    """
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.stop_event.set()
+        self.thread = None
+
+    @property
+    def running(self) -> bool:
+        return not self.stop_event.is_set()
+
+    def start(self, task: Callable, interval: float):
+        if self.running:
+            return
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(task, interval, self.stop_event, self.thread),
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @staticmethod
+    def _run(task: Callable, interval: float, stop_event: threading.Event, previous: threading.Thread):
+        if previous is not None:
+            previous.join()
+        while not stop_event.is_set():
+            task(stop_event)
+            stop_event.wait(interval)
+
 def secure_delete(data: str):
     """Attempt to securely delete string from memory"""
     if data:
         # Overwrite with random data multiple times
         for _ in range(3):
             data = 'x' * len(data)
-        del data
\ No newline at end of file
+        del data
+
+def parallel_map(func: Callable, tasks: Iterable, workers: int = None, ordered: bool = True,
+                 initializer: Callable = None) -> Iterator:
+    """Stream func(task) results from a process pool with a bounded number of tasks in flight
+
+    Results come back in task order when ordered is set, otherwise as soon as they finish.
+    initializer runs once per worker process (or once inline when workers is 1).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        if initializer:
+            initializer()
+        for task in tasks:
+            yield func(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    tasks = iter(tasks)
+    max_in_flight = workers * TASKS_IN_FLIGHT_PER_WORKER
+    in_flight = {}
+    finished = {}
+    next_submit = 0
+    next_yield = 0
+    exhausted = False
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        while True:
+            # Ordered mode also counts buffered results so a slow task cannot grow memory
+            while not exhausted and len(in_flight) + len(finished) < max_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(func, task)] = next_submit
+                next_submit += 1
+
+            if not in_flight and not finished:
+                break
+
+            if in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[in_flight.pop(future)] = future.result()
+
+            if ordered:
+                while next_yield in finished:
+                    yield finished.pop(next_yield)
+                    next_yield += 1
+            else:
+                for task_id in list(finished):
+                    yield finished.pop(task_id)
+
+def fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r'[^\W_]+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def fts_any_query(query: str) -> str:
+    """FTS5 query matching any meaningful word of a natural-language question"""
+    words = []
+    for word in re.findall(r'[^\W_]+', query.lower()):
+        if len(word) > 1 and word not in RETRIEVAL_STOPWORDS and word not in words:
+            words.append(word)
+    return ' OR '.join(f'"{word}"*' for word in words)
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count: words and punctuation marks"""
+    return len(TOKEN_PATTERN.findall(text))
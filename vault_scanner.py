@@ -0,0 +1,224 @@
+"""Incremental sensitive data scanner for vault entries"""
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from text_analysis import TextAnalyzer, SENSITIVE_PATTERNS
+from utils import PeriodicTask
+
+# Pattern families worth reporting for a stored note, and how much each match adds
+SENSITIVITY_WEIGHTS = {
+    'credit_cards': 25,
+    'social_security': 25,
+    'bitcoin_addresses': 25,
+    'file_hashes': 5,
+    'ip_addresses': 5,
+    'email_addresses': 2
+}
+RISKY_SCORE = 25
+SCAN_BATCH_SIZE = 100
+
+class VaultSensitivityScanner:
+    """Scans only vault entries that changed since the last run
+
+    Triggers on the entries table queue every insert and edit, so a scan
+    decrypts and analyzes exactly the edited notes. Findings are stored
+    encrypted; only the 0-100 score is kept in the clear so risky notes can
+    be listed from an index without decrypting the table.
+    """
+
+    def __init__(self, storage_manager):
+        self.storage = storage_manager
+        self.analyzer = TextAnalyzer()
+        self.periodic = PeriodicTask()
+        self.init_db()
+
+    def init_db(self):
+        """Initialize the side table, the change queue and the triggers that fill it"""
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entry_sensitivity'")
+        first_run = cursor.fetchone() is None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entry_sensitivity (
+                entry_id INTEGER PRIMARY KEY,
+                score INTEGER NOT NULL,
+                findings_encrypted BLOB,
+                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_entry_sensitivity_score ON entry_sensitivity (score)')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sensitivity_queue (
+                entry_id INTEGER PRIMARY KEY,
+                change_seq INTEGER NOT NULL
+            )
+        ''')
+
+        for event in ('INSERT', 'UPDATE OF title_encrypted, content_encrypted'):
+            name = 'entries_queue_insert' if event == 'INSERT' else 'entries_queue_update'
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON entries
+                BEGIN
+                    INSERT OR REPLACE INTO sensitivity_queue (entry_id, change_seq)
+                    VALUES (NEW.id, (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM sensitivity_queue));
+                END
+            ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS entries_queue_delete AFTER DELETE ON entries
+            BEGIN
+                DELETE FROM sensitivity_queue WHERE entry_id = OLD.id;
+                DELETE FROM entry_sensitivity WHERE entry_id = OLD.id;
+            END
+        ''')
+
+        # Entries written before the scanner existed are queued once
+        if first_run:
+            cursor.execute('''
+                INSERT OR IGNORE INTO sensitivity_queue (entry_id, change_seq)
+                SELECT id, 1 FROM entries
+            ''')
+
+        conn.commit()
+        conn.close()
+
+    def score_text(self, text: str) -> Dict[str, any]:
+        """Sensitivity score and per-family match counts for a note"""
+        analysis = self.analyzer.analyze(text)
+        findings = {name: analysis.pattern_counts[name]
+                    for name in SENSITIVITY_WEIGHTS if analysis.pattern_counts[name]}
+        score = sum(SENSITIVITY_WEIGHTS[name] * count for name, count in findings.items())
+        return {
+            'score': min(score, 100),
+            'findings': findings,
+            'high_risk_patterns': sum(findings.get(name, 0) for name in SENSITIVE_PATTERNS)
+        }
+
+    def pending_count(self) -> int:
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM sensitivity_queue')
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def scan_pending(self, batch_size: int = SCAN_BATCH_SIZE,
+                     stop_event: threading.Event = None) -> Dict[str, int]:
+        """Scan every queued entry in batches and return counts for this run
+
+        Entries that fail to decrypt stay queued and are retried on the next
+        run; batches advance by (change_seq, entry_id) so this run moves past them.
+        Setting stop_event ends the run after the current batch; the rest stays queued.
+        """
+        stats = {'scanned': 0, 'risky': 0, 'errors': 0}
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        after = (0, 0)
+
+        while not (stop_event and stop_event.is_set()):
+            cursor.execute('''
+                SELECT q.entry_id, q.change_seq, e.title_encrypted, e.content_encrypted
+                FROM sensitivity_queue q JOIN entries e ON e.id = q.entry_id
+                WHERE (q.change_seq, q.entry_id) > (?, ?)
+                ORDER BY q.change_seq, q.entry_id
+                LIMIT ?
+            ''', (after[0], after[1], batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after = (rows[-1][1], rows[-1][0])
+
+            results = []
+            done = []
+            for entry_id, change_seq, title_encrypted, content_encrypted in rows:
+                try:
+                    text = self.storage.encryption.decrypt(title_encrypted) + '\n' + \
+                           self.storage.encryption.decrypt(content_encrypted)
+                except Exception:
+                    stats['errors'] += 1
+                    continue
+                done.append((entry_id, change_seq))
+                result = self.score_text(text)
+                results.append((entry_id, result['score'],
+                                self.storage.encryption.encrypt(json.dumps(result))))
+                stats['scanned'] += 1
+                if result['score'] >= RISKY_SCORE:
+                    stats['risky'] += 1
+
+            cursor.executemany('''
+                INSERT OR REPLACE INTO entry_sensitivity (entry_id, score, findings_encrypted)
+                VALUES (?, ?, ?)
+            ''', results)
+            # An entry edited mid-scan got a newer change_seq and stays queued
+            cursor.executemany('DELETE FROM sensitivity_queue WHERE entry_id = ? AND change_seq = ?', done)
+            conn.commit()
+
+            if len(rows) < batch_size:
+                break
+
+        # Queue rows whose entry no longer exists
+        cursor.execute('DELETE FROM sensitivity_queue WHERE entry_id NOT IN (SELECT id FROM entries)')
+        conn.commit()
+        conn.close()
+        return stats
+
+    def get_risky_entries(self, min_score: int = RISKY_SCORE, limit: int = 100) -> List[Dict]:
+        """Highest-scoring entries, decrypting only the rows returned"""
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT s.entry_id, s.score, s.findings_encrypted, s.scanned_at, e.title_encrypted, c.name
+            FROM entry_sensitivity s
+            JOIN entries e ON e.id = s.entry_id
+            LEFT JOIN categories c ON c.id = e.category_id
+            WHERE s.score >= ?
+            ORDER BY s.score DESC, s.entry_id
+            LIMIT ?
+        ''', (min_score, limit))
+
+        entries = []
+        for row in cursor.fetchall():
+            try:
+                entries.append({
+                    'id': row[0],
+                    'score': row[1],
+                    'findings': json.loads(self.storage.encryption.decrypt(row[2]))['findings'],
+                    'scanned_at': row[3],
+                    'title': self.storage.encryption.decrypt(row[4]),
+                    'category_name': row[5]
+                })
+            except Exception:
+                continue
+
+        conn.close()
+        return entries
+
+    def get_entry_sensitivity(self, entry_id: int) -> Optional[Dict]:
+        conn = sqlite3.connect(self.storage.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT findings_encrypted FROM entry_sensitivity WHERE entry_id = ?', (entry_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        return json.loads(self.storage.encryption.decrypt(row[0]))
+
+    def start(self, interval: float = 30.0):
+        """Scan pending entries in a background thread every interval seconds"""
+        self.periodic.start(self._scan_in_background, interval)
+
+    def stop(self):
+        self.periodic.stop()
+
+    @property
+    def running(self) -> bool:
+        return self.periodic.running
+
+    def _scan_in_background(self, stop_event: threading.Event):
+        try:
+            self.scan_pending(stop_event=stop_event)
+        except Exception as e:
+            print(f"Vault sensitivity scan failed: {e}")